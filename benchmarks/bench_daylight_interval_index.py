@@ -0,0 +1,64 @@
+"""
+Measures the cost of the point-in-time and total daylight questions: answered by the DaylightIntervalIndex against
+computing the daylight windows of the range from the IssPositions, as a client of /iss/sun does. The time to warm the
+index from the daylight_windows table and its size are reported as well.
+
+    python -m benchmarks.bench_daylight_interval_index --rows 1000000 --days 1 30 180
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks.bench_utils import create_benchmark_db, measure, print_results, FIRST_TIMESTAMP
+from challenge.database.daylight_windows_crud import rebuild_daylight_windows
+from challenge.database.iss_crud import get_iss_position_columns
+from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndex
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows_vectorized
+
+
+def get_scanned_daylight_seconds(db, start_time, end_time) -> float:
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time,
+                                                    satellite_id=25544)
+    return sum(((window_end or timestamps[-1].item()) - (window_start or timestamps[0].item())).total_seconds()
+               for window_start, window_end in get_daylight_time_windows_vectorized(timestamps, daylight))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 30, 180])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        session_local = create_benchmark_db(os.path.join(directory, 'benchmark.db'), args.rows, args.wait_time)
+        with session_local() as db:
+            rebuild_daylight_windows(db)
+            daylight_interval_index = DaylightIntervalIndex(25544)
+            warm_start = time.perf_counter()
+            daylight_interval_index.warm(db)
+            results['warm'] = {'seconds': time.perf_counter() - warm_start,
+                               'windows': len(daylight_interval_index._starts),
+                               'size_bytes': sum(sys.getsizeof(values) for values in (
+                                   daylight_interval_index._starts, daylight_interval_index._ends,
+                                   daylight_interval_index._cumulative_seconds))}
+            for days in args.days:
+                start_time = FIRST_TIMESTAMP + timedelta(hours=1)
+                end_time = start_time + timedelta(days=days)
+                summary = daylight_interval_index.get_summary(start_time, end_time)
+                assert abs(summary['daylight_seconds'] -
+                           get_scanned_daylight_seconds(db, start_time, summary['end_time'])) < 1e-6
+                results[f'{days}_days'] = {
+                    'index_summary': measure(lambda: daylight_interval_index.get_summary(start_time, end_time),
+                                             repeat=1000),
+                    'index_lookup': measure(lambda: daylight_interval_index.lookup(end_time), repeat=1000),
+                    'scan_summary': measure(lambda: get_scanned_daylight_seconds(db, start_time, end_time))}
+    print_results('daylight_interval_index', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares the throughput of the two paths of /iss/position in the workers that do not ingest: reading the latest
+IssPosition from the shared memory slots against querying it with get_latest_iss_position. Several reader processes
+run at once while a writer process keeps publishing, as with uvicorn --workers.
+
+    python -m benchmarks.bench_latest_position --rows 100000 --readers 1 4 --seconds 3
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_utils import create_benchmark_db, print_results, FIRST_TIMESTAMP
+from challenge.database.iss_crud import get_latest_iss_position
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+from challenge.utils.buffers.latest_position_slots import LatestPositionSlots
+
+SATELLITE_IDS = [25544]
+
+
+def publish(slots_path: str, stop) -> None:
+    latest_position_slots = LatestPositionSlots(slots_path, SATELLITE_IDS)
+    i = 0
+    while not stop.is_set():
+        i += 1
+        latest_position_slots.publish(
+            IssPosition(name='iss', satellite_id=25544, latitude=0, longitude=0, altitude=418.7, velocity=27581.1,
+                        visibility=Visibility.DAYLIGHT, footprint=4500.9,
+                        timestamp=FIRST_TIMESTAMP + timedelta(seconds=i), daynum=2460259.4, solar_lat=-17.3,
+                        solar_lon=187.6, units='kilometers'))
+        time.sleep(0.001)
+
+
+def read_slots(slots_path: str, db_path: str, seconds: float, reads) -> None:
+    latest_position_slots = LatestPositionSlots(slots_path, SATELLITE_IDS)
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if latest_position_slots.read(25544) is not None:
+            count += 1
+    reads.put(count)
+
+
+def read_db(slots_path: str, db_path: str, seconds: float, reads) -> None:
+    session_local = sessionmaker(bind=create_engine(f'sqlite:///{db_path}'))
+    count = 0
+    end = time.perf_counter() + seconds
+    with session_local() as db:
+        while time.perf_counter() < end:
+            if get_latest_iss_position(db, 25544) is not None:
+                count += 1
+            db.rollback()
+    reads.put(count)
+
+
+def measure_reads(read, readers: int, slots_path: str, db_path: str, seconds: float) -> float:
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    reads = context.Queue()
+    writer_process = context.Process(target=publish, args=(slots_path, stop))
+    writer_process.start()
+    time.sleep(0.5)
+    reader_processes = [context.Process(target=read, args=(slots_path, db_path, seconds, reads))
+                        for _ in range(readers)]
+    for reader_process in reader_processes:
+        reader_process.start()
+    total_reads = sum(reads.get() for _ in reader_processes)
+    for reader_process in reader_processes:
+        reader_process.join()
+    stop.set()
+    writer_process.join()
+    return total_reads / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--readers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'benchmark.db')
+        slots_path = os.path.join(directory, 'benchmark.db.latest')
+        create_benchmark_db(db_path, args.rows)
+        for readers in args.readers:
+            results[f'{readers}_readers'] = {
+                'slots_reads_per_second': measure_reads(read_slots, readers, slots_path, db_path, args.seconds),
+                'db_reads_per_second': measure_reads(read_db, readers, slots_path, db_path, args.seconds)}
+    print_results('latest_position', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
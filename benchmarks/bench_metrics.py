@@ -0,0 +1,53 @@
+"""
+Measures the overhead of the metrics on the hot paths: the cost of one Counter increment and one Histogram
+observation, the cost of the whole instrumentation of an /iss/sun request (the timers and observations of the request,
+fetch and compute phases plus the rows scanned), and the cost of rendering /metrics for a scrape.
+
+    python -m benchmarks.bench_metrics --calls 1000000
+"""
+import argparse
+import time
+from typing import Callable
+
+from benchmarks.bench_utils import print_results
+from challenge.utils.metrics.metrics import Counter, Histogram, MetricsRegistry, ROWS_BUCKETS
+
+
+def measure_microseconds(func: Callable[[], None], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=1000000)
+    args = parser.parse_args()
+    registry = MetricsRegistry()
+    counter = Counter('counter_total', 'Counter', ('path',), registry=registry)
+    request_seconds = Histogram('request_seconds', 'Request', ('source',), registry=registry)
+    fetch_seconds = Histogram('fetch_seconds', 'Fetch', ('source',), registry=registry)
+    compute_seconds = Histogram('compute_seconds', 'Compute', ('source',), registry=registry)
+    rows_scanned = Histogram('rows_scanned', 'Rows', ('source',), buckets=ROWS_BUCKETS, registry=registry)
+    label_values = ('buffer',)
+
+    def instrument_request():
+        # Same calls as read_sun when it is served by the buffer
+        request_start = fetch_start = time.perf_counter()
+        fetch_seconds.observe(time.perf_counter() - fetch_start, label_values)
+        rows_scanned.observe(4320, label_values)
+        compute_start = time.perf_counter()
+        compute_seconds.observe(time.perf_counter() - compute_start, label_values)
+        request_seconds.observe(time.perf_counter() - request_start, label_values)
+
+    results = {'counter_inc_us': measure_microseconds(lambda: counter.inc(1, ('/iss/sun',)), args.calls),
+               'histogram_observe_us': measure_microseconds(lambda: request_seconds.observe(0.003, label_values),
+                                                            args.calls),
+               'sun_request_instrumentation_us': measure_microseconds(instrument_request, args.calls),
+               'render_us': measure_microseconds(registry.render, 1000)}
+    print_results('metrics', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures the ingestion latency of the poll ticks of the tracked satellites, from the first request of a tick to the
+commit of its batch, as the number of satellites grows. The satellites are spread across the ticks of the wait time,
+which are run at their real pace so that the host rate limiter sees the same spacing as in the app. The positions API
+is a local aiohttp stub server that answers after a fixed latency, so the results only depend on how the polls are
+fanned out, spaced by the configured host_requests_per_second as all the satellites share the same host, and written.
+
+    python -m benchmarks.bench_multi_satellite_ingest --satellites 1 10 50 --latency 0.05 --cycles 1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from itertools import count
+from unittest.mock import Mock
+
+import aiohttp
+from aiohttp import web
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_utils import print_results
+from challenge.background_tasks.iss_position_updater import IssPositionUpdater
+from challenge.background_tasks.iss_position_writer import IssPositionWriter
+from challenge.database.database import Base, create_writer_engine
+from challenge.database.models import models  # noqa: F401, registers the tables
+from challenge.utils.config.config_utils import ConfigUtils
+
+SAMPLE_ISS_POSITION_JSON = {"name": "iss", "latitude": 30.9, "longitude": -110.6, "altitude": 420.9,
+                            "velocity": 27584.4, "visibility": "eclipsed", "footprint": 4512.0, "daynum": 2460259.6,
+                            "solar_lat": -17.3, "solar_lon": 126.5, "units": "kilometers"}
+
+
+async def start_stub_server(latency: float) -> tuple[web.AppRunner, str]:
+    timestamps = count(1699672660)
+
+    async def get_satellite(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({**SAMPLE_ISS_POSITION_JSON, 'id': int(request.match_info['satellite_id']),
+                                  'timestamp': next(timestamps)})
+
+    app = web.Application()
+    app.router.add_get('/satellites/{satellite_id}', get_satellite)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/satellites/{{satellite_id}}'
+
+
+async def measure_polls(url_template: str, db_path: str, satellites: int, cycles: int, wait_time: int,
+                        max_concurrent_requests: int, host_requests_per_second: float) -> dict:
+    engine = create_writer_engine(db_path)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    config_utils = Mock(get_satellite_url_template=Mock(return_value=url_template),
+                        get_max_concurrent_requests=Mock(return_value=max_concurrent_requests),
+                        get_host_requests_per_second=Mock(return_value=host_requests_per_second))
+    # A batch size of 1 makes every tick commit as soon as its positions are handed to the writer
+    iss_position_writer = IssPositionWriter(db, batch_size=1)
+    iss_position_updater = IssPositionUpdater(db, {'User-Agent': 'benchmark'}, wait_time, config_utils=config_utils,
+                                              iss_position_writer=iss_position_writer,
+                                              satellite_ids=list(range(1, satellites + 1)))
+    latencies = []
+    tick_seconds = iss_position_updater.poll_scheduler.interval
+    async with aiohttp.ClientSession(headers=iss_position_updater.headers) as iss_position_updater._session:
+        for _ in range(cycles * len(iss_position_updater.poll_slices)):
+            start = time.perf_counter()
+            await iss_position_updater.update_iss_position()
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(max(0., tick_seconds - latencies[-1]))
+    stored = db.query(models.IssPosition).count()
+    db.close()
+    engine.dispose()
+    return {'ticks_per_wait_time': len(iss_position_updater.poll_slices),
+            'median_tick_seconds': statistics.median(latencies), 'max_tick_seconds': max(latencies),
+            'stored_positions': stored}
+
+
+async def run(args) -> dict:
+    runner, url_template = await start_stub_server(args.latency)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for satellites in args.satellites:
+                results[satellites] = await measure_polls(url_template, os.path.join(directory, f'{satellites}.db'),
+                                                          satellites, args.cycles, args.wait_time,
+                                                          args.max_concurrent_requests, args.host_requests_per_second)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--satellites', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--cycles', type=int, default=1)
+    parser.add_argument('--wait-time', type=int, default=ConfigUtils().get_wait_time())
+    parser.add_argument('--max-concurrent-requests', type=int, default=50)
+    parser.add_argument('--host-requests-per-second', type=float,
+                        default=ConfigUtils().get_host_requests_per_second())
+    args = parser.parse_args()
+    print_results('multi_satellite_ingest', vars(args), asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
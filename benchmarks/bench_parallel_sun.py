@@ -0,0 +1,57 @@
+"""
+Measures the time windows of a long /iss/sun range read from the iss_positions table: the serial fetch and scan done
+by the worker against the time chunks fetched and scanned by a pool of 1 to 8 processes, asserting that both provide
+the same windows. The pool is started before the timed runs, as the one of the app is started once per worker.
+
+    python -m benchmarks.bench_parallel_sun --rows 5000000 --processes 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from benchmarks.bench_utils import FIRST_TIMESTAMP, create_benchmark_db, measure, print_results
+from challenge.database.iss_crud import get_iss_position_columns
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows_vectorized
+from challenge.utils.parallel.parallel_time_windows import get_parallel_time_windows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    results = {'cpus': os.cpu_count()}
+    start_time = FIRST_TIMESTAMP
+    end_time = FIRST_TIMESTAMP + timedelta(seconds=args.wait_time * (args.rows - 1))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.db')
+        session_local = create_benchmark_db(path, args.rows, args.wait_time)
+        database_url = f'sqlite:///{path}'
+        with session_local() as db:
+            def serial_time_windows():
+                return get_daylight_time_windows_vectorized(*get_iss_position_columns(
+                    db, ('timestamp', 'daylight'), start_time, end_time, satellite_id=25544))
+
+            time_windows = serial_time_windows()
+            results['serial'] = measure(serial_time_windows, repeat=1)
+        for processes in args.processes:
+            with ProcessPoolExecutor(max_workers=processes,
+                                     mp_context=multiprocessing.get_context('spawn')) as process_pool:
+                def parallel_time_windows():
+                    return get_parallel_time_windows(process_pool, database_url, start_time, end_time, processes,
+                                                     satellite_id=25544)
+
+                assert parallel_time_windows() == time_windows
+                results[f'processes_{processes}'] = measure(parallel_time_windows, repeat=1)
+                results[f'processes_{processes}']['speedup'] = \
+                    results['serial']['seconds'] / results[f'processes_{processes}']['seconds']
+    print_results('parallel_sun', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
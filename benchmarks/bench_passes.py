@@ -0,0 +1,71 @@
+"""
+Measures /iss/passes over the whole history: the IssPositions pruned with the lat/lon grid cells of the
+iss_position_cells table against the scan of every IssPosition, both followed by the same vectorized distance check.
+The time to index the cells of the existing IssPositions and the size of the table are reported as well.
+
+    python -m benchmarks.bench_passes --rows 2000000 --radius-km 100 500 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from benchmarks.bench_utils import create_benchmark_db, measure, print_results
+from challenge.database.iss_crud import get_iss_position_columns
+from challenge.database.position_cells_crud import get_iss_position_cell_columns, rebuild_iss_position_cells
+from challenge.utils.operations.spatial_utils import get_cell_ranges, get_haversine_distances, get_passes
+
+# The equator, crossed by every orbit of the synthetic track, Rome, only reached by its widest circles, and Milan, north
+# of its latitudes
+LOCATIONS = {'rome': (41.9, 12.5), 'equator': (0, 0), 'milan': (45.46, 9.19)}
+
+
+def get_passes_with(columns: tuple, latitude: float, longitude: float, radius_km: float) -> list[dict]:
+    timestamps, latitudes, longitudes = columns
+    distances = get_haversine_distances(latitude, longitude, latitudes, longitudes)
+    close = distances <= radius_km
+    return get_passes(timestamps[close], distances[close])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--radius-km', type=float, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        session_local = create_benchmark_db(os.path.join(directory, 'benchmark.db'), args.rows, args.wait_time)
+        with session_local() as db:
+            rebuild_start = time.perf_counter()
+            rebuild_iss_position_cells(db)
+            results['rebuild'] = {'seconds': time.perf_counter() - rebuild_start, 'table_bytes': db.execute(text(
+                "SELECT sum(pgsize) FROM dbstat WHERE name LIKE '%iss_position_cells%'")).scalar()}
+            for name, (latitude, longitude) in LOCATIONS.items():
+                for radius_km in args.radius_km:
+                    def index_passes():
+                        return get_passes_with(get_iss_position_cell_columns(
+                            db, get_cell_ranges(latitude, longitude, radius_km), satellite_id=25544), latitude,
+                            longitude, radius_km)
+
+                    def scan_passes():
+                        return get_passes_with(get_iss_position_columns(
+                            db, ('timestamp', 'latitude', 'longitude'), datetime.min, satellite_id=25544), latitude,
+                            longitude, radius_km)
+
+                    passes = index_passes()
+                    assert passes == scan_passes()
+                    results[f'{name}_{radius_km:g}km'] = {
+                        'passes': len(passes),
+                        'candidates': len(get_iss_position_cell_columns(
+                            db, get_cell_ranges(latitude, longitude, radius_km), satellite_id=25544)[0]),
+                        'index': measure(index_passes), 'scan': measure(scan_passes, repeat=1)}
+    print_results('passes', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures the idle cost of scheduling a no-op poll every 20 seconds: the CPU time and the number of event loop wakeups
+of the former busy loop, which asked every 50 ms whether the poll was due, against the PollScheduler, which sleeps
+until the next deadline. It also reports how much the poll times drift from the grid when every poll takes some time.
+
+    python -m benchmarks.bench_poll_scheduler --seconds 10 --interval 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.bench_utils import print_results
+from challenge.utils.scheduling.poll_scheduler import PollScheduler
+
+
+async def run_busy_loop(interval: float, seconds: float, poll_seconds: float) -> dict:
+    # Same behaviour as the aioschedule loop: the next run is scheduled interval seconds after the previous one ended
+    wakeups = 0
+    runs = []
+    next_run = time.monotonic()
+    end = next_run + seconds
+    while time.monotonic() < end:
+        if time.monotonic() >= next_run:
+            runs.append(time.monotonic())
+            await asyncio.sleep(poll_seconds)
+            next_run = time.monotonic() + interval
+        await asyncio.sleep(0.05)
+        wakeups += 1
+    return {'wakeups': wakeups, 'runs': runs}
+
+
+async def run_poll_scheduler(interval: float, seconds: float, poll_seconds: float) -> dict:
+    wakeups = 0
+    runs = []
+
+    async def sleep(delay: float) -> None:
+        nonlocal wakeups
+        wakeups += 1
+        await asyncio.sleep(delay)
+
+    async def job():
+        runs.append(time.monotonic())
+        await asyncio.sleep(poll_seconds)
+
+    poll_scheduler = PollScheduler(interval, sleep=sleep)
+    try:
+        await asyncio.wait_for(poll_scheduler.run(job), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return {'wakeups': wakeups, 'runs': runs}
+
+
+def measure_scheduler(run, interval: float, seconds: float, poll_seconds: float) -> dict:
+    cpu_start = time.process_time()
+    result = asyncio.run(run(interval, seconds, poll_seconds))
+    cpu_seconds = time.process_time() - cpu_start
+    runs = result['runs']
+    drifts = [run_time - runs[0] - i * interval for i, run_time in enumerate(runs)]
+    return {'cpu_seconds': cpu_seconds, 'wakeups_per_second': result['wakeups'] / seconds, 'runs': len(runs),
+            'max_drift_seconds': max(drifts)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=20)
+    parser.add_argument('--poll-seconds', type=float, default=0.2)
+    args = parser.parse_args()
+    results = {'busy_loop': measure_scheduler(run_busy_loop, args.interval, args.seconds, args.poll_seconds),
+               'poll_scheduler': measure_scheduler(run_poll_scheduler, args.interval, args.seconds,
+                                                   args.poll_seconds)}
+    print_results('poll_scheduler', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the cost of pushing the positions to many clients through the PositionHub: the memory held by idle
+subscribers waiting for an update, and the time between one publish and its delivery to every subscriber.
+
+    python -m benchmarks.bench_position_hub --subscribers 1000 10000 --publishes 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from contextlib import aclosing
+from datetime import timedelta
+
+from benchmarks.bench_utils import print_results, FIRST_TIMESTAMP
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+from challenge.utils.streaming.position_hub import PositionHub
+
+
+def get_iss_position(seconds: int) -> IssPosition:
+    return IssPosition(name='iss', satellite_id=25544, latitude=0, longitude=0, altitude=418.7, velocity=27581.1,
+                       visibility=Visibility.DAYLIGHT, footprint=4500.9,
+                       timestamp=FIRST_TIMESTAMP + timedelta(seconds=seconds), daynum=2460259.4, solar_lat=-17.3,
+                       solar_lon=187.6, units='kilometers')
+
+
+async def consume(position_hub: PositionHub, publishes: int, deliveries: list, delivered: list) -> None:
+    async with aclosing(position_hub.subscribe(25544)) as position_updates:
+        async for position_update in position_updates:
+            deliveries[position_update.version] += 1
+            if deliveries[position_update.version] == position_hub.max_subscribers:
+                delivered[position_update.version].set()
+            if position_update.version == publishes:
+                return
+
+
+async def measure(subscribers: int, publishes: int) -> dict:
+    position_hub = PositionHub(max_subscribers=subscribers)
+    deliveries = [0] * (publishes + 1)
+    delivered = [asyncio.Event() for _ in range(publishes + 1)]
+    tracemalloc.start()
+    consumers = [asyncio.create_task(consume(position_hub, publishes, deliveries, delivered))
+                 for _ in range(subscribers)]
+    while position_hub.subscribers < subscribers:
+        await asyncio.sleep(0)
+    idle_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    fan_out_ms = []
+    for version in range(1, publishes + 1):
+        start = time.perf_counter()
+        position_hub.publish(get_iss_position(version))
+        await delivered[version].wait()
+        fan_out_ms.append((time.perf_counter() - start) * 1e3)
+    await asyncio.gather(*consumers)
+    return {'idle_bytes_per_subscriber': idle_memory / subscribers,
+            'fan_out_ms_median': statistics.median(fan_out_ms),
+            'fan_out_ms_max': max(fan_out_ms),
+            'skipped_updates': position_hub.skipped_updates}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--publishes', type=int, default=20)
+    args = parser.parse_args()
+
+    results = {f'{subscribers}_subscribers': asyncio.run(measure(subscribers, args.publishes))
+               for subscribers in args.subscribers}
+    print_results('position_hub', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the serialization cost of one /iss/position response, brief and detailed, for an IssPosition model read from
+the DB and an IssPosition schema read from the buffer: jsonable_encoder and JSONResponse as FastAPI did before,
+against encode_position with orjson on the first request after an insert and the cached payload on the next ones.
+
+    python -m benchmarks.bench_position_serialization --calls 100000
+"""
+import argparse
+import time
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from benchmarks.bench_utils import print_results, FIRST_TIMESTAMP
+from challenge.database.models import models
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+from challenge.utils.caches.position_payload_cache import PositionPayloadCache, encode_position
+
+
+def measure_microseconds(func: Callable[[], None], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=100000)
+    args = parser.parse_args()
+    iss_position = IssPosition(name='iss', satellite_id=25544, latitude=3.7993878441372, longitude=100.21269424675,
+                               altitude=418.710774125, velocity=27581.144139331, visibility=Visibility.DAYLIGHT,
+                               footprint=4500.8986337084, timestamp=FIRST_TIMESTAMP, daynum=2460259.4678472,
+                               solar_lat=-17.276144046636, solar_lon=187.56023046706, units='kilometers')
+    position_payload_cache = PositionPayloadCache()
+
+    results = {}
+    for source, position in (('model', models.IssPosition(**iss_position.model_dump())), ('schema', iss_position)):
+        for detailed in (False, True):
+            def encode_with_jsonable_encoder():
+                content = position if detailed else {'latitude': position.latitude,
+                                                     'longitude': position.longitude,
+                                                     'timestamp': position.timestamp}
+                JSONResponse(jsonable_encoder(content))
+
+            def encode_with_orjson():
+                Response(encode_position(position, detailed), media_type='application/json')
+
+            def serve_cached_payload():
+                Response(position_payload_cache.get(position, detailed), media_type='application/json')
+
+            results[f'{source}_{"detailed" if detailed else "brief"}'] = {
+                'jsonable_encoder_us': measure_microseconds(encode_with_jsonable_encoder, args.calls),
+                'orjson_us': measure_microseconds(encode_with_orjson, args.calls),
+                'cached_us': measure_microseconds(serve_cached_payload, args.calls)}
+    print_results('position_serialization', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
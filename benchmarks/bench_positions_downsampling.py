@@ -0,0 +1,64 @@
+"""
+Measures the latency and the response size of a long /iss/positions range downsampled to max_points, with the bucket
+downsampling done by the DB and with LTTB over the columns of the range, against the whole range. Every variant reads
+and encodes the timestamp, visibility, latitude and longitude of the IssPositions.
+
+    python -m benchmarks.bench_positions_downsampling --days 30 90 --max-points 1000
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import orjson
+
+from benchmarks.bench_utils import create_benchmark_db, measure, print_results
+from challenge.database.iss_crud import get_downsampled_iss_position_rows, get_iss_position_columns, \
+    get_iss_position_rows
+from challenge.utils.operations.downsampling_utils import get_lttb_indexes, get_transition_indexes
+
+COLUMNS = ('timestamp', 'visibility', 'latitude', 'longitude')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=float, nargs='+', default=[30, 90])
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--max-points', type=int, default=1000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for days in args.days:
+            rows = int(days * 86400 / args.wait_time)
+            session_local = create_benchmark_db(os.path.join(directory, f'benchmark_{days}.db'), rows, args.wait_time)
+            with session_local() as db:
+                def get_whole_range():
+                    return orjson.dumps([dict(zip(COLUMNS, row)) for row in get_iss_position_rows(
+                        db, COLUMNS, datetime.min, satellite_id=25544)])
+
+                def get_bucket_downsampling():
+                    return orjson.dumps([dict(zip(COLUMNS, row)) for row in get_downsampled_iss_position_rows(
+                        db, COLUMNS, args.max_points, satellite_id=25544)])
+
+                def get_lttb_downsampling():
+                    # Same steps as read_positions with downsampling=lttb
+                    array_columns = (*COLUMNS, 'daylight')
+                    arrays = dict(zip(array_columns, get_iss_position_columns(db, array_columns, datetime.min,
+                                                                              satellite_id=25544)))
+                    indexes = np.union1d(get_lttb_indexes(arrays['timestamp'].astype(np.int64), arrays['latitude'],
+                                                          args.max_points), get_transition_indexes(arrays['daylight']))
+                    return orjson.dumps([dict(zip(COLUMNS, values)) for values in
+                                         zip(*[arrays[column][indexes].tolist() for column in COLUMNS])])
+
+                results[f'{days}_days'] = {'rows': rows}
+                for name, get_response in (('whole_range', get_whole_range), ('bucket', get_bucket_downsampling),
+                                           ('lttb', get_lttb_downsampling)):
+                    results[f'{days}_days'][name] = {**measure(get_response, repeat=2),
+                                                     'response_bytes': len(get_response())}
+    print_results('positions_downsampling', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures the latency of one page of /iss/positions as a function of its depth: get_iss_position_page, which starts
+right after the key of the previous page, against the same page read with OFFSET. Both select all the fields.
+
+    python -m benchmarks.bench_positions_pagination --rows 1000000 --page-size 100 --pages 1 100 1000 9999
+"""
+import argparse
+import os
+import tempfile
+
+from sqlalchemy import select
+
+from benchmarks.bench_utils import create_benchmark_db, measure, print_results
+from challenge.database.iss_crud import get_iss_position_page
+from challenge.database.models.models import IssPosition
+from challenge.database.schemas import IssPosition as IssPositionSchema
+
+COLUMNS = tuple(IssPositionSchema.model_fields)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 1000, 9999])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        session_local = create_benchmark_db(os.path.join(directory, 'benchmark.db'), args.rows, args.wait_time)
+        with session_local() as db:
+            for page in args.pages:
+                # The key of the last IssPosition of the previous page, as decoded from the cursor
+                offset = (page - 1) * args.page_size
+                after = None
+                if offset:
+                    after = tuple(db.execute(select(IssPosition.satellite_id, IssPosition.timestamp).order_by(
+                        IssPosition.satellite_id, IssPosition.timestamp).offset(offset - 1).limit(1)).one())
+                keyset_rows = get_iss_position_page(db, COLUMNS, satellite_id=25544, after=after,
+                                                    limit=args.page_size)
+                offset_statement = select(*[getattr(IssPosition, column) for column in COLUMNS]).where(
+                    IssPosition.satellite_id == 25544).order_by(IssPosition.timestamp).offset(offset).limit(
+                    args.page_size)
+                assert [row[:-2] for row in keyset_rows] == [tuple(row) for row in db.execute(offset_statement)]
+                results[f'page_{page}'] = {
+                    'keyset': measure(lambda: get_iss_position_page(db, COLUMNS, satellite_id=25544, after=after,
+                                                                    limit=args.page_size)),
+                    'offset': measure(lambda: db.execute(offset_statement).all())}
+    print_results('positions_pagination', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Compares the ORM path (get_iss_positions) with the projection path (get_iss_position_rows/get_iss_position_columns)
+when reading the columns needed by /iss/sun.
+
+    python -m benchmarks.bench_projection --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime
+
+from benchmarks.bench_utils import create_benchmark_db, measure, print_results
+from challenge.database.iss_crud import get_iss_positions, get_iss_position_rows, get_iss_position_columns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        session_local = create_benchmark_db(os.path.join(directory, 'benchmark.db'), args.rows)
+        queries = {
+            'orm_get_iss_positions': lambda db: get_iss_positions(db, datetime.min, datetime.max),
+            'core_get_iss_position_rows': lambda db: get_iss_position_rows(db, ('timestamp', 'visibility'),
+                                                                           datetime.min, datetime.max),
+            'core_get_iss_position_columns': lambda db: get_iss_position_columns(db, ('timestamp', 'daylight'),
+                                                                                 datetime.min, datetime.max),
+        }
+        results = {}
+        for name, query in queries.items():
+            with session_local() as db:
+                result = measure(lambda: query(db))
+            result['rows_per_second'] = args.rows / result['seconds']
+            results[name] = result
+    print_results('projection', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures the per-request cost of the rate limiter bookkeeping: the per-worker memory storage used so far against the
+shared memory storage, with the fixed-window and sliding-window-counter strategies. Every hit uses its own client
+address, like the requests of many clients, and the shared storage is also measured with several processes hitting
+it at once.
+
+    python -m benchmarks.bench_rate_limiter --hits 200000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from benchmarks.bench_utils import print_results
+from challenge.utils.fastapi import shared_memory_storage  # noqa: F401, registers the shm scheme
+
+CLIENTS = 1000
+
+
+def measure_hit_microseconds(uri: str, strategy: str, hits: int) -> float:
+    storage = storage_from_string(uri)
+    rate_limiter = STRATEGIES[strategy](storage)
+    item = parse('1/20seconds')
+    start = time.perf_counter()
+    for i in range(hits):
+        rate_limiter.hit(item, f'10.0.{i % CLIENTS // 256}.{i % 256}', '/iss/sun')
+    return (time.perf_counter() - start) / hits * 1e6
+
+
+def hit(uri: str, strategy: str, hits: int, results) -> None:
+    results.put(measure_hit_microseconds(uri, strategy, hits))
+
+
+def measure_concurrent_hits_per_second(uri: str, strategy: str, hits: int, processes: int) -> float:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    hit_processes = [context.Process(target=hit, args=(uri, strategy, hits, results)) for _ in range(processes)]
+    for hit_process in hit_processes:
+        hit_process.start()
+    hits_per_second = sum(1e6 / results.get() for _ in hit_processes)
+    for hit_process in hit_processes:
+        hit_process.join()
+    return hits_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hits', type=int, default=200000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        shm_uri = f'shm://{os.path.join(directory, "benchmark.db.limits")}'
+        for name, uri, strategy in (('memory_fixed_window', 'memory://', 'fixed-window'),
+                                    ('shm_fixed_window', shm_uri, 'fixed-window'),
+                                    ('shm_sliding_window_counter', shm_uri, 'sliding-window-counter')):
+            results[name] = {'hit_us': measure_hit_microseconds(uri, strategy, args.hits)}
+            if uri != 'memory://':
+                results[name]['concurrent_hits_per_second'] = measure_concurrent_hits_per_second(
+                    uri, strategy, args.hits, args.processes)
+    print_results('rate_limiter', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
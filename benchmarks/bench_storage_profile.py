@@ -0,0 +1,108 @@
+"""
+Measures the mixed read/write throughput of the DB with and without the storage profile (WAL, PRAGMAs, dedicated
+writer engine and pooled read-only engine): one thread keeps writing IssPositions while other threads keep reading
+the last hour of positions.
+
+    python -m benchmarks.bench_storage_profile --rows 200000 --readers 4 --seconds 10
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_utils import create_benchmark_db, print_results, FIRST_TIMESTAMP
+from challenge.database.database import create_writer_engine, create_reader_engine
+from challenge.database.iss_crud import add_iss_positions, get_iss_position_columns, get_latest_iss_position
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+
+PROFILE_PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536, 'mmap_size': 268435456}
+
+
+def run_mixed_workload(writer_session_local: sessionmaker, reader_session_local: sessionmaker, readers: int,
+                       seconds: float, first_timestamp) -> dict:
+    stop = threading.Event()
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def write():
+        timestamp = first_timestamp
+        with writer_session_local() as db:
+            while not stop.is_set():
+                timestamp += timedelta(seconds=20)
+                try:
+                    add_iss_positions(db, [_get_iss_position(timestamp)])
+                    with lock:
+                        counts['writes'] += 1
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        counts['errors'] += 1
+
+    def read():
+        with reader_session_local() as db:
+            while not stop.is_set():
+                try:
+                    latest_iss_position = get_latest_iss_position(db)
+                    get_iss_position_columns(db, ('timestamp', 'daylight'), None, latest_iss_position.timestamp, 3600)
+                    db.rollback()
+                    with lock:
+                        counts['reads'] += 1
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        counts['errors'] += 1
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {'writes_per_second': counts['writes'] / seconds, 'reads_per_second': counts['reads'] / seconds,
+            'errors': counts['errors']}
+
+
+def _get_iss_position(timestamp) -> IssPosition:
+    return IssPosition(name='iss', satellite_id=25544, latitude=0, longitude=0, altitude=418.7, velocity=27581.1,
+                       visibility=Visibility.DAYLIGHT, footprint=4500.9, timestamp=timestamp, daynum=2460259.4,
+                       solar_lat=-17.3, solar_lon=187.6, units='kilometers')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_path = os.path.join(directory, 'seed.db')
+        create_benchmark_db(seed_path, args.rows).kw['bind'].dispose()
+        first_timestamp = FIRST_TIMESTAMP + timedelta(seconds=20 * args.rows)
+        results = {}
+        for profile in ('default', 'storage_profile'):
+            db_path = os.path.join(directory, f'{profile}.db')
+            shutil.copy(seed_path, db_path)
+            if profile == 'default':
+                writer_engine = reader_engine = create_writer_engine(db_path)
+            else:
+                writer_engine = create_writer_engine(db_path, PROFILE_PRAGMAS)
+                # As on startup, the writer sets the journal mode before the readers connect
+                writer_engine.connect().close()
+                reader_engine = create_reader_engine(db_path, PROFILE_PRAGMAS, pool_size=args.readers)
+            results[profile] = run_mixed_workload(sessionmaker(bind=writer_engine), sessionmaker(bind=reader_engine),
+                                                  args.readers, args.seconds, first_timestamp)
+            writer_engine.dispose()
+            reader_engine.dispose()
+    print_results('storage_profile', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Any
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from challenge.database.database import Base
+from challenge.database.models.models import IssPosition
+from challenge.database.models.visibility import Visibility
+
+FIRST_TIMESTAMP = datetime(2023, 11, 10)
+ORBIT_SECONDS = 92 * 60
+DAYLIGHT_RATIO = 0.6
+
+
+def create_benchmark_db(path: str, rows: int, wait_time: int = 20, batch_size: int = 50000) -> sessionmaker:
+    """
+    Creates a SQLite DB at the given path filled with the given number of IssPositions sampled every wait_time seconds
+    :param path: the path of the DB file
+    :param rows: the number of IssPositions
+    :param wait_time: the seconds between two IssPositions
+    :param batch_size: the number of IssPositions inserted per statement
+    :return: a sessionmaker bound to the DB
+    """
+    engine = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for first in range(0, rows, batch_size):
+            connection.execute(insert(IssPosition), [_get_iss_position_row(i, wait_time)
+                                                     for i in range(first, min(first + batch_size, rows))])
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _get_iss_position_row(i: int, wait_time: int) -> dict:
+    seconds = i * wait_time
+    daylight = (seconds % ORBIT_SECONDS) < ORBIT_SECONDS * DAYLIGHT_RATIO
+    return {'name': 'iss', 'satellite_id': 25544, 'latitude': 51.6 * ((seconds % ORBIT_SECONDS) / ORBIT_SECONDS - 0.5),
+            'longitude': (seconds * 0.0654) % 360 - 180, 'altitude': 418.7, 'velocity': 27581.1,
+            'visibility': Visibility.DAYLIGHT if daylight else Visibility.ECLIPSED, 'footprint': 4500.9,
+            'timestamp': FIRST_TIMESTAMP + timedelta(seconds=seconds), 'daynum': 2460259.4, 'solar_lat': -17.3,
+            'solar_lon': 187.6, 'units': 'kilometers'}
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> dict:
+    """
+    Measures the best wall time of the given function and its peak memory allocation
+    :param func: the function to measure
+    :param repeat: the number of timed runs
+    :return: a dict with the seconds and the peak memory in bytes
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(seconds), 'peak_memory_bytes': peak_memory}
+
+
+def print_results(benchmark: str, parameters: dict, results: dict) -> None:
+    """
+    Prints the results of a benchmark as JSON
+    :param benchmark: the name of the benchmark
+    :param parameters: the parameters of the run
+    :param results: the results
+    """
+    print(json.dumps({'benchmark': benchmark, 'parameters': parameters, 'results': results}, indent=2))
@@ -0,0 +1,242 @@
+"""
+Runs the benchmark suite over synthetic tracks of growing durations: the time windows algorithms, the CRUD queries
+behind /iss/sun and /iss/position, and full ASGI requests sent in-process with httpx, without a server. The results
+are written as JSON, and compared with the results of a previous run when a baseline is given.
+
+The generated DBs are deterministic, so they are kept in the data directory and reused by the next runs.
+
+    python -m benchmarks.run_suite --days 1 30 365 1825 --wait-time 20 --output results.json
+    python -m benchmarks.run_suite --days 1 30 --output new.json --baseline results.json --threshold 1.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Any
+
+import httpx
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_utils import FIRST_TIMESTAMP, print_results
+from benchmarks.synthetic_orbits import create_orbit_db
+from challenge.database.daylight_windows_crud import get_daylight_windows
+from challenge.database.iss_crud import get_iss_positions, get_iss_position_columns, get_latest_iss_position
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows, \
+    get_daylight_time_windows_vectorized
+
+
+def get_orbit_db(data_directory: str, days: float, wait_time: int, seed: int) -> sessionmaker:
+    """
+    Provides the DB of the given track, generating it only if it is not in the data directory yet
+    :param data_directory: the directory of the generated DBs
+    :param days: the duration of the track in days
+    :param wait_time: the seconds between two IssPositions
+    :param seed: the seed of the track
+    :return: a sessionmaker bound to the DB
+    """
+    path = os.path.join(data_directory, f'orbits_{days:g}d_{wait_time}s_seed{seed}.db')
+    if os.path.exists(path):
+        return sessionmaker(autocommit=False, autoflush=False,
+                            bind=create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False}))
+    # Written to a temporary name first, so that an interrupted load is never reused
+    session_local = create_orbit_db(path + '.tmp', days, wait_time, seed)
+    session_local.kw['bind'].dispose()
+    os.replace(path + '.tmp', path)
+    return get_orbit_db(data_directory, days, wait_time, seed)
+
+
+def time_calls(func: Callable[[], Any], repeat: int) -> dict:
+    """
+    Times the given function
+    :param func: the function to time
+    :param repeat: the number of timed runs, after one warm-up run
+    :return: a dict with the best and the median seconds
+    """
+    func()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return {'seconds': min(seconds), 'median_seconds': statistics.median(seconds)}
+
+
+def run_time_windows_benchmarks(session_local: sessionmaker, ranges: dict, repeat: int, max_orm_rows: int) -> dict:
+    results = {}
+    with session_local() as db:
+        for range_name, (start_time, end_time) in ranges.items():
+            timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time)
+            results[f'vectorized_{range_name}'] = {
+                **time_calls(lambda: get_daylight_time_windows_vectorized(timestamps, daylight), repeat),
+                'rows': len(timestamps)}
+            # The reference implementation walks the ORM objects one by one, it is skipped on the largest ranges
+            if len(timestamps) <= max_orm_rows:
+                iss_positions = get_iss_positions(db, start_time, end_time)
+                results[f'reference_{range_name}'] = {
+                    **time_calls(lambda: get_daylight_time_windows(iss_positions), repeat), 'rows': len(timestamps)}
+    return results
+
+
+def run_crud_benchmarks(session_local: sessionmaker, ranges: dict, repeat: int, max_orm_rows: int) -> dict:
+    results = {}
+    with session_local() as db:
+        results['get_latest_iss_position'] = time_calls(lambda: get_latest_iss_position(db), repeat)
+        for range_name, (start_time, end_time) in ranges.items():
+            rows = len(get_iss_position_columns(db, ('timestamp',), start_time, end_time)[0])
+            results[f'get_iss_position_columns_{range_name}'] = {**time_calls(
+                lambda: get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time), repeat),
+                'rows': rows}
+            results[f'get_daylight_windows_{range_name}'] = time_calls(
+                lambda: get_daylight_windows(db, start_time, end_time), repeat)
+            if rows <= max_orm_rows:
+                results[f'get_iss_positions_{range_name}'] = {**time_calls(
+                    lambda: get_iss_positions(db, start_time, end_time), repeat), 'rows': rows}
+            db.rollback()
+    return results
+
+
+async def run_asgi_benchmarks(session_local: sessionmaker, ranges: dict, requests: int) -> dict:
+    # Imported here, as importing the app sets up the configured DB
+    from challenge.fastapi_main import app
+    from challenge.routers import iss_router
+    from challenge.utils.fastapi.fastapi_utils import limiter, time_windows_cache
+
+    def get_benchmark_db():
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[iss_router._get_db] = get_benchmark_db
+    limiter.enabled = False
+    daylight_windows_table_enabled = iss_router.daylight_windows_table_enabled
+    results = {}
+    # Without lifespan, the IssPosition buffers stay empty and every request reads the DB
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark') as client:
+        try:
+            results['position'] = await _time_requests(client, '/iss/position', requests)
+            for range_name, (start_time, end_time) in ranges.items():
+                url = f'/iss/sun?start_time={start_time.isoformat()}&end_time={end_time.isoformat()}'
+                for source, table_enabled in (('daylight_windows', True), ('positions', False)):
+                    iss_router.daylight_windows_table_enabled = table_enabled
+                    results[f'sun_{source}_{range_name}'] = await _time_requests(client, url, requests,
+                                                                                 time_windows_cache)
+                if time_windows_cache:
+                    results[f'sun_cached_{range_name}'] = await _time_requests(client, url, requests)
+        finally:
+            iss_router.daylight_windows_table_enabled = daylight_windows_table_enabled
+            app.dependency_overrides.pop(iss_router._get_db)
+    return results
+
+
+async def _time_requests(client: httpx.AsyncClient, url: str, requests: int, cache_to_clear=None) -> dict:
+    await client.get(url)
+    seconds = []
+    for _ in range(requests):
+        if cache_to_clear:
+            cache_to_clear.clear()
+        start = time.perf_counter()
+        response = await client.get(url)
+        seconds.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return {'seconds': min(seconds), 'median_seconds': statistics.median(seconds),
+            'p95_seconds': float(np.percentile(seconds, 95)), 'response_bytes': len(response.content)}
+
+
+def get_ranges(days: float) -> dict:
+    """
+    Provides the queried ranges of a track: its last day and the whole track
+    :param days: the duration of the track in days
+    :return: a dict of range names to start and end times
+    """
+    end_time = FIRST_TIMESTAMP + timedelta(days=days)
+    ranges = {'last_day': (end_time - timedelta(days=1), end_time)}
+    if days > 1:
+        ranges['full'] = (FIRST_TIMESTAMP, end_time)
+    return ranges
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Compares the best seconds of every benchmark with the ones of a baseline run
+    :param results: the results of this run
+    :param baseline: the results of the baseline run
+    :param threshold: the ratio of seconds above which a benchmark is reported as a regression
+    :return: a List of the regressions, with the baseline and current seconds and their ratio
+    """
+    current_seconds = _get_seconds(results['results'])
+    baseline_seconds = _get_seconds(baseline['results'])
+    regressions = []
+    for name in sorted(current_seconds.keys() & baseline_seconds.keys()):
+        ratio = current_seconds[name] / baseline_seconds[name] if baseline_seconds[name] else float('inf')
+        if ratio > threshold:
+            regressions.append({'benchmark': name, 'baseline_seconds': baseline_seconds[name],
+                                'seconds': current_seconds[name], 'ratio': ratio})
+    return regressions
+
+
+def _get_seconds(results: dict, prefix: str = '') -> dict:
+    seconds = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            seconds.update(_get_seconds(value, f'{prefix}{key}.'))
+        elif key == 'seconds':
+            seconds[prefix[:-1]] = value
+    return seconds
+
+
+def get_environment() -> dict:
+    return {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(),
+            'date': datetime.now().isoformat(timespec='seconds')}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=float, nargs='+', default=[1, 30, 365])
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--max-orm-rows', type=int, default=1000000)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'iss_tracker_benchmarks'))
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = {}
+    for days in args.days:
+        start = time.perf_counter()
+        session_local = get_orbit_db(args.data_dir, days, args.wait_time, args.seed)
+        load_seconds = time.perf_counter() - start
+        ranges = get_ranges(days)
+        results[f'{days:g}d'] = {
+            'load_seconds': load_seconds,
+            'time_windows': run_time_windows_benchmarks(session_local, ranges, args.repeat, args.max_orm_rows),
+            'crud': run_crud_benchmarks(session_local, ranges, args.repeat, args.max_orm_rows),
+            'asgi': asyncio.run(run_asgi_benchmarks(session_local, ranges, args.requests))}
+        session_local.kw['bind'].dispose()
+    report = {'benchmark': 'suite', 'parameters': vars(args), 'environment': get_environment(), 'results': results}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['regressions'] = compare(report, json.load(baseline_file), args.threshold)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    print_results('suite', vars(args), {key: value for key, value in report.items()
+                                        if key not in ('benchmark', 'parameters')})
+
+
+if __name__ == '__main__':
+    main()
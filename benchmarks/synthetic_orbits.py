@@ -0,0 +1,141 @@
+"""
+Deterministic generator of realistic ISS tracks for the benchmarks. Every orbit lasts about 92 minutes and starts with
+its daylight part, about 60% of the orbit, followed by the eclipse. The period and the daylight ratio of every orbit
+are slightly jittered by a seeded random generator, so that a given seed always provides the same track.
+
+    python -m benchmarks.synthetic_orbits --days 365 --wait-time 20 --path /tmp/orbits.db
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import create_engine, event, Connection, Table
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_utils import FIRST_TIMESTAMP, ORBIT_SECONDS, DAYLIGHT_RATIO, print_results
+from challenge.database.database import Base
+from challenge.database.models.models import IssPosition, DaylightWindow
+from challenge.database.models.visibility import Visibility
+
+ISS_SATELLITE_ID = 25544
+INCLINATION = 51.6
+SIDEREAL_DAY_SECONDS = 86164
+ORBIT_JITTER_SECONDS = 10
+DAYLIGHT_RATIO_JITTER = 0.03
+
+
+def iter_orbit_rows(days: float, wait_time: int = 20, seed: int = 0, satellite_id: int = ISS_SATELLITE_ID,
+                    first_timestamp: datetime = FIRST_TIMESTAMP) -> Iterator[dict]:
+    """
+    Generates the IssPositions of a track sampled every wait_time seconds
+    :param days: the duration of the track in days
+    :param wait_time: the seconds between two IssPositions
+    :param seed: the seed of the jitter of the orbits
+    :param satellite_id: the id of the satellite
+    :param first_timestamp: the timestamp of the first IssPosition
+    :return: an Iterator of IssPosition rows as dicts, sorted by timestamp
+    """
+    rng = random.Random(seed)
+    orbit_start = 0
+    orbit_seconds, daylight_seconds = _get_next_orbit(rng)
+    for i in range(int(days * 86400 // wait_time)):
+        seconds = i * wait_time
+        while seconds >= orbit_start + orbit_seconds:
+            orbit_start += orbit_seconds
+            orbit_seconds, daylight_seconds = _get_next_orbit(rng)
+        orbit_phase = (seconds - orbit_start) / orbit_seconds
+        daylight = seconds - orbit_start < daylight_seconds
+        yield {'name': 'iss', 'satellite_id': satellite_id,
+               'latitude': INCLINATION * math.sin(2 * math.pi * orbit_phase),
+               # The ground track moves east with the orbit and west with the rotation of the Earth
+               'longitude': (360 * seconds / ORBIT_SECONDS - 360 * seconds / SIDEREAL_DAY_SECONDS) % 360 - 180,
+               'altitude': 418.7 + 2 * math.sin(2 * math.pi * orbit_phase), 'velocity': 27581.1,
+               'visibility': Visibility.DAYLIGHT if daylight else Visibility.ECLIPSED, 'footprint': 4500.9,
+               'timestamp': first_timestamp + timedelta(seconds=seconds), 'daynum': 2460259.4 + seconds / 86400,
+               'solar_lat': -17.3, 'solar_lon': 187.6, 'units': 'kilometers'}
+
+
+def create_orbit_db(path: str, days: float, wait_time: int = 20, seed: int = 0, satellite_id: int = ISS_SATELLITE_ID,
+                    batch_size: int = 50000) -> sessionmaker:
+    """
+    Creates a SQLite DB at the given path and bulk loads a generated track into it, along with its daylight windows.
+    The windows are derived while the rows are streamed, so that long tracks are never held in memory
+    :param path: the path of the DB file
+    :param days: the duration of the track in days
+    :param wait_time: the seconds between two IssPositions
+    :param seed: the seed of the jitter of the orbits
+    :param satellite_id: the id of the satellite
+    :param batch_size: the number of IssPositions inserted per statement
+    :return: a sessionmaker bound to the DB
+    """
+    engine = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, 'connect')
+    def set_bulk_load_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=OFF')
+        cursor.execute('PRAGMA synchronous=OFF')
+        cursor.close()
+
+    Base.metadata.create_all(bind=engine)
+    daylight_windows = []
+    open_window = None
+    batch = []
+    with engine.begin() as connection:
+        for row in iter_orbit_rows(days, wait_time, seed, satellite_id):
+            daylight = row['visibility'] == Visibility.DAYLIGHT
+            if daylight and open_window is None:
+                open_window = {'satellite_id': satellite_id, 'start_time': row['timestamp'], 'end_time': None}
+                daylight_windows.append(open_window)
+            elif not daylight and open_window is not None:
+                open_window['end_time'] = row['timestamp']
+                open_window = None
+            batch.append(row)
+            if len(batch) == batch_size:
+                _insert_rows(connection, IssPosition.__table__, batch)
+                batch = []
+        _insert_rows(connection, IssPosition.__table__, batch)
+        _insert_rows(connection, DaylightWindow.__table__, daylight_windows)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _insert_rows(connection: Connection, table: Table, rows: list[dict]) -> None:
+    # Straight to the driver's executemany, with the values converted by the bind processors of the column types, as
+    # the ORM insert spends most of the load time building the parameters
+    if not rows:
+        return
+    columns = list(rows[0])
+    processors = [table.c[column].type.bind_processor(connection.dialect) for column in columns]
+    statement = f'INSERT INTO {table.name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    connection.exec_driver_sql(statement, [tuple(processor(row[column]) if processor else row[column]
+                                                 for column, processor in zip(columns, processors))
+                                           for row in rows])
+
+
+def _get_next_orbit(rng: random.Random) -> tuple[float, float]:
+    orbit_seconds = ORBIT_SECONDS + rng.uniform(-ORBIT_JITTER_SECONDS, ORBIT_JITTER_SECONDS)
+    return orbit_seconds, orbit_seconds * (DAYLIGHT_RATIO + rng.uniform(-DAYLIGHT_RATIO_JITTER, DAYLIGHT_RATIO_JITTER))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=float, default=1)
+    parser.add_argument('--wait-time', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--path', required=True)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    session_local = create_orbit_db(args.path, args.days, args.wait_time, args.seed)
+    seconds = time.perf_counter() - start
+    with session_local() as db:
+        rows = db.query(IssPosition).count()
+        windows = db.query(DaylightWindow).count()
+    print_results('synthetic_orbits', vars(args), {'rows': rows, 'daylight_windows': windows, 'seconds': seconds,
+                                                   'rows_per_second': rows / seconds})
+
+
+if __name__ == '__main__':
+    main()
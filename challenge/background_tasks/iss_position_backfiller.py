@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from challenge.database.daylight_windows_crud import rebuild_daylight_windows
+from challenge.database.database import SessionLocal, run_in_db_writer_executor
+from challenge.database.iss_crud import add_iss_positions, get_iss_position_gaps, get_latest_iss_position
+from challenge.database.schemas import IssPosition
+from challenge.utils.config.config_utils import ConfigUtils
+from challenge.utils.requests.host_rate_limiter import HostRateLimiter
+from challenge.utils.requests.requests_utils import get
+
+logger = logging.getLogger(__name__)
+
+
+class IssPositionBackfiller:
+    """
+    Fills the gaps left in the iss_positions table by restarts and upstream outages. The missing timestamps are
+    requested in batches to the bulk positions endpoint, concurrently, and stored at once with the daylight windows of
+    the satellite rebuilt around them
+    """
+    __slots__ = ['db', 'headers', 'wait_time', 'satellite_ids', 'positions_url_template', 'batch_size', 'max_age',
+                 'index_cells', 'host_rate_limiter', '_semaphore']
+
+    def __init__(self, db: SessionLocal, headers: dict = None, wait_time: int = -1,
+                 config_utils: ConfigUtils = ConfigUtils(), satellite_ids: list[int] = None,
+                 positions_url_template: str = None, batch_size: int = None):
+        """
+        :param db: the db
+        :param headers: the headers to be used for the GET requests
+        :param wait_time: the wait time between two IssPositions
+        :param config_utils: the ConfigUtils object
+        :param satellite_ids: the ids of the satellites to backfill. If None, the configured ones are backfilled
+        :param positions_url_template: the URL template of the bulk positions endpoint, with a {satellite_id} and a
+        {timestamps} field
+        :param batch_size: the number of timestamps requested at once
+        """
+        self.db = db
+        self.headers = headers if headers else {"User-Agent": config_utils.get_user_agent()}
+        self.wait_time = wait_time if type(wait_time) is int and wait_time > 0 else config_utils.get_wait_time()
+        self.satellite_ids = satellite_ids if satellite_ids else config_utils.get_satellite_ids()
+        self.positions_url_template = positions_url_template if positions_url_template else \
+            config_utils.get_satellite_positions_url_template()
+        self.batch_size = batch_size if batch_size else config_utils.get_backfill_batch_size()
+        # Older IssPositions are compacted by the retention job anyway
+        self.max_age = config_utils.get_backfill_max_age()
+        rollup_tiers = config_utils.get_rollup_tiers() if config_utils.get_retention_enabled() else []
+        if rollup_tiers:
+            self.max_age = min(self.max_age, rollup_tiers[0][0])
+        self.index_cells = config_utils.get_spatial_index_enabled()
+        self.host_rate_limiter = HostRateLimiter(config_utils.get_host_requests_per_second())
+        self._semaphore = asyncio.Semaphore(config_utils.get_max_concurrent_requests())
+
+    async def backfill(self, start_time: datetime = None, end_time: datetime = None) -> int:
+        """
+        Backfills the gaps of every satellite between the given start and end times. A gap is a time between two
+        consecutive IssPositions where at least one poll is missing
+        :param start_time: the start time. If None, it'll be the end time - the maximum age of the gaps to backfill
+        :param end_time: the end time. If None, it'll be now time
+        :return: the number of IssPositions added
+        """
+        end_time = end_time or datetime.now()
+        start_time = start_time or end_time - timedelta(seconds=self.max_age)
+        added = 0
+        async with aiohttp.ClientSession(headers=self.headers) as session:
+            for satellite_id in self.satellite_ids:
+                try:
+                    added += await self._backfill_satellite(session, satellite_id, start_time, end_time)
+                except Exception as e:
+                    logger.error("Could not backfill the IssPositions of the satellite %s: %s", satellite_id, e)
+        return added
+
+    async def _backfill_satellite(self, session: aiohttp.ClientSession, satellite_id: int, start_time: datetime,
+                                  end_time: datetime) -> int:
+        missing_timestamps = await run_in_db_writer_executor(self._get_missing_timestamps, satellite_id, start_time,
+                                                             end_time)
+        if not missing_timestamps:
+            return 0
+        logger.info("Backfilling %s IssPositions of the satellite %s", len(missing_timestamps), satellite_id)
+        jsons = await asyncio.gather(*[self._get_iss_positions_json(session, satellite_id,
+                                                                    missing_timestamps[first:first + self.batch_size])
+                                       for first in range(0, len(missing_timestamps), self.batch_size)])
+        # A failed batch is either None or the error object of the API
+        iss_positions = [IssPosition.from_json(json) for batch_jsons in jsons if isinstance(batch_jsons, list)
+                         for json in batch_jsons]
+        return await run_in_db_writer_executor(self._store_iss_positions, satellite_id, iss_positions)
+
+    def _get_missing_timestamps(self, satellite_id: int, start_time: datetime, end_time: datetime) -> list[int]:
+        # A gap misses at least one poll; half a wait time of tolerance absorbs the jitter of the polls
+        min_gap_seconds = self.wait_time * 1.5
+        gaps = get_iss_position_gaps(self.db, satellite_id, min_gap_seconds, start_time, end_time)
+        latest_iss_position = get_latest_iss_position(self.db, satellite_id)
+        if latest_iss_position and start_time <= latest_iss_position.timestamp and (
+                end_time - latest_iss_position.timestamp).total_seconds() > min_gap_seconds:
+            gaps.append((latest_iss_position.timestamp, end_time))
+        self.db.rollback()
+        missing_timestamps = []
+        wait_time = timedelta(seconds=self.wait_time)
+        for previous_timestamp, next_timestamp in gaps:
+            timestamp = previous_timestamp + wait_time
+            while timestamp <= next_timestamp - wait_time:
+                missing_timestamps.append(int(timestamp.timestamp()))
+                timestamp += wait_time
+        return missing_timestamps
+
+    async def _get_iss_positions_json(self, session: aiohttp.ClientSession, satellite_id: int,
+                                      timestamps: list[int]) -> list[dict]:
+        url = self.positions_url_template.format(satellite_id=satellite_id,
+                                                 timestamps=','.join(str(timestamp) for timestamp in timestamps))
+        async with self._semaphore:
+            await self.host_rate_limiter.acquire(url)
+            return await get(url, session)
+
+    def _store_iss_positions(self, satellite_id: int, iss_positions: list[IssPosition]) -> int:
+        try:
+            added_iss_positions = add_iss_positions(self.db, iss_positions, commit=False,
+                                                    index_cells=self.index_cells)
+            if added_iss_positions:
+                # Only the windows around the backfilled IssPositions change
+                timestamps = [iss_position.timestamp for iss_position in added_iss_positions]
+                rebuild_daylight_windows(self.db, satellite_id, min(timestamps), max(timestamps))
+            else:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        logger.info("Backfilled %s IssPositions of the satellite %s", len(added_iss_positions), satellite_id)
+        return len(added_iss_positions)
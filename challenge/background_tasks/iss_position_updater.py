@@ -1,65 +1,115 @@
 import asyncio
 import logging
-import aioschedule
+from collections import Counter
+from typing import Callable
+from urllib.parse import urlsplit
 import aiohttp
 
+from challenge.background_tasks.iss_position_writer import IssPositionWriter
 from challenge.database.database import SessionLocal
-from challenge.database.iss_crud import add_iss_position
 from challenge.database.schemas import IssPosition
 from challenge.utils.config.config_utils import ConfigUtils
+from challenge.utils.metrics.iss_metrics import mark_successful_poll
+from challenge.utils.requests.host_rate_limiter import HostRateLimiter
 from challenge.utils.requests.requests_utils import get
+from challenge.utils.scheduling.poll_scheduler import PollScheduler
 
 logger = logging.getLogger(__name__)
 
 
 class IssPositionUpdater:
     """
-    The ISS Position updater
+    The ISS Position updater. It polls the positions of all the tracked satellites every wait time, spread across the
+    poll ticks of the wait time so that the requests of a tick are not delayed by the host rate limit: a poll takes
+    the latency of one request whatever the number of satellites
     """
-    __slots__ = ['db', '_session', 'headers', 'wait_time', 'iss_position_url', 'stop_schedule']
+    __slots__ = ['db', '_session', 'headers', 'wait_time', 'iss_position_urls', 'stop_schedule', 'iss_position_writer',
+                 'host_rate_limiter', 'poll_slices', 'poll_scheduler', '_next_slice', '_semaphore']
 
     def __init__(self, db: SessionLocal, headers: dict = None, wait_time: int = -1, iss_position_url: str = None,
-                 config_utils: ConfigUtils = ConfigUtils()):
+                 config_utils: ConfigUtils = ConfigUtils(),
+                 position_listeners: list[Callable[[IssPosition], None]] = None,
+                 iss_position_writer: IssPositionWriter = None, satellite_ids: list[int] = None):
 
         """
         :param db: the db
         :param headers: the headers to be used for the GET request to get the ISS position
         :param wait_time: the wait time between requests
-        :param iss_position_url: the URL to send a GET request to in order to get the ISS position
+        :param iss_position_url: the URL to send a GET request to in order to get the ISS position. If provided, it's
+        the only polled URL
         :param config_utils the ConfigUtils object
+        :param position_listeners: the callables to be notified with every IssPosition added to the DB. Ignored if
+        iss_position_writer is provided
+        :param iss_position_writer: the IssPositionWriter that stores the IssPositions
+        :param satellite_ids: the ids of the satellites to track. If None, the configured ones are tracked
         """
         self._session = None
         self.headers = headers if headers else self._get_default_headers(config_utils)
-        self.iss_position_url = iss_position_url if iss_position_url else config_utils.get_iss_position_url()
+        self.iss_position_urls = [iss_position_url] if iss_position_url else self._get_satellite_urls(
+            config_utils, satellite_ids)
         self.wait_time = wait_time if self._is_wait_time_valid(wait_time) else config_utils.get_wait_time()
         self.db = db
         self.stop_schedule = False
+        self.iss_position_writer = iss_position_writer if iss_position_writer else IssPositionWriter(
+            db, position_listeners=position_listeners)
+        self.host_rate_limiter = HostRateLimiter(config_utils.get_host_requests_per_second())
+        if self.host_rate_limiter.get_spread_seconds(self.iss_position_urls) >= self.wait_time:
+            logger.warning("The %s polled satellites cannot be requested within the wait time of %s seconds at %s "
+                           "requests per second: raise host_requests_per_second", len(self.iss_position_urls),
+                           self.wait_time, self.host_rate_limiter.requests_per_second)
+        self._semaphore = asyncio.Semaphore(config_utils.get_max_concurrent_requests())
+        self.poll_slices = self._get_poll_slices(self.iss_position_urls, self.wait_time,
+                                                 self.host_rate_limiter.requests_per_second)
+        self._next_slice = 0
+        self.poll_scheduler = PollScheduler(self.wait_time / len(self.poll_slices))
 
     async def run_iss_update_position_schedule(self) -> None:
         """
-        Runs update_iss_position() once and then schedules it to run every 20 seconds
+        Runs update_iss_position() once and then at every poll tick, len(poll_slices) of them every wait_time seconds,
+        until stop_schedule is set or the task is cancelled
         """
         async with aiohttp.ClientSession(headers=self.headers) as self._session:
-            await self.update_iss_position()
-            aioschedule.every(self.wait_time).seconds.do(self.update_iss_position)
-            while not self.stop_schedule:
-                await aioschedule.run_pending()
-                await asyncio.sleep(0.05)
+            await self.poll_scheduler.run(self.update_iss_position, lambda: self.stop_schedule)
 
     async def update_iss_position(self) -> None:
         """
-        Requests an external API for the ISS position and updates the DB with the latest ISS position
+        Requests an external API for the positions of the satellites of the next poll slice at once and hands them to
+        the IssPositionWriter in a single batch, which stores them with the daylight windows they open or close
         """
-        json = await get(self.iss_position_url, self._session)
-        if json:
-            iss_position = IssPosition.from_json(json)
-            add_iss_position(self.db, iss_position)
-            logger.debug("Updated ISS Position: %s", json)
+        poll_slice = self.poll_slices[self._next_slice]
+        self._next_slice = (self._next_slice + 1) % len(self.poll_slices)
+        jsons = await asyncio.gather(*[self._get_iss_position_json(url) for url in poll_slice])
+        iss_positions = [IssPosition.from_json(json) for json in jsons if json]
+        if iss_positions:
+            mark_successful_poll()
+            await self.iss_position_writer.add(iss_positions)
+            logger.debug("Updated %s ISS Positions", len(iss_positions))
+
+    async def _get_iss_position_json(self, url: str) -> dict:
+        async with self._semaphore:
+            await self.host_rate_limiter.acquire(url)
+            return await get(url, self._session)
 
     @staticmethod
     def _get_default_headers(config_utils: ConfigUtils) -> dict:
         return {"User-Agent": config_utils.get_user_agent()}
 
+    @staticmethod
+    def _get_satellite_urls(config_utils: ConfigUtils, satellite_ids: list[int] = None) -> list[str]:
+        url_template = config_utils.get_satellite_url_template()
+        return [url_template.format(satellite_id=satellite_id) for satellite_id in
+                (satellite_ids if satellite_ids else config_utils.get_satellite_ids())]
+
+    @staticmethod
+    def _get_poll_slices(urls: list[str], wait_time: int, requests_per_second: float) -> list[list[str]]:
+        # One request per host and tick as long as the ticks are at least one rate slot apart, otherwise as many ticks
+        # as the rate allows within the wait time
+        if requests_per_second <= 0:
+            return [urls]
+        max_host_urls = max(Counter(urlsplit(url).netloc for url in urls).values())
+        slices = max(1, min(max_host_urls, int(wait_time * requests_per_second)))
+        return [urls[i::slices] for i in range(slices)]
+
     @staticmethod
     def _is_wait_time_valid(wait_time) -> bool:
         return type(wait_time) is int and wait_time > 0
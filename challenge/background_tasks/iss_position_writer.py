@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from challenge.database.daylight_windows_crud import update_daylight_windows
+from challenge.database.database import SessionLocal, run_in_db_writer_executor
+from challenge.database.iss_crud import add_iss_positions
+from challenge.database.schemas import IssPosition
+from challenge.utils.metrics.iss_metrics import store_seconds, stored_positions, dropped_positions
+
+logger = logging.getLogger(__name__)
+
+
+class IssPositionWriter:
+    """
+    Write-behind buffer of the ingest path: it collects IssPositions and stores them in one transaction when
+    batch_size IssPositions are pending or flush_interval seconds after the first pending one. While the DB keeps
+    failing, at most max_pending IssPositions are kept, the oldest ones being dropped
+    """
+    __slots__ = ['db', 'batch_size', 'flush_interval', 'max_pending', 'index_cells', 'position_listeners', '_pending',
+                 '_flush_lock', '_flush_task']
+
+    def __init__(self, db: SessionLocal, batch_size: int = 50, flush_interval: float = 0,
+                 position_listeners: list[Callable[[IssPosition], None]] = None, max_pending: int = 10000,
+                 index_cells: bool = True):
+        """
+        :param db: the db
+        :param batch_size: the number of pending IssPositions that triggers a flush
+        :param flush_interval: the maximum time in seconds an IssPosition stays pending
+        :param position_listeners: the callables to be notified with every IssPosition added to the DB
+        :param max_pending: the maximum number of pending IssPositions
+        :param index_cells: whether to add the cells of the stored IssPositions to the iss_position_cells table
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.index_cells = index_cells
+        self.position_listeners = position_listeners if position_listeners else []
+        self._pending = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+
+    async def add(self, iss_positions: list[IssPosition]) -> None:
+        """
+        Adds the given IssPositions to the pending ones, flushing them if the batch is full
+        :param iss_positions: the IssPositions
+        """
+        self._pending.extend(iss_positions)
+        self._drop_oldest_pending()
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._pending and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> list[IssPosition]:
+        """
+        Stores the pending IssPositions in one transaction and notifies the position listeners of the added ones.
+        If the transaction fails, the IssPositions stay pending for the next flush, up to max_pending of them
+        :return: the IssPositions that have been added
+        """
+        async with self._flush_lock:
+            iss_positions, self._pending = sorted(self._pending, key=lambda position: position.timestamp), []
+            if not iss_positions:
+                return []
+            try:
+                added_iss_positions = await run_in_db_writer_executor(self._store_iss_positions, iss_positions)
+            except Exception as e:
+                logger.error('Could not store %s IssPositions. Will retry at next flush. Error: %s',
+                             len(iss_positions), e)
+                self._pending = iss_positions + self._pending
+                self._drop_oldest_pending()
+                return []
+        logger.debug("Stored %s new IssPositions out of %s", len(added_iss_positions), len(iss_positions))
+        for iss_position in added_iss_positions:
+            for position_listener in self.position_listeners:
+                position_listener(iss_position)
+        return added_iss_positions
+
+    async def drain(self) -> None:
+        """
+        Flushes the pending IssPositions, e.g. on shutdown
+        """
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+            self._flush_task = None
+            await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    def _drop_oldest_pending(self) -> None:
+        dropped = len(self._pending) - self.max_pending
+        if dropped > 0:
+            # The gaps they leave are filled by the next backfill
+            self._pending = sorted(self._pending, key=lambda position: position.timestamp)[dropped:]
+            dropped_positions.inc(dropped)
+            logger.warning('Dropped the %s oldest pending IssPositions, over the maximum of %s', dropped,
+                           self.max_pending)
+
+    def _store_iss_positions(self, iss_positions: list[IssPosition]) -> list[IssPosition]:
+        store_start = time.perf_counter()
+        try:
+            added_iss_positions = add_iss_positions(self.db, iss_positions, commit=False,
+                                                    index_cells=self.index_cells)
+            update_daylight_windows(self.db, added_iss_positions)
+        except Exception:
+            self.db.rollback()
+            raise
+        store_seconds.observe(time.perf_counter() - store_start)
+        stored_positions.inc(len(added_iss_positions))
+        return added_iss_positions
@@ -0,0 +1,94 @@
+import logging
+from datetime import datetime, timedelta
+
+from challenge.database.database import SessionLocal, run_in_db_writer_executor
+from challenge.database.retention_crud import COMPACTED_MODELS, compact_iss_position_batch, purge_iss_position_batch, \
+    purge_daylight_windows
+from challenge.utils.config.config_utils import ConfigUtils
+from challenge.utils.scheduling.poll_scheduler import PollScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """
+    Background job that compacts the old IssPositions into rollups, tier by tier, and deletes the ones past the
+    maximum age, so that the DB and the scans of long ranges do not grow without bound
+    """
+    __slots__ = ['db', 'rollup_tiers', 'max_age', 'batch_size', 'interval', 'stop_schedule', 'poll_scheduler']
+
+    def __init__(self, db: SessionLocal, rollup_tiers: list[tuple[int, int]] = None, max_age: int = None,
+                 batch_size: int = None, interval: int = None, config_utils: ConfigUtils = ConfigUtils()):
+        """
+        :param db: the db
+        :param rollup_tiers: the (age in seconds, resolution in seconds) tiers of the rollups
+        :param max_age: the age in seconds after which the IssPositions are deleted, 0 to keep them forever
+        :param batch_size: the number of IssPositions compacted in one transaction
+        :param interval: the time in seconds between two runs
+        :param config_utils: the ConfigUtils object
+        """
+        self.db = db
+        self.rollup_tiers = sorted(rollup_tiers if rollup_tiers is not None else config_utils.get_rollup_tiers())
+        self.max_age = max_age if max_age is not None else config_utils.get_retention_max_age()
+        self.batch_size = batch_size if batch_size else config_utils.get_retention_batch_size()
+        self.interval = interval if interval else config_utils.get_retention_interval()
+        self.stop_schedule = False
+        self.poll_scheduler = PollScheduler(self.interval)
+
+    async def run_retention_schedule(self) -> None:
+        """
+        Runs apply_retention() once and then every interval seconds, until stop_schedule is set or the task is cancelled
+        """
+        await self.poll_scheduler.run(self.apply_retention, lambda: self.stop_schedule)
+
+    async def apply_retention(self, now: datetime = None) -> int:
+        """
+        Compacts the IssPositions of every tier, then deletes the ones older than the maximum age, on the DB writer
+        executor, so that the compaction is serialized with the ingest writes. Every batch is submitted on its own, so
+        that the writes queued meanwhile run between two batches instead of waiting for the whole compaction
+        :param now: the current time, used to compute the horizon of every tier
+        :return: the number of IssPositions dropped or deleted
+        """
+        now = now or datetime.now()
+        dropped = 0
+        for age, resolution in self.rollup_tiers:
+            try:
+                dropped += await self._compact_iss_positions(now - timedelta(seconds=age), resolution)
+            except Exception as e:
+                logger.error("Could not compact the IssPositions to a %s seconds resolution: %s", resolution, e)
+                await run_in_db_writer_executor(self.db.rollback)
+        if self.max_age:
+            try:
+                dropped += await self._purge_iss_positions(now - timedelta(seconds=self.max_age))
+            except Exception as e:
+                logger.error("Could not delete the IssPositions older than %s seconds: %s", self.max_age, e)
+                await run_in_db_writer_executor(self.db.rollback)
+        return dropped
+
+    async def _compact_iss_positions(self, horizon: datetime, resolution: int) -> int:
+        dropped = 0
+        for model in COMPACTED_MODELS:
+            while True:
+                compacted, batch_dropped = await run_in_db_writer_executor(compact_iss_position_batch, self.db, model,
+                                                                           horizon, resolution, self.batch_size)
+                if not compacted:
+                    break
+                dropped += batch_dropped
+        if dropped:
+            logger.info("Compacted %s IssPositions older than %s to a %s seconds resolution", dropped, horizon,
+                        resolution)
+        return dropped
+
+    async def _purge_iss_positions(self, horizon: datetime) -> int:
+        purged = 0
+        for model in COMPACTED_MODELS:
+            while True:
+                batch_purged = await run_in_db_writer_executor(purge_iss_position_batch, self.db, model, horizon,
+                                                               self.batch_size)
+                if not batch_purged:
+                    break
+                purged += batch_purged
+        await run_in_db_writer_executor(purge_daylight_windows, self.db, horizon)
+        if purged:
+            logger.info("Deleted %s IssPositions older than %s", purged, horizon)
+        return purged
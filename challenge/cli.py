@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from challenge.background_tasks.iss_position_backfiller import IssPositionBackfiller
+from challenge.database.daylight_windows_crud import rebuild_daylight_windows, check_daylight_windows
+from challenge.database.position_cells_crud import rebuild_iss_position_cells
+from challenge.utils.fastapi.fastapi_utils import set_up_db, get_lifespan_db
+
+logger = logging.getLogger(__name__)
+
+
+def _rebuild_daylight_windows(args: argparse.Namespace) -> int:
+    db = get_lifespan_db()
+    try:
+        print(f"Rebuilt {rebuild_daylight_windows(db)} daylight windows")
+        return 0
+    finally:
+        db.close()
+
+
+def _check_daylight_windows(args: argparse.Namespace) -> int:
+    db = get_lifespan_db()
+    try:
+        consistent = check_daylight_windows(db, args.start_time, args.end_time)
+        print("The daylight_windows table is consistent" if consistent else
+              "The daylight_windows table is NOT consistent: run rebuild-daylight-windows")
+        return 0 if consistent else 1
+    finally:
+        db.close()
+
+
+def _rebuild_position_cells(args: argparse.Namespace) -> int:
+    db = get_lifespan_db()
+    try:
+        print(f"Indexed the cells of {rebuild_iss_position_cells(db)} IssPositions")
+        return 0
+    finally:
+        db.close()
+
+
+def _backfill(args: argparse.Namespace) -> int:
+    db = get_lifespan_db()
+    try:
+        added = asyncio.run(IssPositionBackfiller(db).backfill(args.start_time, args.end_time))
+        print(f"Backfilled {added} IssPositions")
+        return 0
+    finally:
+        db.close()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Provides the parser of the maintenance commands
+    :return: the ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog='python -m challenge.cli', description='ISS Tracker maintenance commands')
+    subparsers = parser.add_subparsers(required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild-daylight-windows',
+                                           help='Regenerates the daylight_windows table from iss_positions')
+    rebuild_parser.set_defaults(command=_rebuild_daylight_windows)
+
+    check_parser = subparsers.add_parser('check-daylight-windows',
+                                         help='Checks the daylight_windows table against get_daylight_time_windows')
+    check_parser.add_argument('--start-time', type=datetime.fromisoformat, default=None)
+    check_parser.add_argument('--end-time', type=datetime.fromisoformat, default=None)
+    check_parser.set_defaults(command=_check_daylight_windows)
+
+    rebuild_cells_parser = subparsers.add_parser('rebuild-position-cells',
+                                                 help='Regenerates the iss_position_cells table from iss_positions')
+    rebuild_cells_parser.set_defaults(command=_rebuild_position_cells)
+
+    backfill_parser = subparsers.add_parser('backfill',
+                                            help='Fills the gaps of iss_positions through the bulk positions endpoint')
+    backfill_parser.add_argument('--start-time', type=datetime.fromisoformat, default=None)
+    backfill_parser.add_argument('--end-time', type=datetime.fromisoformat, default=None)
+    backfill_parser.set_defaults(command=_backfill)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    Runs the maintenance command given in argv
+    :param argv: the command line arguments
+    :return: the exit code
+    """
+    logging.basicConfig(level=logging.INFO)
+    args = get_parser().parse_args(argv)
+    set_up_db()
+    return args.command(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,125 @@
+import asyncio
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, Engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from challenge.utils.config.config_utils import ConfigUtils
+
 current_file_path = os.path.abspath(__file__)
 database_directory = os.path.dirname(current_file_path)
 
-SQLALCHEMY_DATABASE_URL = f'sqlite:///{database_directory}/locations.db'
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def create_writer_engine(db_path: str, pragmas: dict = None) -> Engine:
+    """
+    Creates the engine used to write to the DB. It holds a single connection, as SQLite allows one writer at a time
+    :param db_path: the path of the DB file
+    :param pragmas: the PRAGMAs to set on every new connection, None to keep SQLite's defaults
+    :return: the writer Engine
+    """
+    if pragmas is None:
+        return create_engine(f'sqlite:///{db_path}', connect_args={"check_same_thread": False})
+    writer_engine = create_engine(f'sqlite:///{db_path}', connect_args={"check_same_thread": False}, pool_size=1,
+                                  max_overflow=0)
+    _set_pragmas_on_connect(writer_engine, pragmas)
+    return writer_engine
+
+
+def create_reader_engine(db_path: str, pragmas: dict, pool_size: int = 5) -> Engine:
+    """
+    Creates a pooled engine whose connections can only read the DB. The journal_mode is left to the writer, as it is
+    persisted in the DB file
+    :param db_path: the path of the DB file
+    :param pragmas: the PRAGMAs to set on every new connection
+    :param pool_size: the number of pooled connections
+    :return: the reader Engine
+    """
+    reader_engine = create_engine(f'sqlite:///file:{db_path}?mode=ro&uri=true',
+                                  connect_args={"check_same_thread": False}, pool_size=pool_size, max_overflow=10)
+    reader_pragmas = {pragma: value for pragma, value in pragmas.items() if pragma != 'journal_mode'}
+    _set_pragmas_on_connect(reader_engine, {**reader_pragmas, 'query_only': 'ON'})
+    return reader_engine
+
+
+def get_storage_pragmas(config_utils: ConfigUtils) -> dict:
+    """
+    Provides the PRAGMAs of the configured storage profile
+    :param config_utils: the ConfigUtils object
+    :return: the PRAGMAs as a dict, None if the storage profile is disabled
+    """
+    if not config_utils.get_storage_profile_enabled():
+        return None
+    return {'journal_mode': config_utils.get_journal_mode(), 'synchronous': config_utils.get_synchronous(),
+            'cache_size': config_utils.get_cache_size(), 'mmap_size': config_utils.get_mmap_size()}
+
+
+@functools.lru_cache(maxsize=8)
+def is_file_database(db_engine: Engine) -> bool:
+    """
+    Tells whether the main DB of the given engine is a file, which other processes can open by the engine's URL,
+    rather than an in-memory or temporary DB private to its connection
+    :param db_engine: the Engine
+    :return: True if the main DB is backed by a file
+    """
+    with db_engine.connect() as connection:
+        databases = connection.execute(text('PRAGMA database_list')).all()
+    return any(name == 'main' and file for _, name, file in databases)
+
+
+def _set_pragmas_on_connect(engine_to_configure: Engine, pragmas: dict) -> None:
+    @event.listens_for(engine_to_configure, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma}={value}')
+        cursor.close()
+
+
+_config_utils = ConfigUtils()
+SQLALCHEMY_DATABASE_PATH = _config_utils.get_db_path() or f'{database_directory}/locations.db'
+_storage_pragmas = get_storage_pragmas(_config_utils)
+
+engine = create_writer_engine(SQLALCHEMY_DATABASE_PATH, _storage_pragmas)
+# Without the storage profile, reads and writes share the same engine as before
+reader_engine = engine if _storage_pragmas is None else create_reader_engine(
+    SQLALCHEMY_DATABASE_PATH, _storage_pragmas, _config_utils.get_reader_pool_size())
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadOnlySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=reader_engine)
 
 Base = declarative_base()
+
+# The synchronous SQLAlchemy calls are run on this executor so that they never block the event loop
+db_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='db')
+
+
+async def run_in_db_executor(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs the given synchronous DB function on the DB executor without blocking the event loop
+    :param func: the DB function, e.g. one of iss_crud
+    :param args: the positional arguments of the function
+    :param kwargs: the keyword arguments of the function
+    :return: the result of the function
+    """
+    return await asyncio.get_running_loop().run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+
+# The writes share the single writer connection, so they are serialized on their own single-threaded executor
+db_writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+
+
+async def run_in_db_writer_executor(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs the given synchronous DB function on the DB writer executor, one write at a time, without blocking the event
+    loop
+    :param func: the DB function, e.g. one of iss_crud
+    :param args: the positional arguments of the function
+    :param kwargs: the keyword arguments of the function
+    :return: the result of the function
+    """
+    return await asyncio.get_running_loop().run_in_executor(db_writer_executor,
+                                                            functools.partial(func, *args, **kwargs))
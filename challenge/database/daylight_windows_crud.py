@@ -0,0 +1,192 @@
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import asc, or_
+from sqlalchemy.orm import Session
+
+from challenge.database import schemas
+from challenge.database.iss_crud import get_iss_positions, get_time_range, get_timestamp_range, \
+    get_iss_position_columns
+from challenge.database.models import models
+from challenge.database.models.visibility import Visibility
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows, \
+    get_daylight_time_windows_vectorized
+
+logger = logging.getLogger(__name__)
+
+
+def get_daylight_windows(db: Session, start_time: datetime = None, end_time: datetime = None,
+                         timedelta_seconds: int = 86400, satellite_id: int = None) -> list[tuple]:
+    """
+    Gets the daylight time windows between the given start and end times from the daylight_windows table. The result
+    is the same as running get_daylight_time_windows on the IssPositions of the range: windows that are open at the
+    edges of the range have None as start or end time
+    :param db: the DB
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :param satellite_id: the id of the satellite. If None, the windows of every satellite are returned
+    :return: a List of Tuples representing daylight time windows
+    """
+    start_time, end_time = get_time_range(start_time, end_time, timedelta_seconds)
+    first_timestamp, last_timestamp = get_timestamp_range(db, start_time, end_time, satellite_id)
+    if first_timestamp is None:
+        return []
+    query = db.query(models.DaylightWindow).filter(
+        models.DaylightWindow.start_time <= last_timestamp,
+        or_(models.DaylightWindow.end_time.is_(None), models.DaylightWindow.end_time > first_timestamp))
+    if satellite_id is not None:
+        query = query.filter(models.DaylightWindow.satellite_id == satellite_id)
+    daylight_windows = query.order_by(asc(models.DaylightWindow.start_time)).all()
+    return [(_clip_start_time(daylight_window.start_time, first_timestamp),
+             _clip_end_time(daylight_window.end_time, last_timestamp)) for daylight_window in daylight_windows]
+
+
+def update_daylight_windows(db: Session, iss_positions: list[schemas.IssPosition], commit: bool = True) -> None:
+    """
+    Updates the daylight_windows table with newly added IssPositions, sorted by timestamp: an ECLIPSED->DAYLIGHT
+    transition opens a window, a DAYLIGHT->ECLIPSED transition closes the open one
+    :param db: the DB
+    :param iss_positions: the IssPositions that have just been added
+    :param commit: whether to commit the transaction
+    """
+    open_windows = {}
+    for iss_position in iss_positions:
+        satellite_id = iss_position.satellite_id
+        if satellite_id not in open_windows:
+            open_windows[satellite_id] = db.query(models.DaylightWindow).filter(
+                models.DaylightWindow.satellite_id == satellite_id, models.DaylightWindow.end_time.is_(None)).first()
+        open_window = open_windows[satellite_id]
+        if iss_position.visibility == Visibility.DAYLIGHT and not open_window:
+            open_windows[satellite_id] = models.DaylightWindow(satellite_id=satellite_id,
+                                                               start_time=iss_position.timestamp)
+            db.add(open_windows[satellite_id])
+        elif iss_position.visibility == Visibility.ECLIPSED and open_window:
+            open_window.end_time = iss_position.timestamp
+            open_windows[satellite_id] = None
+    if commit:
+        db.commit()
+
+
+def rebuild_daylight_windows(db: Session, satellite_id: int = None, start_time: datetime = None,
+                             end_time: datetime = None) -> int:
+    """
+    Regenerates the daylight_windows table from the iss_positions and iss_position_rollups tables
+    :param db: the DB
+    :param satellite_id: the id of the satellite whose windows are rebuilt. If None, the whole table is rebuilt
+    :param start_time: the start time of the IssPositions added since the table was last consistent, e.g. by a
+    backfill. If given along with the end time and the satellite_id, only the windows around them are rebuilt
+    :param end_time: the end time of the added IssPositions
+    :return: the number of rebuilt daylight windows
+    """
+    if satellite_id is not None and start_time is not None and end_time is not None:
+        rebuilt_windows = _rebuild_daylight_windows_range(db, satellite_id, start_time, end_time)
+        db.commit()
+        logger.info("Rebuilt %s daylight windows of the satellite %s around %s - %s", rebuilt_windows, satellite_id,
+                    start_time, end_time)
+        return rebuilt_windows
+    if satellite_id is None:
+        db.query(models.DaylightWindow).delete()
+        satellite_ids = _get_satellite_ids(db)
+    else:
+        db.query(models.DaylightWindow).filter(models.DaylightWindow.satellite_id == satellite_id).delete()
+        satellite_ids = [satellite_id]
+    rebuilt_windows = 0
+    for satellite_id in satellite_ids:
+        rows = list(heapq.merge(*[db.query(model.timestamp, model.visibility).filter(
+            model.satellite_id == satellite_id).order_by(asc(model.timestamp)).all()
+                                  for model in (models.IssPositionRollup, models.IssPosition)],
+                                key=lambda row: row[0]))
+        timestamps = [timestamp for timestamp, _ in rows]
+        visibilities = [visibility for _, visibility in rows]
+        for start_time, end_time in get_daylight_time_windows_vectorized(timestamps, visibilities):
+            # The first window of the history has no known start: it starts with the first IssPosition
+            db.add(models.DaylightWindow(satellite_id=satellite_id, start_time=start_time or timestamps[0],
+                                         end_time=end_time))
+            rebuilt_windows += 1
+    db.commit()
+    logger.info("Rebuilt %s daylight windows of the satellites %s", rebuilt_windows, satellite_ids)
+    return rebuilt_windows
+
+
+def _rebuild_daylight_windows_range(db: Session, satellite_id: int, start_time: datetime, end_time: datetime) -> int:
+    # The range is widened to the windows of the table around it, which were consistent before the IssPositions were
+    # added: it then starts after an ECLIPSED IssPosition and ends with one, or with the latest IssPosition
+    model = models.DaylightWindow
+    query = db.query(model).filter(model.satellite_id == satellite_id)
+    previous_window = query.filter(model.start_time <= start_time).order_by(model.start_time.desc()).first()
+    next_window = query.filter(or_(model.end_time.is_(None), model.end_time > end_time)).order_by(
+        model.start_time).first()
+    range_start_time = min(start_time, previous_window.start_time) if previous_window else start_time
+    if next_window is None:
+        # Every IssPosition after the range is ECLIPSED, the first one closes the last window of the range
+        range_end_time = get_timestamp_range(db, end_time + timedelta(microseconds=1), datetime.max,
+                                             satellite_id)[0] or end_time
+    else:
+        range_end_time = next_window.end_time or datetime.max
+    # The IssPosition before the range, ECLIPSED unless it is the first one, tells whether the first window starts
+    # with the range
+    first_timestamp = get_timestamp_range(db, datetime.min, range_start_time - timedelta(microseconds=1),
+                                          satellite_id)[1] or range_start_time
+    query.filter(model.start_time >= range_start_time, model.start_time <= range_end_time).delete()
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), first_timestamp, range_end_time,
+                                                    satellite_id=satellite_id)
+    time_windows = get_daylight_time_windows_vectorized(timestamps, daylight)
+    for window_start_time, window_end_time in time_windows:
+        db.add(model(satellite_id=satellite_id, start_time=window_start_time or timestamps[0].item(),
+                     end_time=window_end_time))
+    return len(time_windows)
+
+
+def init_daylight_windows(db: Session) -> None:
+    """
+    Builds the daylight_windows table if it is empty while the iss_positions table is not, e.g. on the first start
+    with an existing DB
+    :param db: the DB
+    """
+    if not db.query(models.DaylightWindow.id).first() and db.query(models.IssPosition.timestamp).first():
+        rebuild_daylight_windows(db)
+
+
+def check_daylight_windows(db: Session, start_time: datetime = None, end_time: datetime = None,
+                           satellite_id: int = None) -> bool:
+    """
+    Checks that the daylight_windows table is consistent with get_daylight_time_windows for the given range, satellite
+    by satellite
+    :param db: the DB
+    :param start_time: the start time. If None, it'll be the timestamp of the oldest IssPosition of the satellite
+    :param end_time: the end time. If None, it'll be the timestamp of the latest IssPosition of the satellite
+    :param satellite_id: the id of the satellite whose windows are checked. If None, every satellite is checked
+    :return: true if the windows are the same, false otherwise
+    """
+    consistent = True
+    for satellite_id in ([satellite_id] if satellite_id is not None else _get_satellite_ids(db)):
+        first_timestamp, last_timestamp = get_timestamp_range(db, satellite_id=satellite_id)
+        satellite_start_time = start_time or first_timestamp
+        satellite_end_time = end_time or last_timestamp
+        if satellite_start_time is None or satellite_end_time is None:
+            continue
+        expected_windows = get_daylight_time_windows(get_iss_positions(db, satellite_start_time, satellite_end_time,
+                                                                       satellite_id=satellite_id))
+        materialized_windows = get_daylight_windows(db, satellite_start_time, satellite_end_time,
+                                                    satellite_id=satellite_id)
+        if expected_windows != materialized_windows:
+            logger.warning("The daylight_windows table of the satellite %s is inconsistent between %s and %s: "
+                           "expected %s, found %s", satellite_id, satellite_start_time, satellite_end_time,
+                           expected_windows, materialized_windows)
+            consistent = False
+    return consistent
+
+
+def _get_satellite_ids(db: Session) -> list[int]:
+    return sorted({satellite_id for model in (models.IssPosition, models.IssPositionRollup)
+                   for satellite_id, in db.query(model.satellite_id).distinct()})
+
+
+def _clip_start_time(start_time: datetime, first_timestamp: datetime) -> datetime:
+    return start_time if start_time > first_timestamp else None
+
+
+def _clip_end_time(end_time: datetime, last_timestamp: datetime) -> datetime:
+    return end_time if end_time is not None and end_time <= last_timestamp else None
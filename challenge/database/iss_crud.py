@@ -1,50 +1,423 @@
+import heapq
 from datetime import datetime, timedelta
-from typing import Union
+from typing import Union, Iterator, Sequence
 
-from sqlalchemy import desc, asc
+import numpy as np
+from sqlalchemy import desc, asc, select, CompoundSelect, cast, String, union_all, func, DateTime, tuple_, \
+    false, Integer, or_, literal_column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from challenge.database import schemas
 from challenge.database.models import models
 from challenge.database.models.models import IssPosition
+from challenge.database.models.visibility import Visibility
+from challenge.database.position_cells_crud import add_iss_position_cells
+
+DEFAULT_COLUMNS = ('timestamp', 'visibility')
+_ORDERING_COLUMN = 'ordering_timestamp'
+_ORDERING_SATELLITE_COLUMN = 'ordering_satellite_id'
+_BUCKET_COLUMN = 'ordering_bucket'
+_ROW_ID = literal_column('iss_positions.rowid')
+# Keeps the bound parameters of a multi-row INSERT well below SQLite's limit
+_INSERT_BATCH_SIZE = 500
+_COLUMN_DTYPES = {'timestamp': 'datetime64[us]', 'daylight': np.bool_, 'satellite_id': np.int64,
+                  'latitude': np.float64, 'longitude': np.float64, 'altitude': np.float64, 'velocity': np.float64,
+                  'footprint': np.float64, 'daynum': np.float64, 'solar_lat': np.float64, 'solar_lon': np.float64}
+
+
+def get_time_range(start_time: datetime = None, end_time: datetime = None,
+                   timedelta_seconds: int = 86400) -> tuple[datetime, datetime]:
+    """
+    Provides the time range defined by the given start and end times
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :return: a Tuple with the start and end times
+    """
+    if not end_time:
+        end_time = datetime.now()
+    if not start_time:
+        start_time = end_time - timedelta(seconds=timedelta_seconds)
+    return start_time, end_time
 
 
 def get_iss_positions(db: Session, start_time: datetime = None, end_time: datetime = None,
-                      timedelta_seconds: int = 86400) -> list:
+                      timedelta_seconds: int = 86400, satellite_id: int = None) -> list:
     """
     Gets the iss positions between the given start and end times
     :param db: the DB
     :param start_time: the start time. If None, it'll be now time
     :param end_time: the end time. If None, it'll be now time - the timedelta_seconds
     :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
-    :return: a list of IssPosition
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are returned
+    :return: a list of IssPosition, including the IssPositionRollups kept by the retention job for older ranges
     """
-    if not end_time:
-        end_time = datetime.now()
-    if not start_time:
-        start_time = end_time - timedelta(seconds=timedelta_seconds)
-    return db.query(models.IssPosition).filter(models.IssPosition.timestamp.between(start_time, end_time)).order_by(
-        asc('timestamp')).all()
+    start_time, end_time = get_time_range(start_time, end_time, timedelta_seconds)
+    iss_positions = db.query(models.IssPosition).filter(
+        *_get_filters(models.IssPosition, start_time, end_time, satellite_id)).order_by(asc('timestamp')).all()
+    iss_position_rollups = db.query(models.IssPositionRollup).filter(
+        *_get_filters(models.IssPositionRollup, start_time, end_time, satellite_id)).order_by(asc('timestamp')).all()
+    if not iss_position_rollups:
+        return iss_positions
+    return list(heapq.merge(iss_position_rollups, iss_positions, key=lambda iss_position: iss_position.timestamp))
+
+
+def get_iss_position_rows(db: Session, columns: Sequence[str] = DEFAULT_COLUMNS, start_time: datetime = None,
+                          end_time: datetime = None, timedelta_seconds: int = 86400,
+                          satellite_id: int = None) -> list[tuple]:
+    """
+    Gets only the given columns of the iss positions between the given start and end times as plain tuples, without
+    hydrating IssPosition objects. Like get_iss_positions, older ranges are read from the IssPositionRollups
+    :param db: the DB
+    :param columns: the names of the columns to select. Besides the IssPosition ones, 'daylight' is the boolean
+    visibility == DAYLIGHT computed by the DB
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: a List of Tuples with the values of the given columns, sorted by timestamp
+    """
+    statement = _select_columns(columns, start_time, end_time, timedelta_seconds, as_arrays=False,
+                                satellite_id=satellite_id)
+    return [tuple(row)[:len(columns)] for row in db.execute(statement).all()]
+
+
+def get_iss_position_columns(db: Session, columns: Sequence[str] = DEFAULT_COLUMNS, start_time: datetime = None,
+                             end_time: datetime = None, timedelta_seconds: int = 86400,
+                             satellite_id: int = None) -> tuple[np.ndarray, ...]:
+    """
+    Gets only the given columns of the iss positions between the given start and end times as arrays
+    :param db: the DB
+    :param columns: the names of the columns to select, as in get_iss_position_rows
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: a Tuple with one array per column, sorted by timestamp
+    """
+    return _get_arrays(columns, db.execute(_select_columns(columns, start_time, end_time, timedelta_seconds,
+                                                           satellite_id=satellite_id)).all())
+
+
+def iter_iss_position_columns(db: Session, start_time: datetime = None, end_time: datetime = None,
+                              timedelta_seconds: int = 86400, chunk_size: int = 10000,
+                              columns: Sequence[str] = DEFAULT_COLUMNS,
+                              satellite_id: int = None) -> Iterator[tuple[np.ndarray, ...]]:
+    """
+    Iterates over the given columns of the iss positions between the given start and end times, fetching them chunk
+    by chunk through a server-side cursor
+    :param db: the DB
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :param chunk_size: the number of rows of each chunk
+    :param columns: the names of the columns to select, as in get_iss_position_rows
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: an Iterator over Tuples with one array per column
+    """
+    result = db.execute(_select_columns(columns, start_time, end_time, timedelta_seconds,
+                                        satellite_id=satellite_id).execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield _get_arrays(columns, partition)
+
 
+def get_iss_position_page(db: Session, columns: Sequence[str], start_time: datetime = None, end_time: datetime = None,
+                          satellite_id: int = None, after: tuple[int, datetime] = None,
+                          limit: int = 100) -> list[tuple]:
+    """
+    Gets a page of the given columns of the iss positions between the given start and end times, sorted by satellite
+    and timestamp, with keyset pagination: the page starts right after the given key instead of skipping the previous
+    pages, so that every page is read through the primary key index in the same time. Like get_iss_positions, older
+    ranges are read from the IssPositionRollups
+    :param db: the DB
+    :param columns: the names of the columns to select, as in get_iss_position_rows
+    :param start_time: the start time. If None, the page may start from the oldest IssPosition
+    :param end_time: the end time. If None, it'll be now time
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :param after: the satellite id and timestamp of the last IssPosition of the previous page. If None, it is the first
+    page
+    :param limit: the maximum number of IssPositions of the page
+    :return: a List of Tuples with the values of the given columns followed by the satellite id and the timestamp of
+    the IssPosition, the key of the next page
+    """
+    start_time, end_time = start_time or datetime.min, end_time or datetime.now()
+    selects = [select(select(*[_get_column(model, column, as_arrays=False) for column in columns],
+                             model.satellite_id.label(_ORDERING_SATELLITE_COLUMN),
+                             model.timestamp.label(_ORDERING_COLUMN)).where(
+        *_get_page_filters(model, start_time, end_time, satellite_id, after)).order_by(
+        model.satellite_id, model.timestamp).limit(limit).subquery())
+               for model in (models.IssPosition, models.IssPositionRollup)]
+    statement = union_all(*selects).order_by(_ORDERING_SATELLITE_COLUMN, _ORDERING_COLUMN).limit(limit)
+    return [tuple(row) for row in db.execute(statement).all()]
 
-def get_latest_iss_position(db: Session) -> Union[IssPosition, None]:
+
+def get_downsampled_iss_position_rows(db: Session, columns: Sequence[str], max_points: int,
+                                     start_time: datetime = None, end_time: datetime = None,
+                                     satellite_id: int = None) -> list[tuple]:
     """
-    Gets the latest IssPosition in the DB
+    Gets the given columns of the iss positions between the given start and end times downsampled by the DB: the
+    range is split into max_points time buckets of the same duration, and only the first IssPosition of every bucket,
+    the last IssPosition and the IssPositions on both sides of every visibility transition are returned, as the
+    retention job keeps them. The buckets and the transitions are found in a single pass with window functions, so
+    that only the kept IssPositions leave the DB
     :param db: the DB
-    :return: the latest IssPosition
+    :param columns: the names of the columns to select, as in get_iss_position_rows
+    :param max_points: the number of time buckets
+    :param start_time: the start time. If None, the range starts from the oldest IssPosition
+    :param end_time: the end time. If None, it'll be now time
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: a List of Tuples with the values of the given columns, sorted by satellite and timestamp
     """
-    return db.query(models.IssPosition).order_by(desc('timestamp')).first()
+    start_time, end_time = start_time or datetime.min, end_time or datetime.now()
+    first_timestamp, last_timestamp = get_timestamp_range(db, start_time, end_time, satellite_id)
+    if first_timestamp is None:
+        return []
+    bucket_days = max((last_timestamp - first_timestamp).total_seconds(), 1) / max_points / 86400
+    selects = []
+    for model in (models.IssPosition, models.IssPositionRollup):
+        bucket = func.min(cast((func.julianday(model.timestamp) - func.julianday(first_timestamp)) / bucket_days,
+                               Integer), max_points - 1)
+        selects.append(select(*[_get_column(model, column, as_arrays=False) for column in columns],
+                              model.satellite_id.label(_ORDERING_SATELLITE_COLUMN),
+                              model.timestamp.label(_ORDERING_COLUMN),
+                              # The bucket and the daylight flag packed together, so that a single lag compares both
+                              (bucket * 2 + _get_column(model, 'daylight', as_arrays=False)).label(_BUCKET_COLUMN)
+                              ).where(*_get_filters(model, start_time, end_time, satellite_id)))
+    positions = union_all(*selects).subquery()
+    window = {'partition_by': positions.c[_ORDERING_SATELLITE_COLUMN], 'order_by': positions.c[_ORDERING_COLUMN]}
+    neighbours = select(positions, func.lag(positions.c[_BUCKET_COLUMN]).over(**window).label('previous_bucket'),
+                        func.lead(positions.c[_BUCKET_COLUMN].op('&')(1)).over(**window).label('next_daylight')
+                        ).subquery()
+    bucket, previous_bucket = neighbours.c[_BUCKET_COLUMN], neighbours.c.previous_bucket
+    daylight, previous_daylight = bucket.op('&')(1), previous_bucket.op('&')(1)
+    statement = select(*[neighbours.c[column] for column in columns]).where(or_(
+        previous_bucket.is_(None), neighbours.c.next_daylight.is_(None),
+        bucket.op('>>')(1) != previous_bucket.op('>>')(1), daylight != previous_daylight,
+        daylight != neighbours.c.next_daylight)).order_by(neighbours.c[_ORDERING_SATELLITE_COLUMN],
+                                                          neighbours.c[_ORDERING_COLUMN])
+    return [tuple(row) for row in db.execute(statement).all()]
 
 
-def add_iss_position(db: Session, iss_position: schemas.IssPosition):
+def get_iss_position_gaps(db: Session, satellite_id: int, min_gap_seconds: float, start_time: datetime = None,
+                          end_time: datetime = None) -> list[tuple[datetime, datetime]]:
     """
-    Adds the given IssPosition to the DB
+    Finds the gaps between consecutive IssPositions of the given satellite larger than the given seconds, with a
+    single pass over the primary key index
+    :param db: the DB
+    :param satellite_id: the id of the satellite
+    :param min_gap_seconds: the minimum time in seconds between two consecutive IssPositions to be a gap
+    :param start_time: the time from which to look for gaps. If None, the whole history is scanned
+    :param end_time: the time until which to look for gaps. If None, it'll be now time
+    :return: a List of Tuples with the timestamps of the IssPositions around each gap
+    """
+    previous_timestamp = func.lag(models.IssPosition.timestamp, type_=DateTime).over(
+        order_by=models.IssPosition.timestamp)
+    consecutive_positions = select(previous_timestamp.label('previous_timestamp'), models.IssPosition.timestamp).where(
+        *_get_filters(models.IssPosition, start_time or datetime.min, end_time or datetime.now(),
+                      satellite_id)).subquery()
+    gap_seconds = (func.julianday(consecutive_positions.c.timestamp) -
+                   func.julianday(consecutive_positions.c.previous_timestamp)) * 86400
+    return [tuple(row) for row in db.execute(select(consecutive_positions).where(
+        gap_seconds > min_gap_seconds).order_by(consecutive_positions.c.timestamp)).all()]
+
+
+def get_timestamp_range(db: Session, start_time: datetime = None, end_time: datetime = None,
+                        satellite_id: int = None) -> tuple:
+    """
+    Gets the timestamps of the first and last iss positions between the given start and end times
+    :param db: the DB
+    :param start_time: the start time. If None, as well as the end time, the whole history is considered
+    :param end_time: the end time. If None, as well as the start time, the whole history is considered
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are considered
+    :return: a Tuple with the first and last timestamps, both None if there is no IssPosition
+    """
+    # The compacted history lives in iss_position_rollups, so both tables bound the range
+    first_timestamps = []
+    last_timestamps = []
+    for model in (models.IssPosition, models.IssPositionRollup):
+        query = db.query(func.min(model.timestamp), func.max(model.timestamp))
+        if start_time is not None and end_time is not None:
+            query = query.filter(model.timestamp.between(start_time, end_time))
+        if satellite_id is not None:
+            query = query.filter(model.satellite_id == satellite_id)
+        first_timestamp, last_timestamp = query.one()
+        if first_timestamp is not None:
+            first_timestamps.append(first_timestamp)
+            last_timestamps.append(last_timestamp)
+    if not first_timestamps:
+        return None, None
+    return min(first_timestamps), max(last_timestamps)
+
+
+def count_iss_positions(db: Session, start_time: datetime = None, end_time: datetime = None,
+                        timedelta_seconds: int = 86400, satellite_id: int = None) -> int:
+    """
+    Counts the iss positions between the given start and end times through the index, without reading them
+    :param db: the DB
+    :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+    :param end_time: the end time. If None, it'll be now time
+    :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are counted
+    :return: the number of IssPositions, including the IssPositionRollups kept by the retention job for older ranges
+    """
+    start_time, end_time = get_time_range(start_time, end_time, timedelta_seconds)
+    return sum(db.query(func.count()).select_from(model).filter(
+        *_get_filters(model, start_time, end_time, satellite_id)).scalar()
+        for model in (models.IssPosition, models.IssPositionRollup))
+
+
+def get_latest_iss_position(db: Session, satellite_id: int = None) -> Union[IssPosition, None]:
+    """
+    Gets the latest IssPosition in the DB. The IssPositionRollups are only older than the raw IssPositions, so they are
+    only read when every raw IssPosition has been compacted by the retention job
+    :param db: the DB
+    :param satellite_id: the id of the satellite. If None, the latest IssPosition of any satellite is returned
+    :return: the latest IssPosition, None if there is none
+    """
+    for model in (models.IssPosition, models.IssPositionRollup):
+        query = db.query(model)
+        if satellite_id is not None:
+            query = query.filter(model.satellite_id == satellite_id)
+        latest_iss_position = query.order_by(desc(model.timestamp)).first()
+        if latest_iss_position is not None:
+            return latest_iss_position
+    return None
+
+
+def get_latest_iss_position_row_id(db: Session) -> int:
+    """
+    Gets the rowid of the latest IssPosition added to the DB, which grows with every insert whatever its timestamp
+    :param db: the DB
+    :return: the rowid, 0 if there is no IssPosition
+    """
+    return db.execute(select(func.max(_ROW_ID)).select_from(models.IssPosition)).scalar() or 0
+
+
+def get_iss_positions_added_after(db: Session, row_id: int, limit: int = 1000) -> list[tuple[int, IssPosition]]:
+    """
+    Gets the IssPositions added to the DB after the given rowid, in the order they were added, e.g. by another process
+    :param db: the DB
+    :param row_id: the rowid of the last IssPosition already read
+    :param limit: the maximum number of IssPositions
+    :return: a list of Tuples with the rowid and the IssPosition
+    """
+    return [tuple(row) for row in db.execute(
+        select(_ROW_ID, models.IssPosition).where(_ROW_ID > row_id).order_by(_ROW_ID).limit(limit)).all()]
+
+
+def add_iss_position(db: Session, iss_position: schemas.IssPosition) -> Union[schemas.IssPosition, None]:
+    """
+    Adds the given IssPosition to the DB, unless an IssPosition with the same satellite and timestamp is already stored
     :param db: the DB
     :param iss_position: the IssPosition to add
-    :return: the added IssPosition
+    :return: the added IssPosition, None if it was already stored
+    """
+    added_iss_positions = add_iss_positions(db, [iss_position])
+    return added_iss_positions[0] if added_iss_positions else None
+
+
+def add_iss_positions(db: Session, iss_positions: list[schemas.IssPosition], commit: bool = True,
+                      index_cells: bool = True) -> list[schemas.IssPosition]:
     """
-    db_iss_position = models.IssPosition(**iss_position.model_dump())
-    db.add(db_iss_position)
-    db.commit()
-    db.refresh(db_iss_position)
-    return db_iss_position
+    Adds the given IssPositions to the DB in one transaction with INSERT ... ON CONFLICT DO NOTHING, so that the
+    IssPositions already stored (same satellite and timestamp) are skipped instead of failing the whole batch. The
+    IssPositions already compacted into an IssPositionRollup, e.g. backfilled ones, are skipped as well. The cells of
+    the added IssPositions are indexed in the same transaction, unless the spatial index is disabled
+    :param db: the DB
+    :param iss_positions: the IssPositions to add
+    :param commit: whether to commit the transaction
+    :param index_cells: whether to add the cells of the added IssPositions to the iss_position_cells table
+    :return: the IssPositions that have actually been added, once per key
+    """
+    iss_positions = _exclude_compacted_iss_positions(db, iss_positions)
+    added_keys = set()
+    for first in range(0, len(iss_positions), _INSERT_BATCH_SIZE):
+        statement = sqlite_insert(models.IssPosition).values(
+            [iss_position.model_dump() for iss_position in iss_positions[first:first + _INSERT_BATCH_SIZE]]
+        ).on_conflict_do_nothing().returning(models.IssPosition.satellite_id, models.IssPosition.timestamp)
+        added_keys.update(tuple(key) for key in db.execute(statement))
+    # Only the first of the IssPositions sharing a key is inserted, the next ones conflict with it
+    added_iss_positions = []
+    for iss_position in iss_positions:
+        key = (iss_position.satellite_id, iss_position.timestamp)
+        if key in added_keys:
+            added_keys.remove(key)
+            added_iss_positions.append(iss_position)
+    if index_cells:
+        add_iss_position_cells(db, added_iss_positions, commit=commit)
+    elif commit:
+        db.commit()
+    return added_iss_positions
+
+
+def _exclude_compacted_iss_positions(db: Session,
+                                     iss_positions: list[schemas.IssPosition]) -> list[schemas.IssPosition]:
+    # The ON CONFLICT clause only covers the raw IssPositions. Only the IssPositions older than the latest rollup may
+    # clash with one, so the live ones only cost a lookup of the timestamp index
+    latest_rollup_timestamp = db.query(func.max(models.IssPositionRollup.timestamp)).scalar()
+    candidates = [iss_position for iss_position in iss_positions
+                  if latest_rollup_timestamp and iss_position.timestamp <= latest_rollup_timestamp]
+    if not candidates:
+        return iss_positions
+    compacted_keys = {tuple(key) for key in db.query(models.IssPositionRollup.satellite_id,
+                                                     models.IssPositionRollup.timestamp).filter(
+        models.IssPositionRollup.timestamp.between(min(candidate.timestamp for candidate in candidates),
+                                                   max(candidate.timestamp for candidate in candidates)),
+        models.IssPositionRollup.satellite_id.in_({candidate.satellite_id for candidate in candidates}))}
+    return [iss_position for iss_position in iss_positions
+            if (iss_position.satellite_id, iss_position.timestamp) not in compacted_keys]
+
+
+def _select_columns(columns: Sequence[str], start_time: datetime, end_time: datetime, timedelta_seconds: int,
+                    as_arrays: bool = True, satellite_id: int = None) -> CompoundSelect:
+    # Both tiers are read through their timestamp index and merged by SQLite without sorting, thanks to the
+    # trailing ordering column
+    start_time, end_time = get_time_range(start_time, end_time, timedelta_seconds)
+    selects = [select(*[_get_column(model, column, as_arrays) for column in columns],
+                      model.timestamp.label(_ORDERING_COLUMN)).where(*_get_filters(model, start_time, end_time,
+                                                                                   satellite_id))
+               for model in (models.IssPosition, models.IssPositionRollup)]
+    return union_all(*selects).order_by(_ORDERING_COLUMN)
+
+
+def _get_filters(model, start_time: datetime, end_time: datetime, satellite_id: int = None) -> list:
+    filters = [model.timestamp.between(start_time, end_time)]
+    if satellite_id is not None:
+        filters.append(model.satellite_id == satellite_id)
+    return filters
+
+
+def _get_page_filters(model, start_time: datetime, end_time: datetime, satellite_id: int,
+                      after: tuple[int, datetime]) -> list:
+    if after is None:
+        return _get_filters(model, start_time, end_time, satellite_id)
+    if satellite_id is None:
+        return [*_get_filters(model, start_time, end_time), tuple_(model.satellite_id, model.timestamp) > after]
+    after_satellite_id, after_timestamp = after
+    if after_satellite_id > satellite_id:
+        return [false()]
+    if after_satellite_id < satellite_id or after_timestamp < start_time:
+        return _get_filters(model, start_time, end_time, satellite_id)
+    # Within a satellite, the key becomes the only lower bound of the timestamp, so that SQLite starts the range scan
+    # of the primary key index right at the key
+    return [model.satellite_id == satellite_id, model.timestamp > after_timestamp, model.timestamp <= end_time]
+
+
+def _get_column(model, column: str, as_arrays: bool):
+    if column == 'daylight':
+        return (model.visibility == Visibility.DAYLIGHT.name).label(column)
+    if column == 'timestamp' and as_arrays:
+        # NumPy parses the stored ISO strings far faster than it converts the datetimes SQLAlchemy would build
+        return cast(model.timestamp, String).label(column)
+    return getattr(model, column).label(column)
+
+
+def _get_arrays(columns: Sequence[str], rows: list[tuple]) -> tuple[np.ndarray, ...]:
+    if not rows:
+        return tuple(np.empty(0, dtype=_COLUMN_DTYPES.get(column, object)) for column in columns)
+    return tuple(_get_array(column, values) for column, values in zip(columns, zip(*rows)))
+
+
+def _get_array(column: str, values: tuple) -> np.ndarray:
+    return np.array(values, dtype=_COLUMN_DTYPES.get(column, object))
@@ -4,12 +4,10 @@ from challenge.database.database import Base
 from challenge.database.models.visibility import Visibility
 
 
-class IssPosition(Base):
+class IssPositionColumns:
     """
-    It represents an ISS Position
+    The columns of an ISS Position, shared by the raw IssPositions and their rollups
     """
-    __tablename__ = "iss_positions"
-
     name = Column(String)
     satellite_id = Column(Integer, primary_key=True, index=True)
     latitude = Column(Float)
@@ -23,3 +21,50 @@ class IssPosition(Base):
     solar_lat = Column(Float)
     solar_lon = Column(Float)
     units = Column(String)
+
+
+class IssPosition(IssPositionColumns, Base):
+    """
+    It represents an ISS Position
+    """
+    __tablename__ = "iss_positions"
+
+
+class IssPositionRollup(IssPositionColumns, Base):
+    """
+    It represents an ISS Position older than the raw retention, kept by the retention job with the given resolution:
+    the first IssPosition of every resolution-sized time bucket and the IssPositions on both sides of every visibility
+    transition
+    """
+    __tablename__ = "iss_position_rollups"
+
+    resolution = Column(Integer, index=True)
+
+
+class DaylightWindow(Base):
+    """
+    It represents a Daylight time window of a satellite, materialized from its IssPositions. The start time is the
+    timestamp of the first Daylight IssPosition after an Eclipsed one, the end time is the timestamp of the first
+    Eclipsed IssPosition after it, or None while the window is still open
+    """
+    __tablename__ = "daylight_windows"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    satellite_id = Column(Integer, index=True)
+    start_time = Column(DateTime, index=True, nullable=False)
+    end_time = Column(DateTime, index=True)
+
+
+class IssPositionCell(Base):
+    """
+    It represents the cell of the lat/lon grid of an IssPosition, raw or compacted, along with its coordinates. The
+    table is clustered by cell, so that the IssPositions of nearby cells are read with a few range scans
+    """
+    __tablename__ = "iss_position_cells"
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    cell = Column(Integer, primary_key=True)
+    satellite_id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
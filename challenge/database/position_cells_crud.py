@@ -0,0 +1,130 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select, delete, bindparam, cast, func, Integer, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from challenge.database import schemas
+from challenge.database.models import models
+from challenge.utils.operations.spatial_utils import get_cells, CELL_DEGREES, GRID_ROWS, GRID_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Keeps the bound parameters of a statement well below SQLite's limit
+_STATEMENT_BATCH_SIZE = 500
+
+
+def add_iss_position_cells(db: Session, iss_positions: list[schemas.IssPosition], commit: bool = True) -> None:
+    """
+    Adds the cells of the given IssPositions to the iss_position_cells table. The cells already stored are skipped
+    :param db: the DB
+    :param iss_positions: the IssPositions that have just been added
+    :param commit: whether to commit the transaction
+    """
+    if iss_positions:
+        cells = get_cells([iss_position.latitude for iss_position in iss_positions],
+                          [iss_position.longitude for iss_position in iss_positions]).tolist()
+        for first in range(0, len(iss_positions), _STATEMENT_BATCH_SIZE):
+            db.execute(sqlite_insert(models.IssPositionCell).values(
+                [{'cell': cell, 'satellite_id': iss_position.satellite_id, 'timestamp': iss_position.timestamp,
+                  'latitude': iss_position.latitude, 'longitude': iss_position.longitude}
+                 for cell, iss_position in zip(cells[first:first + _STATEMENT_BATCH_SIZE],
+                                               iss_positions[first:first + _STATEMENT_BATCH_SIZE])]
+            ).on_conflict_do_nothing())
+    if commit:
+        db.commit()
+
+
+def delete_iss_position_cells(db: Session, iss_positions: list) -> None:
+    """
+    Deletes the cells of the given IssPositions, e.g. when the retention job drops them. The transaction is not
+    committed
+    :param db: the DB
+    :param iss_positions: the IssPositions, either the schemas or the models
+    """
+    if not iss_positions:
+        return
+    cells = get_cells([iss_position.latitude for iss_position in iss_positions],
+                      [iss_position.longitude for iss_position in iss_positions]).tolist()
+    table = models.IssPositionCell.__table__
+    # One lookup of the primary key per row, SQLite scans the whole table to match a list of row values
+    db.connection().execute(
+        delete(table).where(table.c.cell == bindparam('key_cell'),
+                            table.c.satellite_id == bindparam('key_satellite_id'),
+                            table.c.timestamp == bindparam('key_timestamp')),
+        [{'key_cell': cell, 'key_satellite_id': iss_position.satellite_id, 'key_timestamp': iss_position.timestamp}
+         for cell, iss_position in zip(cells, iss_positions)])
+
+
+def get_iss_position_cell_columns(db: Session, cell_ranges: list[tuple[int, int]], start_time: datetime = None,
+                                  end_time: datetime = None,
+                                  satellite_id: int = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gets the timestamps and coordinates of the IssPositions in the given cells between the given start and end times
+    :param db: the DB
+    :param cell_ranges: the first and last cells of every range of cells, as provided by get_cell_ranges
+    :param start_time: the start time. If None, the range starts from the oldest IssPosition
+    :param end_time: the end time. If None, it'll be now time
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: a Tuple with the timestamps, latitudes and longitudes as arrays, sorted by timestamp
+    """
+    model = models.IssPositionCell
+    filters = [model.timestamp.between(start_time or datetime.min, end_time or datetime.now())]
+    if satellite_id is not None:
+        filters.append(model.satellite_id == satellite_id)
+    # One range search of the primary key per range of cells, SQLite prefers to scan the whole table to an OR of many
+    # ranges
+    rows = [row for first_cell, last_cell in cell_ranges for row in db.execute(
+        select(model.timestamp, model.latitude, model.longitude).where(
+            model.cell.between(first_cell, last_cell), *filters))]
+    if not rows:
+        return np.empty(0, dtype='datetime64[us]'), np.empty(0), np.empty(0)
+    timestamps, latitudes, longitudes = zip(*rows)
+    timestamps = np.array(timestamps, dtype='datetime64[us]')
+    order = np.argsort(timestamps, kind='stable')
+    return timestamps[order], np.array(latitudes)[order], np.array(longitudes)[order]
+
+
+def rebuild_iss_position_cells(db: Session) -> int:
+    """
+    Regenerates the iss_position_cells table from the iss_positions and iss_position_rollups tables, e.g. to index
+    the IssPositions stored before it existed
+    :param db: the DB
+    :return: the number of indexed IssPositions
+    """
+    db.query(models.IssPositionCell).delete()
+    indexed_positions = 0
+    for model in (models.IssPosition, models.IssPositionRollup):
+        # The same grid as get_cells, computed by SQLite so that the rows never leave the DB
+        row = func.min(cast((model.latitude + 90) / CELL_DEGREES, Integer), GRID_ROWS - 1)
+        column = cast((model.longitude + 180) / CELL_DEGREES, Integer) % GRID_COLUMNS
+        # The WHERE clause tells SQLite that the ON CONFLICT clause is not part of a join
+        indexed_positions += db.execute(sqlite_insert(models.IssPositionCell).from_select(
+            ['cell', 'satellite_id', 'timestamp', 'latitude', 'longitude'],
+            select(row * GRID_COLUMNS + column, model.satellite_id, model.timestamp, model.latitude,
+                   model.longitude).where(true())).on_conflict_do_nothing()).rowcount
+    db.commit()
+    logger.info("Indexed the cells of %s IssPositions", indexed_positions)
+    return indexed_positions
+
+
+def clear_iss_position_cells(db: Session) -> None:
+    """
+    Empties the iss_position_cells table, e.g. when the spatial index is disabled, so that it is rebuilt by
+    init_iss_position_cells once it is enabled again instead of missing the IssPositions added meanwhile
+    :param db: the DB
+    """
+    db.execute(delete(models.IssPositionCell))
+    db.commit()
+
+
+def init_iss_position_cells(db: Session) -> None:
+    """
+    Builds the iss_position_cells table if it is empty while the iss_positions table is not, e.g. on the first start
+    with an existing DB
+    :param db: the DB
+    """
+    if not db.query(models.IssPositionCell.cell).first() and db.query(models.IssPosition.timestamp).first():
+        rebuild_iss_position_cells(db)
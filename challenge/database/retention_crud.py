@@ -0,0 +1,201 @@
+import logging
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import asc, desc, delete, func, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+
+from challenge.database.models import models
+from challenge.database.position_cells_crud import delete_iss_position_cells
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_STATEMENT_BATCH_SIZE = 500
+# The raw IssPositions are compacted before the rollups of a finer resolution
+COMPACTED_MODELS = (models.IssPosition, models.IssPositionRollup)
+_POSITION_COLUMNS = [column.name for column in models.IssPosition.__table__.columns]
+
+
+def compact_iss_positions(db: Session, horizon: datetime, resolution: int, batch_size: int = 5000) -> int:
+    """
+    Compacts the IssPositions older than the horizon into IssPositionRollups with the given resolution. Only the first
+    IssPosition of every resolution-sized time bucket and the IssPositions on both sides of every visibility
+    transition are kept, so that the daylight time windows are preserved. IssPositionRollups older than the horizon
+    with a finer resolution are compacted as well. Every batch is committed in its own transaction
+    :param db: the DB
+    :param horizon: the timestamp before which the IssPositions are compacted
+    :param resolution: the resolution in seconds of the compacted IssPositions
+    :param batch_size: the number of IssPositions compacted in one transaction
+    :return: the number of IssPositions dropped
+    """
+    dropped = 0
+    for model in COMPACTED_MODELS:
+        while True:
+            compacted, batch_dropped = compact_iss_position_batch(db, model, horizon, resolution, batch_size)
+            if not compacted:
+                break
+            dropped += batch_dropped
+    if dropped:
+        logger.info("Compacted %s IssPositions older than %s to a %s seconds resolution", dropped, horizon,
+                    resolution)
+    return dropped
+
+
+def compact_iss_position_batch(db: Session, model, horizon: datetime, resolution: int,
+                               batch_size: int = 5000) -> tuple[int, int]:
+    """
+    Compacts one batch of the rows of the given model older than the horizon, as compact_iss_positions does, and
+    commits it. Every compacted row leaves the selection, either dropped or kept with the given resolution, so calling
+    it until nothing is compacted compacts every row
+    :param db: the DB
+    :param model: IssPosition or IssPositionRollup
+    :param horizon: the timestamp before which the rows are compacted
+    :param resolution: the resolution in seconds of the compacted IssPositions
+    :param batch_size: the maximum number of rows compacted
+    :return: a Tuple with the number of rows compacted, 0 if there are none left, and the number of rows dropped
+    """
+    query = db.query(model).filter(model.timestamp < horizon)
+    if model is models.IssPositionRollup:
+        query = query.filter(model.resolution < resolution)
+    batch = query.order_by(asc(model.satellite_id), asc(model.timestamp)).limit(batch_size).all()
+    if not batch:
+        return 0, 0
+    dropped = _compact_batch(db, model, batch, resolution)
+    db.commit()
+    return len(batch), dropped
+
+
+def purge_iss_positions(db: Session, horizon: datetime, batch_size: int = 5000) -> int:
+    """
+    Deletes the IssPositions and IssPositionRollups older than the horizon, the final retention past the coarsest
+    rollup tier, along with the daylight windows closed before it. The latest IssPosition of every satellite is
+    kept, so that its latest position is still known. Every batch is committed in its own transaction
+    :param db: the DB
+    :param horizon: the timestamp before which the IssPositions are deleted
+    :param batch_size: the number of IssPositions deleted in one transaction
+    :return: the number of IssPositions deleted
+    """
+    purged = 0
+    for model in COMPACTED_MODELS:
+        while True:
+            batch_purged = purge_iss_position_batch(db, model, horizon, batch_size)
+            if not batch_purged:
+                break
+            purged += batch_purged
+    purge_daylight_windows(db, horizon)
+    if purged:
+        logger.info("Deleted %s IssPositions older than %s", purged, horizon)
+    return purged
+
+
+def purge_iss_position_batch(db: Session, model, horizon: datetime, batch_size: int = 5000) -> int:
+    """
+    Deletes one batch of the rows of the given model older than the horizon, as purge_iss_positions does, along with
+    their cells, and commits it
+    :param db: the DB
+    :param model: IssPosition or IssPositionRollup
+    :param horizon: the timestamp before which the rows are deleted
+    :param batch_size: the maximum number of rows deleted
+    :return: the number of rows deleted, 0 if there are none left
+    """
+    # The rollups are older than the raw IssPositions, so the latest IssPosition is the latest raw one if any
+    latest_timestamp = func.coalesce(*[select(func.max(latest.timestamp)).where(
+        latest.satellite_id == model.satellite_id).scalar_subquery()
+        for latest in (aliased(latest_model) for latest_model in COMPACTED_MODELS)])
+    batch = db.query(model).filter(model.timestamp < horizon, model.timestamp < latest_timestamp).order_by(
+        asc(model.satellite_id), asc(model.timestamp)).limit(batch_size).all()
+    if not batch:
+        return 0
+    keys = [(iss_position.satellite_id, iss_position.timestamp) for iss_position in batch]
+    for first in range(0, len(keys), _STATEMENT_BATCH_SIZE):
+        db.execute(delete(model).where(tuple_(model.satellite_id, model.timestamp).in_(
+            keys[first:first + _STATEMENT_BATCH_SIZE])))
+    delete_iss_position_cells(db, batch)
+    db.commit()
+    return len(batch)
+
+
+def purge_daylight_windows(db: Session, horizon: datetime) -> int:
+    """
+    Deletes the daylight windows closed before the horizon and commits
+    :param db: the DB
+    :param horizon: the timestamp before which the closed daylight windows are deleted
+    :return: the number of daylight windows deleted
+    """
+    purged = db.execute(delete(models.DaylightWindow).where(models.DaylightWindow.end_time < horizon)).rowcount
+    db.commit()
+    return purged
+
+
+def _compact_batch(db: Session, model, batch: list, resolution: int) -> int:
+    kept_positions = []
+    dropped_positions = []
+    for satellite_id, satellite_batch in groupby(batch, key=lambda iss_position: iss_position.satellite_id):
+        satellite_batch = list(satellite_batch)
+        previous_position = _get_neighbour(db, satellite_id, satellite_batch[0].timestamp, before=True)
+        next_position = _get_neighbour(db, satellite_id, satellite_batch[-1].timestamp, before=False)
+        sequence = [previous_position, *satellite_batch, next_position]
+        for index, iss_position in enumerate(satellite_batch, start=1):
+            if _is_kept(sequence[index - 1], iss_position, sequence[index + 1], resolution):
+                kept_positions.append(iss_position)
+            else:
+                dropped_positions.append(iss_position)
+    _keep_positions(db, model, kept_positions, resolution)
+    dropped_keys = [(iss_position.satellite_id, iss_position.timestamp) for iss_position in dropped_positions]
+    for first in range(0, len(dropped_keys), _STATEMENT_BATCH_SIZE):
+        db.execute(delete(model).where(tuple_(model.satellite_id, model.timestamp).in_(
+            dropped_keys[first:first + _STATEMENT_BATCH_SIZE])))
+    # The kept IssPositions keep their cells, whichever table they live in
+    delete_iss_position_cells(db, dropped_positions)
+    return len(dropped_keys)
+
+
+def _keep_positions(db: Session, model, kept_positions: list, resolution: int) -> None:
+    if model is models.IssPositionRollup:
+        kept_keys = [(iss_position.satellite_id, iss_position.timestamp) for iss_position in kept_positions]
+        for first in range(0, len(kept_keys), _STATEMENT_BATCH_SIZE):
+            db.execute(update(models.IssPositionRollup).where(
+                tuple_(models.IssPositionRollup.satellite_id, models.IssPositionRollup.timestamp).in_(
+                    kept_keys[first:first + _STATEMENT_BATCH_SIZE])).values(resolution=resolution))
+        return
+    for first in range(0, len(kept_positions), _STATEMENT_BATCH_SIZE):
+        db.execute(sqlite_insert(models.IssPositionRollup).values(
+            [{**{column: getattr(iss_position, column) for column in _POSITION_COLUMNS}, 'resolution': resolution}
+             for iss_position in kept_positions[first:first + _STATEMENT_BATCH_SIZE]]).on_conflict_do_nothing())
+    # Every compacted IssPosition leaves the raw table, the kept ones live on as rollups
+    kept_keys = [(iss_position.satellite_id, iss_position.timestamp) for iss_position in kept_positions]
+    for first in range(0, len(kept_keys), _STATEMENT_BATCH_SIZE):
+        db.execute(delete(models.IssPosition).where(tuple_(models.IssPosition.satellite_id,
+                                                           models.IssPosition.timestamp).in_(
+            kept_keys[first:first + _STATEMENT_BATCH_SIZE])))
+
+
+def _get_neighbour(db: Session, satellite_id: int, timestamp: datetime, before: bool):
+    # The neighbour can be either a raw IssPosition or an already compacted one
+    neighbours = []
+    for model in (models.IssPosition, models.IssPositionRollup):
+        query = db.query(model).filter(model.satellite_id == satellite_id)
+        if before:
+            query = query.filter(model.timestamp < timestamp).order_by(desc(model.timestamp))
+        else:
+            query = query.filter(model.timestamp > timestamp).order_by(asc(model.timestamp))
+        neighbour = query.first()
+        if neighbour is not None:
+            neighbours.append(neighbour)
+    if not neighbours:
+        return None
+    return (max if before else min)(neighbours, key=lambda iss_position: iss_position.timestamp)
+
+
+def _is_kept(previous_position, iss_position, next_position, resolution: int) -> bool:
+    if previous_position is None or next_position is None:
+        return True
+    if iss_position.visibility != previous_position.visibility or iss_position.visibility != next_position.visibility:
+        return True
+    return _get_bucket(iss_position.timestamp, resolution) != _get_bucket(previous_position.timestamp, resolution)
+
+
+def _get_bucket(timestamp: datetime, resolution: int) -> int:
+    return int((timestamp - _EPOCH).total_seconds()) // resolution
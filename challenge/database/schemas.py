@@ -33,3 +33,12 @@ class IssPosition(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class IssPositionBrief(BaseModel):
+    """
+    IssPosition schema of the brief /iss/position responses
+    """
+    latitude: float
+    longitude: float
+    timestamp: datetime
@@ -7,11 +7,28 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
 
+from challenge.background_tasks.iss_position_backfiller import IssPositionBackfiller
 from challenge.background_tasks.iss_position_updater import IssPositionUpdater
+from challenge.background_tasks.iss_position_writer import IssPositionWriter
+from challenge.background_tasks.retention_job import RetentionJob
+from challenge.database.daylight_windows_crud import init_daylight_windows
+from challenge.database.iss_crud import get_latest_iss_position_row_id, get_iss_positions_added_after
+from challenge.database.position_cells_crud import init_iss_position_cells, clear_iss_position_cells
+from challenge.database.database import ReadOnlySessionLocal, SQLALCHEMY_DATABASE_PATH, run_in_db_executor, \
+    run_in_db_writer_executor
+from challenge.database.schemas import IssPosition
 from challenge.routers import iss_router
+from challenge.utils.buffers.iss_position_buffer import IssPositionBuffers
 from challenge.utils.fastapi.fastapi_utils import set_up_db, get_lifespan_db, limiter, \
-    get_config_utils
+    get_config_utils, iss_position_buffers, time_windows_cache, latest_position_slots, position_hub, \
+    daylight_interval_indexes, create_iss_position_buffers, create_daylight_interval_indexes
+from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndexes
+from challenge.utils.metrics.iss_metrics import rate_limit_rejections, ingestion_leader
+from challenge.utils.metrics.metrics import REGISTRY
+from challenge.utils.scheduling.leader_election import LeaderElection
+from challenge.utils.scheduling.poll_scheduler import PollScheduler
 
 logger = logging.getLogger(__name__)
 config_utils = get_config_utils()
@@ -20,18 +37,210 @@ config_utils = get_config_utils()
 # Here in case we want to cancel it at some point
 # iss_updater_task = None
 
+
+async def backfill_iss_positions(iss_position_backfiller: IssPositionBackfiller, position_listeners: list) -> None:
+    """
+    Backfills the gaps left while the app was down. If any IssPosition was added, the IssPosition buffers and the
+    daylight interval indexes are warmed again, as they only accept IssPositions more recent than their latest one,
+    and the /iss/sun cache is cleared
+    :param iss_position_backfiller: the IssPositionBackfiller
+    :param position_listeners: the listeners notified of the IssPositions added by the IssPositionWriter
+    """
+    if await iss_position_backfiller.backfill():
+        await warm_iss_position_buffers_and_indexes(position_listeners)
+        if time_windows_cache:
+            time_windows_cache.clear()
+
+
+async def warm_iss_position_buffers_and_indexes(position_listeners: list = None, warm_buffers: bool = True) -> None:
+    """
+    Warms the IssPosition buffers and the daylight interval indexes without blocking the event loop: new ones are
+    filled on the DB executor, then replace the live ones on the event loop along with the IssPositions added in the
+    meantime
+    :param position_listeners: the listeners notified of the IssPositions added by the IssPositionWriter, None if it
+    is not running yet
+    :param warm_buffers: whether to warm the IssPosition buffers as well, or only the daylight interval indexes
+    """
+    added_iss_positions = []
+    if position_listeners is not None:
+        position_listeners.append(added_iss_positions.append)
+    try:
+        warmed_buffers, warmed_indexes = await run_in_db_executor(_get_warmed_buffers_and_indexes, warm_buffers)
+    finally:
+        if position_listeners is not None:
+            position_listeners.remove(added_iss_positions.append)
+    for iss_position in added_iss_positions:
+        if warmed_buffers:
+            warmed_buffers.append(iss_position)
+        warmed_indexes.append(iss_position)
+    if warmed_buffers:
+        iss_position_buffers.replace(warmed_buffers)
+    daylight_interval_indexes.replace(warmed_indexes)
+
+
+def _get_warmed_buffers_and_indexes(warm_buffers: bool = True) -> tuple[IssPositionBuffers, DaylightIntervalIndexes]:
+    warmed_buffers = create_iss_position_buffers() if warm_buffers else None
+    warmed_indexes = create_daylight_interval_indexes()
+    with ReadOnlySessionLocal() as db:
+        if warmed_buffers:
+            warmed_buffers.warm(db)
+        warmed_indexes.warm(db, config_utils.get_daylight_windows_table_enabled())
+    return warmed_buffers, warmed_indexes
+
+
+async def ingest_iss_positions(db, leader_election: LeaderElection = None) -> None:
+    """
+    It builds the daylight_windows and iss_position_cells tables if needed, warms the IssPosition buffers and the
+    daylight interval indexes and runs the schedule that saves the latest IssPosition at configured intervals, along
+    with the backfill of the gaps and the retention job if enabled, until it is cancelled. With a leader election, it
+    first waits for this worker to become the leader. On cancellation, the pending IssPositions are written to the DB
+    :param db: the DB
+    :param leader_election: the LeaderElection, None if every worker ingests
+    """
+    if leader_election and not leader_election.is_leader:
+        relay_task = asyncio.create_task(relay_shared_positions())
+        try:
+            await leader_election.wait_until_elected()
+        finally:
+            relay_task.cancel()
+        logger.info("Took over the ingestion of the IssPositions")
+        _serve_live_reads()
+    ingestion_leader.set(1)
+    # The tables are built on the writer executor and the buffers and indexes warmed on the DB executor, so that the
+    # reads served by this worker are not blocked meanwhile, which matters most when a follower takes over
+    await run_in_db_writer_executor(init_daylight_windows, db)
+    if config_utils.get_spatial_index_enabled():
+        await run_in_db_writer_executor(init_iss_position_cells, db)
+    else:
+        await run_in_db_writer_executor(clear_iss_position_cells, db)
+    await warm_iss_position_buffers_and_indexes()
+    for satellite_id in config_utils.get_satellite_ids():
+        latest_iss_position = iss_position_buffers.get(satellite_id).latest()
+        if latest_iss_position:
+            position_hub.publish(latest_iss_position)
+    position_listeners = [iss_position_buffers.append, daylight_interval_indexes.append, position_hub.publish]
+    if time_windows_cache:
+        position_listeners.append(time_windows_cache.invalidate)
+    # The slots have a single writer: without the leader election, every worker would publish into them
+    if latest_position_slots and leader_election:
+        position_listeners.append(latest_position_slots.publish)
+    iss_position_writer = IssPositionWriter(db, config_utils.get_write_batch_size(),
+                                            config_utils.get_write_flush_interval(),
+                                            position_listeners=position_listeners,
+                                            max_pending=config_utils.get_write_max_pending(),
+                                            index_cells=config_utils.get_spatial_index_enabled())
+    iss_position_updater = IssPositionUpdater(db=db, config_utils=config_utils,
+                                              iss_position_writer=iss_position_writer)
+    tasks = [asyncio.create_task(iss_position_updater.run_iss_update_position_schedule())]
+    logger.debug("Started ISS Update Position Schedule")
+    if config_utils.get_backfill_enabled():
+        iss_position_backfiller = IssPositionBackfiller(db, config_utils=config_utils)
+        tasks.append(asyncio.create_task(backfill_iss_positions(iss_position_backfiller,
+                                                                iss_position_writer.position_listeners)))
+        logger.debug("Started the backfill of the IssPositions")
+    if config_utils.get_retention_enabled():
+        tasks.append(asyncio.create_task(RetentionJob(db, config_utils=config_utils).run_retention_schedule()))
+        logger.debug("Started Retention Schedule")
+    try:
+        # A failing task does not stop the others
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await iss_position_writer.drain()
+        ingestion_leader.set(0)
+
+
+async def relay_shared_positions() -> None:
+    """
+    Relays the IssPositions stored by the leader to the PositionHub and the daylight interval indexes of this worker
+    every second, as the IssPositions are only published to the hub of the worker that ingests them. They are read from
+    the DB after the latest row relayed, so that the bursts between two relays and the backfilled IssPositions are not
+    missed. The indexes are warmed in the background, and warmed again when older IssPositions are backfilled, as they
+    only accept IssPositions more recent than their latest one, so that /iss/sun/at and /iss/sun/summary do not load
+    their range from the DB on every request
+    """
+    position_listeners = [position_hub.publish, daylight_interval_indexes.append]
+    row_id = await run_in_db_executor(_get_latest_iss_position_row_id)
+    # The buffers stay cold, see _serve_stale_reads
+    warm_tasks = [asyncio.create_task(warm_iss_position_buffers_and_indexes(position_listeners, warm_buffers=False))]
+    backfilled = False
+
+    async def relay() -> None:
+        nonlocal row_id, backfilled
+        for row_id, iss_position in await run_in_db_executor(_get_iss_positions_added_after, row_id):
+            daylight_interval_index = daylight_interval_indexes.get(iss_position.satellite_id)
+            if daylight_interval_index and daylight_interval_index.last_timestamp and \
+                    iss_position.timestamp <= daylight_interval_index.last_timestamp:
+                backfilled = True
+            for position_listener in position_listeners:
+                position_listener(iss_position)
+        # A warm already running may have read the DB before the backfilled IssPositions
+        if backfilled and warm_tasks[-1].done():
+            backfilled = False
+            warm_tasks.append(asyncio.create_task(
+                warm_iss_position_buffers_and_indexes(position_listeners, warm_buffers=False)))
+
+    try:
+        await PollScheduler(1).run(relay)
+    finally:
+        warm_tasks[-1].cancel()
+
+
+def _get_latest_iss_position_row_id() -> int:
+    with ReadOnlySessionLocal() as db:
+        return get_latest_iss_position_row_id(db)
+
+
+def _get_iss_positions_added_after(row_id: int) -> list[tuple[int, IssPosition]]:
+    with ReadOnlySessionLocal() as db:
+        return [(row_id, IssPosition.model_validate(iss_position))
+                for row_id, iss_position in get_iss_positions_added_after(db, row_id)]
+
+
+def _serve_stale_reads() -> None:
+    # The IssPositions written by the leader are not seen by this worker: its buffers stay cold so that /iss/sun reads
+    # the DB, and its cached time windows only live for one poll interval
+    if time_windows_cache:
+        time_windows_cache.ttl_seconds = min(config_utils.get_sun_cache_ttl(), config_utils.get_wait_time())
+
+
+def _serve_live_reads() -> None:
+    if time_windows_cache:
+        time_windows_cache.clear()
+        time_windows_cache.ttl_seconds = config_utils.get_sun_cache_ttl()
+
+
 @asynccontextmanager
 async def lifespan(fastapi_app: FastAPI, db=get_lifespan_db()):
     """
-    It starts the schedule that saves the latest IssPosition at configured intervals
+    It starts the ingestion of the IssPositions. With the leader election enabled, only the worker holding the lock
+    ingests them, the others serve reads until the leader dies and one of them takes over. On shutdown, the pending
+    IssPositions are written to the DB and the leadership is released
     :param fastapi_app: the FastAPI app
     :param db: the DB
     """
-    iss_position_updater = IssPositionUpdater(db=db, config_utils=config_utils)
-    iss_updater_task = asyncio.create_task(iss_position_updater.run_iss_update_position_schedule())
-    logger.debug("Started ISS Update Position Schedule")
+    leader_election = None
+    if config_utils.get_leader_election_enabled():
+        leader_election = LeaderElection(config_utils.get_leader_lock_path() or f'{SQLALCHEMY_DATABASE_PATH}.leader',
+                                         config_utils.get_wait_time())
+        if not leader_election.try_acquire():
+            logger.info("Another worker ingests the IssPositions, this one only serves reads")
+            _serve_stale_reads()
+    ingestion_task = asyncio.create_task(ingest_iss_positions(db, leader_election))
     yield
-    iss_updater_task.cancel()
+    ingestion_task.cancel()
+    try:
+        await ingestion_task
+    except asyncio.CancelledError:
+        pass
+    if leader_election:
+        leader_election.release()
+
+
+def _count_rate_limit_exceeded(request: Request, exc: RateLimitExceeded) -> Response:
+    rate_limit_rejections.inc(1, (request.url.path,))
+    return _rate_limit_exceeded_handler(request, exc)
 
 
 def set_up_fastapi():
@@ -40,7 +249,7 @@ def set_up_fastapi():
     fastapi_app.include_router(iss_router.router)
     limiter.enabled = config_utils.get_limits_enabled()
     fastapi_app.state.limiter = limiter
-    fastapi_app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    fastapi_app.add_exception_handler(RateLimitExceeded, _count_rate_limit_exceeded)
     return fastapi_app
 
 
@@ -60,6 +269,16 @@ async def read_main(request: Request):
     return {"message": "Welcome to the ISS Tracker challenge!"}
 
 
+@app.get("/metrics")
+async def read_metrics():
+    """
+    Provides the metrics of the API in the Prometheus text exposition format. It is not rate limited, so that the
+    scrapes are never rejected
+    :return: the rendered metrics
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
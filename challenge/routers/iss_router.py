@@ -1,23 +1,59 @@
+import asyncio
+import base64
+import binascii
+import json
 import logging
+import os
+import time
+from contextlib import aclosing
 from datetime import datetime
+from typing import Iterator, AsyncIterator, Union, Literal
 
-from fastapi import APIRouter, Depends, Query
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.orm import Session
 from starlette.requests import Request
 
-from challenge.database.database import SessionLocal
-from challenge.database.iss_crud import get_latest_iss_position, get_iss_positions
-from challenge.database.models.models import IssPosition
-from challenge.utils.fastapi.fastapi_utils import limiter, get_config_utils
-from challenge.utils.operations.time_windows_utils import get_daylight_time_windows
+from challenge.database.daylight_windows_crud import get_daylight_windows
+from challenge.database.position_cells_crud import get_iss_position_cell_columns
+from challenge.database.database import ReadOnlySessionLocal, run_in_db_executor, is_file_database
+from challenge.database.iss_crud import get_latest_iss_position, get_time_range, iter_iss_position_columns, \
+    get_iss_position_columns, get_iss_position_page, \
+    get_downsampled_iss_position_rows, count_iss_positions
+from challenge.database import schemas
+from challenge.utils.fastapi.fastapi_utils import limiter, get_config_utils, iss_position_buffers, \
+    time_windows_cache, latest_position_slots, position_hub, position_payload_cache, daylight_interval_indexes, \
+    sun_process_pool
+from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndex
+from challenge.utils.metrics.iss_metrics import sun_request_seconds, sun_fetch_seconds, sun_compute_seconds, \
+    rows_scanned
+from challenge.utils.operations.downsampling_utils import get_lttb_indexes, get_transition_indexes
+from challenge.utils.operations.spatial_utils import get_cell_ranges, get_haversine_distances, get_passes
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows_vectorized, \
+    iter_daylight_time_windows
+from challenge.utils.parallel.parallel_time_windows import get_parallel_time_windows_async
+from challenge.utils.streaming.position_hub import PositionHubFullError
 
 router = APIRouter(prefix="/iss", tags=["iss"])
 logger = logging.getLogger(__name__)
 iss_router_rate_limit = get_config_utils().get_iss_router_rate_limit()
+daylight_windows_table_enabled = get_config_utils().get_daylight_windows_table_enabled()
+spatial_index_enabled = get_config_utils().get_spatial_index_enabled()
+default_satellite_id = get_config_utils().get_satellite_ids()[0]
+position_stream_timeout = get_config_utils().get_position_stream_timeout()
+positions_page_size = get_config_utils().get_positions_page_size()
+positions_max_page_size = get_config_utils().get_positions_max_page_size()
+positions_max_points = get_config_utils().get_positions_max_points()
+sun_parallel_min_rows = get_config_utils().get_sun_parallel_min_rows()
+sun_parallel_chunks = get_config_utils().get_sun_parallel_processes() or os.cpu_count()
+wait_time = get_config_utils().get_wait_time()
 
 
 def _get_db():
-    db = SessionLocal()
+    db = ReadOnlySessionLocal()
     try:
         yield db
     finally:
@@ -28,14 +64,22 @@ def _get_time_window_dict(time_window: tuple) -> dict:
     return {'start_time': time_window[0], 'end_time': time_window[1]}
 
 
-def _get_time_windows(iss_positions: list[IssPosition]) -> list[dict]:
+def _get_time_windows(timestamps, visibilities) -> list[dict]:
     return [_get_time_window_dict(time_window) for time_window in
-            get_daylight_time_windows(iss_positions)]
+            get_daylight_time_windows_vectorized(timestamps, visibilities)]
 
 
-def _get_brief_position_response(latest_iss_position: IssPosition) -> dict:
-    return {'latitude': latest_iss_position.latitude, 'longitude': latest_iss_position.longitude,
-            'timestamp': latest_iss_position.timestamp}
+def _iter_ndjson_time_windows(start_time: datetime, end_time: datetime, time_window_size: int,
+                              satellite_id: int) -> Iterator[str]:
+    # The session is owned by the generator, as it outlives the request's dependencies while the response streams
+    db = ReadOnlySessionLocal()
+    try:
+        column_chunks = iter_iss_position_columns(db, start_time, end_time, time_window_size,
+                                                  satellite_id=satellite_id)
+        for time_window in iter_daylight_time_windows(column_chunks):
+            yield json.dumps(jsonable_encoder(_get_time_window_dict(time_window))) + '\n'
+    finally:
+        db.close()
 
 
 @router.get("/sun")
@@ -57,36 +101,423 @@ async def read_sun(request: Request, db: Session = Depends(_get_db),
                                                  description="The size of the time window to consider to get "
                                                              "IssPositions: the given value will be subracted from "
                                                              "end_time to calculate the start_time. It's ignored if "
-                                                             "start_time is provided")):
+                                                             "start_time is provided"),
+                   satellite_id: int = Query(default_satellite_id, description="The NORAD id of the satellite")):
     """
-    Provides a List of time windows in which the ISS was exposed to the SUN
+    Provides a List of time windows in which the satellite, the ISS by default, was exposed to the SUN. Ranges covered
+    by the IssPosition buffer of the satellite are served without touching the DB, while the long ranges read from
+    the IssPositions are split into time chunks computed by a pool of processes
     :param start_time: start time for the exposed to sun time windows
     :param end_time: end time for the exposed to sun time windows
     :param time_window_size: used if start_time is not provided. It indicates the time in seconds to subtract from end_time to calculate the start_time
+    :param satellite_id: the NORAD id of the satellite
     :param db: the DB where the IssPosition is stored
-    :return: a List of time windows in which the ISS was exposed to the SUN
+    :return: a List of time windows in which the satellite was exposed to the SUN
     """
+    request_start = time.perf_counter()
+    if time_windows_cache is None:
+        time_windows, source = await _get_sun_time_windows(db, start_time, end_time, time_window_size, satellite_id)
+    else:
+        cache_key = time_windows_cache.get_key(satellite_id, start_time, end_time, time_window_size)
+        time_windows, source = time_windows_cache.get(cache_key), 'cache'
+        if time_windows is None:
+            time_windows, source = await _get_sun_time_windows(db, start_time, end_time, time_window_size,
+                                                               satellite_id)
+            time_windows_cache.put(cache_key, time_windows)
+    sun_request_seconds.observe(time.perf_counter() - request_start, (source,))
+    return time_windows
+
+
+async def _get_sun_time_windows(db: Session, start_time: datetime, end_time: datetime, time_window_size: int,
+                                satellite_id: int) -> tuple[list[dict], str]:
+    # Provides the time windows along with their source, the fetch and compute times being recorded per source
+    fetch_start = time.perf_counter()
+    buffer_start_time, buffer_end_time = get_time_range(start_time, end_time, time_window_size)
+    iss_position_buffer = iss_position_buffers.get(satellite_id)
+    if iss_position_buffer and iss_position_buffer.covers(buffer_start_time):
+        source = 'buffer'
+        timestamps, daylight = iss_position_buffer.get_columns(buffer_start_time, buffer_end_time)
+    elif daylight_windows_table_enabled:
+        source = 'daylight_windows'
+        daylight_windows = await run_in_db_executor(get_daylight_windows, db, start_time, end_time,
+                                                    time_window_size, satellite_id)
+        _observe_fetch(source, fetch_start, len(daylight_windows))
+        compute_start = time.perf_counter()
+        time_windows = [_get_time_window_dict(time_window) for time_window in daylight_windows]
+        sun_compute_seconds.observe(time.perf_counter() - compute_start, (source,))
+        return time_windows, source
+    else:
+        source = 'positions'
+        rows = await _count_parallel_rows(db, start_time, end_time, time_window_size, satellite_id)
+        if rows:
+            return await _get_parallel_time_windows(db, rows, start_time, end_time, time_window_size, satellite_id)
+        timestamps, daylight = await run_in_db_executor(get_iss_position_columns, db, ('timestamp', 'daylight'),
+                                                        start_time, end_time, time_window_size, satellite_id)
+    _observe_fetch(source, fetch_start, len(timestamps))
+    compute_start = time.perf_counter()
+    time_windows = _get_time_windows(timestamps, daylight)
+    sun_compute_seconds.observe(time.perf_counter() - compute_start, (source,))
+    return time_windows, source
+
+
+async def _count_parallel_rows(db: Session, start_time: datetime, end_time: datetime, time_window_size: int,
+                               satellite_id: int) -> int:
+    # Provides the IssPositions of the range if it is worth splitting among the process pool, 0 otherwise. The range
+    # holds at most one IssPosition every wait_time seconds, so the short ones are never counted. The processes open the
+    # DB by its URL, so a DB that is not backed by a file is never split
+    if sun_process_pool is None:
+        return 0
+    range_start_time, range_end_time = get_time_range(start_time, end_time, time_window_size)
+    if (range_end_time - range_start_time).total_seconds() / wait_time + 1 < sun_parallel_min_rows or \
+            not await run_in_db_executor(is_file_database, db.get_bind()):
+        return 0
+    rows = await run_in_db_executor(count_iss_positions, db, start_time, end_time, time_window_size, satellite_id)
+    return rows if rows >= sun_parallel_min_rows else 0
+
+
+async def _get_parallel_time_windows(db: Session, rows: int, start_time: datetime, end_time: datetime,
+                                     time_window_size: int, satellite_id: int) -> tuple[list[dict], str]:
+    # The time chunks are fetched and scanned by the process pool, the event loop only merges their time windows
+    source = 'positions_parallel'
+    compute_start = time.perf_counter()
+    start_time, end_time = get_time_range(start_time, end_time, time_window_size)
+    database_url = db.get_bind().url.render_as_string(hide_password=False)
+    daylight_time_windows = await get_parallel_time_windows_async(sun_process_pool, database_url, start_time,
+                                                                  end_time, sun_parallel_chunks, satellite_id)
+    time_windows = [_get_time_window_dict(time_window) for time_window in daylight_time_windows]
+    rows_scanned.observe(rows, (source,))
+    sun_compute_seconds.observe(time.perf_counter() - compute_start, (source,))
+    return time_windows, source
+
 
-    iss_positions = get_iss_positions(db, start_time, end_time,
-                                      time_window_size)
-    return _get_time_windows(iss_positions)
+def _observe_fetch(source: str, fetch_start: float, rows: int) -> None:
+    sun_fetch_seconds.observe(time.perf_counter() - fetch_start, (source,))
+    rows_scanned.observe(rows, (source,))
 
 
-@router.get("/position")
+@router.get("/sun/cache")
+@limiter.limit(iss_router_rate_limit)
+async def read_sun_cache(request: Request):
+    """
+    Provides the counters of the /iss/sun cache
+    :return: the hits, misses, evictions, invalidations, entries and size in bytes of the cache, empty if it is disabled
+    """
+    return time_windows_cache.get_stats() if time_windows_cache else {}
+
+
+@router.get("/sun/at")
+@limiter.limit(iss_router_rate_limit)
+async def read_sun_at(request: Request, db: Session = Depends(_get_db),
+                      timestamp: datetime = Query(None, description="The time at which the visibility is provided. By "
+                                                                    "default, it will be the time at which the query "
+                                                                    "is executed"),
+                      satellite_id: int = Query(default_satellite_id, description="The NORAD id of the satellite")):
+    """
+    Tells whether the satellite, the ISS by default, was exposed to the SUN at the given time, along with the daylight
+    window or the eclipse it was part of. It is answered by the daylight interval index of the satellite without
+    touching the DB, or from the IssPositions of the day before the given time if the index is not warmed
+    :param timestamp: the time
+    :param satellite_id: the NORAD id of the satellite
+    :param db: the DB where the IssPosition is stored
+    :return: the time, whether the satellite was in daylight, None if it is not known, and the start and end times of
+    the daylight window or of the eclipse, None if they are not known
+    """
+    timestamp = timestamp or datetime.now()
+    daylight_interval_index = await _get_daylight_interval_index(db, *get_time_range(None, timestamp, 86400),
+                                                                 satellite_id)
+    daylight, start_time, end_time = daylight_interval_index.lookup(timestamp) or (None, None, None)
+    return {'timestamp': timestamp, 'daylight': daylight, 'start_time': start_time, 'end_time': end_time}
+
+
+@router.get("/sun/summary")
+@limiter.limit(iss_router_rate_limit)
+async def read_sun_summary(request: Request, db: Session = Depends(_get_db),
+                           start_time: datetime = Query(None, description="Start timestamp of the range. By default, "
+                                                                          "it will be the time at which the query is "
+                                                                          "executed minus one day"),
+                           end_time: datetime = Query(None, description="End timestamp of the range. By default, it "
+                                                                        "will be the time at which the query is "
+                                                                        "executed"),
+                           time_window_size: int = Query(86400, description="The size of the range in seconds. It's "
+                                                                            "ignored if start_time is provided"),
+                           satellite_id: int = Query(default_satellite_id,
+                                                     description="The NORAD id of the satellite")):
+    """
+    Provides the time the satellite, the ISS by default, spent exposed to the SUN and in eclipse between the given
+    start and end times. It is answered by the daylight interval index of the satellite without touching the DB, or
+    from the IssPositions of the range if the index is not warmed
+    :param start_time: start time of the range
+    :param end_time: end time of the range
+    :param time_window_size: used if start_time is not provided. It indicates the time in seconds to subtract from end_time to calculate the start_time
+    :param satellite_id: the NORAD id of the satellite
+    :param db: the DB where the IssPosition is stored
+    :return: the part of the range covered by IssPositions, the daylight and eclipsed seconds within it and the number
+    of daylight windows overlapping it
+    """
+    start_time, end_time = get_time_range(start_time, end_time, time_window_size)
+    daylight_interval_index = await _get_daylight_interval_index(db, start_time, end_time, satellite_id)
+    return daylight_interval_index.get_summary(start_time, end_time)
+
+
+async def _get_daylight_interval_index(db: Session, start_time: datetime, end_time: datetime,
+                                       satellite_id: int) -> DaylightIntervalIndex:
+    # The index is warmed in the worker that ingests the IssPositions and in the ones relaying the IssPositions it
+    # stores, the range is loaded from the DB until then
+    daylight_interval_index = daylight_interval_indexes.get(satellite_id)
+    if daylight_interval_index and daylight_interval_index.warmed:
+        return daylight_interval_index
+    daylight_interval_index = DaylightIntervalIndex(satellite_id)
+    await run_in_db_executor(daylight_interval_index.load, db, start_time, end_time, daylight_windows_table_enabled)
+    return daylight_interval_index
+
+
+@router.get("/sun/stream")
+@limiter.limit(iss_router_rate_limit)
+async def read_sun_stream(request: Request,
+                          start_time: datetime = Query(None,
+                                                       description="Start timestamp for the exposed to sun time "
+                                                                   "windows. By default, it will be the time at "
+                                                                   "which the query is executed minus one day"),
+                          end_time: datetime = Query(None,
+                                                     description="End timestamp for the exposed to SUN time windows. "
+                                                                 "By default, it will be the time at which the query "
+                                                                 "is executed"),
+                          time_window_size: int = Query(86400,
+                                                        description="The size of the time window to consider to get "
+                                                                    "IssPositions. It's ignored if start_time is "
+                                                                    "provided"),
+                          satellite_id: int = Query(default_satellite_id,
+                                                    description="The NORAD id of the satellite")):
+    """
+    Streams the time windows in which the ISS was exposed to the SUN as NDJSON, one window per line as soon as it
+    closes. The IssPositions are fetched chunk by chunk, so memory stays flat regardless of the size of the range
+    :param start_time: start time for the exposed to sun time windows
+    :param end_time: end time for the exposed to sun time windows
+    :param time_window_size: used if start_time is not provided. It indicates the time in seconds to subtract from end_time to calculate the start_time
+    :param satellite_id: the NORAD id of the satellite
+    :return: a StreamingResponse of time windows in which the ISS was exposed to the SUN
+    """
+    return StreamingResponse(_iter_ndjson_time_windows(start_time, end_time, time_window_size, satellite_id),
+                             media_type='application/x-ndjson')
+
+
+@router.get("/position", response_model=Union[schemas.IssPosition, schemas.IssPositionBrief, dict])
 @limiter.limit(iss_router_rate_limit)
 async def read_position(request: Request, db: Session = Depends(_get_db),
-                        detailed: bool = Query(False, description="Return a detailed IssPosition")):
+                        detailed: bool = Query(False, description="Return a detailed IssPosition"),
+                        satellite_id: int = Query(default_satellite_id, description="The NORAD id of the satellite")):
     """
-    Gets the latest position of the ISS
+    Gets the latest position of the satellite, the ISS by default, from its IssPosition buffer if it is not empty,
+    then from the latest IssPosition shared by the ingesting worker if it is not stale, and from the DB otherwise. Its
+    JSON body is encoded once per IssPosition and then served as is
     :param db: the DB where the IssPosition is stored
     :param detailed: if false, it will only return latitude, longitude and timestamp of the latest IssPosition
+    :param satellite_id: the NORAD id of the satellite
     :return: the latest IssPosition
     """
-    latest_iss_position = get_latest_iss_position(db)
-    response = {}
-    if latest_iss_position:
-        if detailed:
-            response = latest_iss_position
+    iss_position_buffer = iss_position_buffers.get(satellite_id)
+    latest_iss_position = (iss_position_buffer and iss_position_buffer.latest()) or (
+            latest_position_slots and latest_position_slots.read(satellite_id)) or await run_in_db_executor(
+        get_latest_iss_position, db, satellite_id)
+    payload = position_payload_cache.get(latest_iss_position, detailed) if latest_iss_position else b'{}'
+    return Response(payload, media_type='application/json')
+
+
+@router.get("/positions")
+@limiter.limit(iss_router_rate_limit)
+async def read_positions(request: Request, db: Session = Depends(_get_db),
+                         start_time: datetime = Query(None, description="Start timestamp of the IssPositions. By "
+                                                                        "default, the history starts from the oldest "
+                                                                        "IssPosition"),
+                         end_time: datetime = Query(None, description="End timestamp of the IssPositions. By default, "
+                                                                      "it will be the time at which the query is "
+                                                                      "executed"),
+                         fields: str = Query(None, description="Comma separated fields of the IssPositions to return. "
+                                                               "By default, all of them"),
+                         limit: int = Query(None, ge=1, description="The maximum number of IssPositions of the page, "
+                                                                    "capped by the configured maximum"),
+                         cursor: str = Query(None, description="The next_cursor of the previous page"),
+                         max_points: int = Query(None, ge=2, description="Downsample the whole range to about this "
+                                                                         "number of IssPositions, capped by the "
+                                                                         "configured maximum, instead of paginating "
+                                                                         "it"),
+                         downsampling: Literal['bucket', 'lttb'] = Query('bucket', description="With max_points, "
+                                                                                               "either the first "
+                                                                                               "IssPosition of every "
+                                                                                               "time bucket or the "
+                                                                                               "Largest-Triangle-"
+                                                                                               "Three-Buckets of the "
+                                                                                               "latitudes"),
+                         satellite_id: int = Query(default_satellite_id,
+                                                   description="The NORAD id of the satellite")):
+    """
+    Provides the history of the IssPositions of the satellite, the ISS by default, page by page sorted by timestamp.
+    Each page starts right after the last IssPosition of the previous one, identified by an opaque cursor, so that
+    every page takes the same time to read however deep it is. Only the requested fields are selected and returned.
+    With max_points, the whole range is returned downsampled in a single page instead: max_points IssPositions plus
+    the ones on both sides of every visibility transition, which are always kept
+    :param start_time: start time of the IssPositions
+    :param end_time: end time of the IssPositions
+    :param fields: the comma separated fields to return
+    :param limit: the maximum number of IssPositions of the page
+    :param cursor: the next_cursor of the previous page, None for the first page
+    :param max_points: the number of IssPositions to downsample the range to, None to paginate it
+    :param downsampling: bucket to downsample in the DB, lttb to preserve the shape of the latitudes
+    :param satellite_id: the NORAD id of the satellite
+    :param db: the DB where the IssPosition is stored
+    :return: the IssPositions of the page and the next_cursor, None on the last page
+    """
+    columns = _get_position_fields(fields)
+    if max_points:
+        if cursor:
+            raise HTTPException(status_code=400, detail="A downsampled range has a single page")
+        max_points = min(max_points, positions_max_points)
+        if downsampling == 'lttb':
+            positions = await _get_lttb_positions(db, columns, max_points, start_time, end_time, satellite_id)
         else:
-            response = _get_brief_position_response(latest_iss_position)
-    return response
+            rows = await run_in_db_executor(get_downsampled_iss_position_rows, db, columns, max_points, start_time,
+                                            end_time, satellite_id)
+            positions = [dict(zip(columns, row)) for row in rows]
+        return Response(orjson.dumps({'positions': positions, 'next_cursor': None}), media_type='application/json')
+    after = _decode_cursor(cursor) if cursor else None
+    page_size = min(limit or positions_page_size, positions_max_page_size)
+    # One more IssPosition tells whether there is a next page
+    rows = await run_in_db_executor(get_iss_position_page, db, columns, start_time, end_time, satellite_id, after,
+                                    page_size + 1)
+    next_cursor = _encode_cursor(*rows[page_size - 1][-2:]) if len(rows) > page_size else None
+    positions = [dict(zip(columns, row)) for row in rows[:page_size]]
+    return Response(orjson.dumps({'positions': positions, 'next_cursor': next_cursor}),
+                    media_type='application/json')
+
+
+async def _get_lttb_positions(db: Session, columns: tuple[str, ...], max_points: int, start_time: datetime,
+                              end_time: datetime, satellite_id: int) -> list[dict]:
+    array_columns = tuple(dict.fromkeys((*columns, 'timestamp', 'latitude', 'daylight')))
+    arrays = dict(zip(array_columns, await run_in_db_executor(get_iss_position_columns, db, array_columns,
+                                                              start_time or datetime.min, end_time, 86400,
+                                                              satellite_id)))
+    indexes = np.union1d(get_lttb_indexes(arrays['timestamp'].astype(np.int64), arrays['latitude'], max_points),
+                         get_transition_indexes(arrays['daylight']))
+    return [dict(zip(columns, values)) for values in zip(*[arrays[column][indexes].tolist() for column in columns])]
+
+
+def _get_position_fields(fields: str) -> tuple[str, ...]:
+    if not fields:
+        return tuple(schemas.IssPosition.model_fields)
+    columns = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown_fields = [column for column in columns if column not in schemas.IssPosition.model_fields]
+    if not columns or unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown_fields) or fields}")
+    return columns
+
+
+def _encode_cursor(satellite_id: int, timestamp: datetime) -> str:
+    return base64.urlsafe_b64encode(f'{satellite_id},{timestamp.isoformat()}'.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[int, datetime]:
+    try:
+        satellite_id, timestamp = base64.urlsafe_b64decode(cursor.encode()).decode().split(',')
+        return int(satellite_id), datetime.fromisoformat(timestamp)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/passes")
+@limiter.limit(iss_router_rate_limit)
+async def read_passes(request: Request, db: Session = Depends(_get_db),
+                      lat: float = Query(..., ge=-90, le=90, description="Latitude of the location in degrees"),
+                      lon: float = Query(..., ge=-180, le=180, description="Longitude of the location in degrees"),
+                      radius_km: float = Query(500, gt=0, le=5000, description="Distance in km from the location "
+                                                                               "within which the satellite passes"),
+                      start_time: datetime = Query(None, description="Start timestamp of the passes. By default, the "
+                                                                     "history starts from the oldest IssPosition"),
+                      end_time: datetime = Query(None, description="End timestamp of the passes. By default, it will "
+                                                                   "be the time at which the query is executed"),
+                      satellite_id: int = Query(default_satellite_id, description="The NORAD id of the satellite")):
+    """
+    Provides the passes of the satellite, the ISS by default, within the given distance of the given location. The
+    IssPositions are first pruned with the lat/lon grid cells overlapping the circle, then their exact great-circle
+    distances are checked at once
+    :param lat: the latitude of the location
+    :param lon: the longitude of the location
+    :param radius_km: the distance in km
+    :param start_time: start time of the passes
+    :param end_time: end time of the passes
+    :param satellite_id: the NORAD id of the satellite
+    :param db: the DB where the IssPosition is stored
+    :return: a List of passes with their start and end times, the time of the closest IssPosition and its distance
+    """
+    return await run_in_db_executor(_get_passes, db, lat, lon, radius_km, start_time, end_time, satellite_id)
+
+
+def _get_passes(db: Session, latitude: float, longitude: float, radius_km: float, start_time: datetime,
+                end_time: datetime, satellite_id: int) -> list[dict]:
+    if spatial_index_enabled:
+        timestamps, latitudes, longitudes = get_iss_position_cell_columns(
+            db, get_cell_ranges(latitude, longitude, radius_km), start_time, end_time, satellite_id)
+    else:
+        timestamps, latitudes, longitudes = get_iss_position_columns(
+            db, ('timestamp', 'latitude', 'longitude'), start_time or datetime.min, end_time,
+            satellite_id=satellite_id)
+    distances = get_haversine_distances(latitude, longitude, latitudes, longitudes)
+    close = distances <= radius_km
+    return get_passes(timestamps[close], distances[close])
+
+
+@router.get("/position/stream")
+@limiter.limit(iss_router_rate_limit)
+async def read_position_stream(request: Request,
+                               satellite_id: int = Query(default_satellite_id,
+                                                         description="The NORAD id of the satellite")):
+    """
+    Streams the IssPositions of the satellite, the ISS by default, as Server-Sent Events as soon as they are added,
+    starting with the latest one. A client that cannot keep up only receives the latest IssPosition
+    :param satellite_id: the NORAD id of the satellite
+    :return: a StreamingResponse of position events, with a keepalive comment when there is no update
+    """
+    if position_hub.is_full():
+        raise HTTPException(status_code=503, detail="Too many clients are streaming the positions")
+    return StreamingResponse(_iter_position_events(satellite_id), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def _iter_position_events(satellite_id: int) -> AsyncIterator[bytes]:
+    try:
+        async with aclosing(position_hub.subscribe(satellite_id, position_stream_timeout)) as position_updates:
+            async for position_update in position_updates:
+                yield position_update.event if position_update else b': keepalive\n\n'
+    except PositionHubFullError:
+        return
+
+
+@router.websocket("/ws")
+async def position_websocket(websocket: WebSocket, satellite_id: int = default_satellite_id):
+    """
+    Pushes the IssPositions of the satellite, the ISS by default, as JSON text messages as soon as they are added,
+    starting with the latest one. A client that cannot keep up only receives the latest IssPosition, and it is
+    disconnected if a message cannot be sent within the stream timeout
+    :param websocket: the WebSocket
+    :param satellite_id: the NORAD id of the satellite
+    """
+    await websocket.accept()
+    position_sender = asyncio.create_task(_send_position_updates(websocket, satellite_id))
+    try:
+        # The client sends nothing but its close frame, which must be received to stop sending the updates
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        position_sender.cancel()
+
+
+async def _send_position_updates(websocket: WebSocket, satellite_id: int) -> None:
+    try:
+        async with aclosing(position_hub.subscribe(satellite_id)) as position_updates:
+            async for position_update in position_updates:
+                await asyncio.wait_for(websocket.send_text(position_update.json), position_stream_timeout)
+    except PositionHubFullError:
+        await websocket.close(code=1013, reason="Too many clients are streaming the positions")
+    except asyncio.TimeoutError:
+        await websocket.close(code=1008, reason="The positions are not consumed")
+    except WebSocketDisconnect:
+        pass
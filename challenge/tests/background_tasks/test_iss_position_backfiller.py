@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from challenge.background_tasks.iss_position_backfiller import IssPositionBackfiller
+from challenge.database.daylight_windows_crud import check_daylight_windows, rebuild_daylight_windows
+from challenge.database.iss_crud import add_iss_positions, get_iss_positions, get_iss_position_gaps
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+from challenge.utils.config.config_utils import ConfigUtils
+
+SATELLITE_ID = 25544
+VISIBILITIES = ([Visibility.ECLIPSED] * 10 + [Visibility.DAYLIGHT] * 15) * 4
+
+
+@pytest_asyncio.fixture
+async def stub_upstream():
+    """
+    Local stub of the bulk positions endpoint, answering with the sample IssPositions of the requested timestamps
+    """
+    iss_positions = {int(iss_position.timestamp.timestamp()): iss_position for iss_position in
+                     get_sample_iss_positions(VISIBILITIES, satellite_id=SATELLITE_ID)}
+    requested_timestamps = []
+
+    async def get_positions(request: web.Request) -> web.Response:
+        timestamps = [int(timestamp) for timestamp in parse_qs(request.query_string)['timestamps'][0].split(',')]
+        requested_timestamps.append(timestamps)
+        return web.json_response([{**iss_positions[timestamp].model_dump(mode='json'), 'id': SATELLITE_ID,
+                                   'visibility': iss_positions[timestamp].visibility.value, 'timestamp': timestamp}
+                                  for timestamp in timestamps])
+
+    app = web.Application()
+    app.router.add_get('/satellites/{satellite_id}/positions', get_positions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}/satellites/{{satellite_id}}/positions?timestamps={{timestamps}}', \
+        requested_timestamps
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_backfill(db, stub_upstream):
+    """
+    Tests that backfill fills every gap through the bulk positions endpoint, in batches, and rebuilds the daylight
+    windows
+    :param db: the DB
+    :param stub_upstream: the URL template of the stub upstream and the timestamps it was requested
+    """
+    positions_url_template, requested_timestamps = stub_upstream
+    iss_positions = get_sample_iss_positions(VISIBILITIES, satellite_id=SATELLITE_ID)
+    stored_iss_positions = iss_positions[:5] + iss_positions[8:30] + iss_positions[61:]
+    add_iss_positions(db, stored_iss_positions)
+    rebuild_daylight_windows(db)
+    assert len(get_iss_position_gaps(db, SATELLITE_ID, 30, datetime.min)) == 2
+
+    iss_position_backfiller = IssPositionBackfiller(db, wait_time=20, config_utils=ConfigUtils(),
+                                                    satellite_ids=[SATELLITE_ID],
+                                                    positions_url_template=positions_url_template, batch_size=10)
+    added = await iss_position_backfiller.backfill(FIRST_TIMESTAMP, iss_positions[-1].timestamp)
+
+    assert added == len(iss_positions) - len(stored_iss_positions)
+    assert all(len(timestamps) <= 10 for timestamps in requested_timestamps)
+    # The 34 missing timestamps of both gaps are requested in 4 batches
+    assert len(requested_timestamps) == 4
+    assert get_iss_position_gaps(db, SATELLITE_ID, 30, datetime.min) == []
+    assert [iss_position.timestamp for iss_position in get_iss_positions(db, datetime.min, datetime.max)] == \
+           [iss_position.timestamp for iss_position in iss_positions]
+    assert check_daylight_windows(db)
+
+    assert await iss_position_backfiller.backfill(FIRST_TIMESTAMP, iss_positions[-1].timestamp) == 0
+
+
+@pytest.mark.asyncio
+async def test_backfill_trailing_gap(db, stub_upstream):
+    """
+    Tests that backfill also fills the gap between the latest IssPosition and the end time, up to one wait time before
+    the end time, but not the gaps before the start time
+    :param db: the DB
+    :param stub_upstream: the URL template of the stub upstream and the timestamps it was requested
+    """
+    positions_url_template, requested_timestamps = stub_upstream
+    iss_positions = get_sample_iss_positions(VISIBILITIES, satellite_id=SATELLITE_ID)
+    add_iss_positions(db, iss_positions[:3] + iss_positions[50:60])
+    iss_position_backfiller = IssPositionBackfiller(db, wait_time=20, config_utils=ConfigUtils(),
+                                                    satellite_ids=[SATELLITE_ID],
+                                                    positions_url_template=positions_url_template, batch_size=10)
+
+    added = await iss_position_backfiller.backfill(iss_positions[50].timestamp,
+                                                   iss_positions[70].timestamp + timedelta(seconds=5))
+
+    assert added == 10
+    assert [timestamp for timestamps in requested_timestamps for timestamp in timestamps] == \
+           [int(iss_position.timestamp.timestamp()) for iss_position in iss_positions[60:70]]
@@ -1,9 +1,11 @@
 import asyncio
+from itertools import count
 from unittest.mock import Mock
 
 import pytest
 
 from challenge.background_tasks.iss_position_updater import IssPositionUpdater
+from challenge.background_tasks.iss_position_writer import IssPositionWriter
 from challenge.database.schemas import IssPosition
 
 SAMPLE_ISS_POSITION_JSON = {"name": "iss", "id": 25544, "latitude": 30.935867918778, "longitude": -110.64276858065,
@@ -14,12 +16,7 @@ SAMPLE_ISS_POSITION_JSON = {"name": "iss", "id": 25544, "latitude": 30.935867918
 
 @pytest.fixture
 def iss_position_updater():
-    return IssPositionUpdater(Mock(), {'User-Agent': 'test'}, 1, "fake_url", None)
-
-
-@pytest.fixture
-def mock_aioschedule(mocker) -> dict:
-    return {'run_pending': mocker.patch('aioschedule.run_pending'), 'every': mocker.patch('aioschedule.every')}
+    return IssPositionUpdater(Mock(), {'User-Agent': 'test'}, 1, "fake_url")
 
 
 @pytest.fixture
@@ -34,42 +31,104 @@ def mock_get_iss_position_from_api(mocker):
 
 
 @pytest.fixture
-def mock_add_iss_position(mocker):
-    return mocker.patch('challenge.background_tasks.iss_position_updater.add_iss_position')
+def mock_iss_position_writer(mocker):
+    return mocker.patch.object(IssPositionWriter, 'add')
 
 
 @pytest.mark.asyncio
-async def test_run_iss_update_position_schedule(mock_aioschedule, mock_update_iss_position, iss_position_updater):
+async def test_run_iss_update_position_schedule(mock_update_iss_position, iss_position_updater):
     """
     Tests run_iss_update_position_schedule
 
-    :param mock_aioschedule: the dict of mocks related to aioschedule
     :param mock_update_iss_position: the mock update_iss_position method
     :param iss_position_updater: the IssPositionUpdater
     """
     task = asyncio.create_task(
         iss_position_updater.run_iss_update_position_schedule())
     await asyncio.sleep(0.01)
-    mock_aioschedule['run_pending'].assert_called()
-    mock_aioschedule['every'].assert_called_with(
-        iss_position_updater.wait_time)
-    mock_aioschedule['every'].return_value.seconds.do.assert_called_with(
-        mock_update_iss_position)
     mock_update_iss_position.assert_called_once()
-    task.cancel()
+    assert iss_position_updater.poll_scheduler.interval == iss_position_updater.wait_time
+
+    iss_position_updater.stop_schedule = True
+    iss_position_updater.poll_scheduler.stop()
+    await asyncio.wait_for(task, 1)
+    mock_update_iss_position.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_update_iss_position(iss_position_updater, mock_get_iss_position_from_api, mock_add_iss_position):
+async def test_update_iss_position(iss_position_updater, mock_get_iss_position_from_api, mock_iss_position_writer):
     """
     Tests update_iss_position
 
     :param iss_position_updater: the IssPositionUpdater
     :param mock_get_iss_position_from_api: the mocked get method
-    :param mock_add_iss_position: the mocked add_iss_position method
+    :param mock_iss_position_writer: the mocked IssPositionWriter add method
     """
     await iss_position_updater.update_iss_position()
-    mock_get_iss_position_from_api.assert_called_with(iss_position_updater.iss_position_url,
+    mock_get_iss_position_from_api.assert_called_with(iss_position_updater.iss_position_urls[0],
                                                       iss_position_updater._session)
-    mock_add_iss_position.assert_called_with(iss_position_updater.db,
-                                             IssPosition.from_json(SAMPLE_ISS_POSITION_JSON))
+    mock_iss_position_writer.assert_called_with([IssPosition.from_json(SAMPLE_ISS_POSITION_JSON)])
+
+
+@pytest.mark.asyncio
+async def test_update_iss_positions_of_all_satellites(mocker, mock_iss_position_writer):
+    """
+    Tests that update_iss_position polls every tracked satellite with bounded concurrency and writes all the
+    IssPositions in one batch
+
+    :param mocker: the mocker
+    :param mock_iss_position_writer: the mocked IssPositionWriter add method
+    """
+    satellite_ids = list(range(1, 21))
+    concurrent_requests = {'current': 0, 'max': 0}
+
+    async def get_iss_position_json(url, session):
+        concurrent_requests['current'] += 1
+        concurrent_requests['max'] = max(concurrent_requests['max'], concurrent_requests['current'])
+        await asyncio.sleep(0.01)
+        concurrent_requests['current'] -= 1
+        return {**SAMPLE_ISS_POSITION_JSON, 'id': int(url.rsplit('/', 1)[1])}
+
+    mocker.patch('challenge.background_tasks.iss_position_updater.get', side_effect=get_iss_position_json)
+    config_utils = Mock(get_satellite_url_template=Mock(return_value='http://stub/satellites/{satellite_id}'),
+                        get_max_concurrent_requests=Mock(return_value=5),
+                        get_host_requests_per_second=Mock(return_value=0))
+    iss_position_updater = IssPositionUpdater(Mock(), {'User-Agent': 'test'}, 1, config_utils=config_utils,
+                                              satellite_ids=satellite_ids)
+
+    await iss_position_updater.update_iss_position()
+
+    assert concurrent_requests['max'] == 5
+    mock_iss_position_writer.assert_called_once()
+    iss_positions = mock_iss_position_writer.call_args.args[0]
+    assert [iss_position.satellite_id for iss_position in iss_positions] == satellite_ids
+
+
+@pytest.mark.asyncio
+async def test_update_iss_positions_spread_across_ticks(mocker, mock_iss_position_writer):
+    """
+    Tests that, with a host rate limit, the satellites are spread across the poll ticks of the wait time, so that
+    every tick requests each host once and no request waits for the rate limit
+
+    :param mocker: the mocker
+    :param mock_iss_position_writer: the mocked IssPositionWriter add method
+    """
+    satellite_ids = list(range(1, 11))
+    mocker.patch('challenge.background_tasks.iss_position_updater.get',
+                 side_effect=lambda url, session: {**SAMPLE_ISS_POSITION_JSON, 'id': int(url.rsplit('/', 1)[1])})
+    mock_sleep = mocker.patch('challenge.utils.requests.host_rate_limiter.asyncio.sleep')
+    # The ticks are 2 seconds apart, far more than the 0.2 seconds between two requests to the host
+    mocker.patch('challenge.utils.requests.host_rate_limiter.time.monotonic', side_effect=count(0, 2))
+    config_utils = Mock(get_satellite_url_template=Mock(return_value='http://stub/satellites/{satellite_id}'),
+                        get_max_concurrent_requests=Mock(return_value=5),
+                        get_host_requests_per_second=Mock(return_value=5))
+    iss_position_updater = IssPositionUpdater(Mock(), {'User-Agent': 'test'}, 20, config_utils=config_utils,
+                                              satellite_ids=satellite_ids)
+    assert len(iss_position_updater.poll_slices) == 10
+    assert iss_position_updater.poll_scheduler.interval == 2
+
+    for _ in range(len(satellite_ids)):
+        await iss_position_updater.update_iss_position()
+
+    mock_sleep.assert_not_called()
+    assert [call.args[0][0].satellite_id for call in mock_iss_position_writer.call_args_list] == satellite_ids
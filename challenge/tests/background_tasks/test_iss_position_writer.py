@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from challenge.background_tasks.iss_position_writer import IssPositionWriter
+from challenge.database.iss_crud import get_iss_positions
+from challenge.database.models.models import DaylightWindow
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+
+VISIBILITIES = [Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.DAYLIGHT, Visibility.ECLIPSED]
+
+
+@pytest.mark.asyncio
+async def test_flush_on_batch_size(db):
+    """
+    Tests that the pending IssPositions are stored, with their daylight windows, once the batch is full
+    :param db: the DB
+    """
+    position_listener = Mock()
+    iss_position_writer = IssPositionWriter(db, batch_size=4, flush_interval=60, position_listeners=[position_listener])
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+
+    await iss_position_writer.add(iss_positions[:3])
+    assert get_iss_positions(db, FIRST_TIMESTAMP) == []
+    position_listener.assert_not_called()
+
+    await iss_position_writer.add(iss_positions[3:])
+    assert len(get_iss_positions(db, FIRST_TIMESTAMP)) == 4
+    assert [(window.start_time, window.end_time) for window in db.query(DaylightWindow).all()] == \
+           [(iss_positions[1].timestamp, iss_positions[3].timestamp)]
+    assert [call.args[0] for call in position_listener.call_args_list] == iss_positions
+    await iss_position_writer.drain()
+
+
+@pytest.mark.asyncio
+async def test_flush_on_interval_and_drain(db):
+    """
+    Tests that the pending IssPositions are stored after the flush interval and on drain
+    :param db: the DB
+    """
+    iss_position_writer = IssPositionWriter(db, batch_size=100, flush_interval=0.01)
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+
+    await iss_position_writer.add(iss_positions[:2])
+    await asyncio.sleep(0.05)
+    assert len(get_iss_positions(db, FIRST_TIMESTAMP)) == 2
+
+    iss_position_writer.flush_interval = 60
+    await iss_position_writer.add(iss_positions[2:])
+    await iss_position_writer.drain()
+    assert len(get_iss_positions(db, FIRST_TIMESTAMP)) == 4
+
+
+@pytest.mark.asyncio
+async def test_duplicated_positions_are_skipped(db):
+    """
+    Tests that IssPositions already stored are skipped without failing the batch and without notifying the listeners
+    :param db: the DB
+    """
+    position_listener = Mock()
+    iss_position_writer = IssPositionWriter(db, batch_size=1, position_listeners=[position_listener])
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+
+    await iss_position_writer.add(iss_positions[:2])
+    await iss_position_writer.add(iss_positions[1:2] + iss_positions[1:])
+    assert len(get_iss_positions(db, FIRST_TIMESTAMP)) == 4
+    assert [call.args[0] for call in position_listener.call_args_list] == iss_positions
+
+
+@pytest.mark.asyncio
+async def test_pending_positions_are_capped(db, mocker):
+    """
+    Tests that, while the DB keeps failing, the pending IssPositions are retried up to max_pending of them, the oldest
+    ones being dropped, and that the kept ones are stored once the DB recovers
+    :param db: the DB
+    :param mocker: the mocker
+    """
+    iss_position_writer = IssPositionWriter(db, batch_size=2, max_pending=5)
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 12)
+    mock_store = mocker.patch.object(IssPositionWriter, '_store_iss_positions', side_effect=Exception('locked'))
+
+    for first in range(0, 10, 2):
+        await iss_position_writer.add(iss_positions[first:first + 2])
+    assert mock_store.call_count == 5
+    assert [len(call.args[0]) for call in mock_store.call_args_list] == [2, 4, 5, 5, 5]
+
+    mocker.stopall()
+    await iss_position_writer.add(iss_positions[10:])
+    assert [iss_position.timestamp for iss_position in get_iss_positions(db, FIRST_TIMESTAMP)] == \
+           [iss_position.timestamp for iss_position in iss_positions[7:]]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from challenge.background_tasks.retention_job import RetentionJob
+from challenge.database import retention_crud
+from challenge.database.database import run_in_db_writer_executor
+from challenge.database.iss_crud import add_iss_positions
+from challenge.database.models.models import IssPosition, IssPositionRollup
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+
+
+@pytest.mark.asyncio
+async def test_apply_retention(db):
+    """
+    Tests that apply_retention compacts the IssPositions older than every tier, leaving the recent ones raw
+    :param db: the DB
+    """
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 540))
+    now = FIRST_TIMESTAMP + timedelta(hours=3)
+    retention_job = RetentionJob(db, rollup_tiers=[(3600, 600), (7200, 3600)], batch_size=50, interval=60)
+
+    dropped = await retention_job.apply_retention(now)
+
+    assert dropped > 0
+    assert db.query(IssPosition).filter(IssPosition.timestamp < now - timedelta(hours=1)).count() == 0
+    assert db.query(IssPosition).count() == 180
+    resolutions = {resolution for resolution, in db.query(IssPositionRollup.resolution).distinct()}
+    assert resolutions == {600, 3600}
+    assert await retention_job.apply_retention(now) == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_retention_between_writes(db, mocker):
+    """
+    Tests that apply_retention submits one batch at a time to the DB writer executor, so that a write submitted during
+    the compaction runs before the next batch instead of after the whole compaction
+    :param db: the DB
+    :param mocker: the mocker
+    """
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 540))
+    calls = []
+
+    def compact_iss_position_batch(*args):
+        calls.append('batch')
+        return retention_crud.compact_iss_position_batch(*args)
+
+    mocker.patch('challenge.background_tasks.retention_job.compact_iss_position_batch', compact_iss_position_batch)
+    retention_job = RetentionJob(db, rollup_tiers=[(3600, 600)], batch_size=50, interval=60)
+
+    retention_task = asyncio.create_task(retention_job.apply_retention(FIRST_TIMESTAMP + timedelta(hours=3)))
+    await asyncio.sleep(0)
+    await run_in_db_writer_executor(calls.append, 'write')
+    await retention_task
+
+    assert calls[:2] == ['batch', 'write']
+    assert calls.count('batch') > 2
+
+
+@pytest.mark.asyncio
+async def test_apply_retention_max_age(db):
+    """
+    Tests that apply_retention deletes the IssPositions and rollups past the maximum age, so that the coarsest tier
+    does not grow forever
+    :param db: the DB
+    """
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 540))
+    now = FIRST_TIMESTAMP + timedelta(hours=3)
+    retention_job = RetentionJob(db, rollup_tiers=[(3600, 600)], max_age=7200, batch_size=50, interval=60)
+
+    await retention_job.apply_retention(now)
+
+    assert db.query(IssPositionRollup).filter(IssPositionRollup.timestamp < now - timedelta(hours=2)).count() == 0
+    assert db.query(IssPositionRollup).count() == 6
+    assert db.query(IssPosition).count() == 180
+
+
+@pytest.mark.asyncio
+async def test_run_retention_schedule(db, mocker):
+    """
+    Tests that run_retention_schedule runs apply_retention on the PollScheduler until it is stopped
+    :param db: the DB
+    :param mocker: the mocker
+    """
+    mock_apply_retention = mocker.patch.object(RetentionJob, 'apply_retention')
+    retention_job = RetentionJob(db, rollup_tiers=[], batch_size=50, interval=60)
+
+    task = asyncio.create_task(retention_job.run_retention_schedule())
+    await asyncio.sleep(0.01)
+    mock_apply_retention.assert_called_once()
+    assert retention_job.poll_scheduler.interval == 60
+
+    retention_job.stop_schedule = True
+    retention_job.poll_scheduler.stop()
+    await asyncio.wait_for(task, 1)
+    mock_apply_retention.assert_called_once()
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text, create_engine
+from sqlalchemy.exc import OperationalError
+
+from challenge.database.database import create_writer_engine, create_reader_engine, Base, is_file_database
+from challenge.database.models import models  # noqa: F401, registers the tables on Base
+
+PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -1024, 'mmap_size': 1048576}
+
+
+@pytest.fixture
+def engines(tmp_path):
+    db_path = tmp_path / 'test.db'
+    writer_engine = create_writer_engine(str(db_path), PRAGMAS)
+    Base.metadata.create_all(bind=writer_engine)
+    reader_engine = create_reader_engine(str(db_path), PRAGMAS, pool_size=2)
+    yield writer_engine, reader_engine
+    writer_engine.dispose()
+    reader_engine.dispose()
+
+
+def test_storage_profile_pragmas(engines):
+    """
+    Tests that the PRAGMAs of the storage profile are set on the writer and reader connections
+    :param engines: the writer and reader Engines
+    """
+    for engine in engines:
+        with engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert connection.execute(text('PRAGMA cache_size')).scalar() == -1024
+            assert connection.execute(text('PRAGMA mmap_size')).scalar() == 1048576
+
+
+def test_reader_engine_is_read_only(engines):
+    """
+    Tests that the reader Engine sees the writes of the writer Engine but cannot write
+    :param engines: the writer and reader Engines
+    """
+    writer_engine, reader_engine = engines
+    with writer_engine.begin() as connection:
+        connection.execute(text("INSERT INTO daylight_windows (satellite_id, start_time) VALUES (1, '2023-11-10')"))
+    with reader_engine.connect() as connection:
+        assert connection.execute(text('SELECT count(*) FROM daylight_windows')).scalar() == 1
+        with pytest.raises(OperationalError):
+            connection.execute(text("DELETE FROM daylight_windows"))
+
+
+def test_is_file_database(engines):
+    """
+    Tests that the DBs backed by a file are told apart from the in-memory and temporary ones
+    :param engines: the writer and reader Engines
+    """
+    assert all(is_file_database(engine) for engine in engines)
+    for url in ('sqlite://', 'sqlite:///:memory:', 'sqlite:///file:memdb?mode=memory&uri=true', 'sqlite:///'):
+        engine = create_engine(url)
+        assert not is_file_database(engine)
+        engine.dispose()
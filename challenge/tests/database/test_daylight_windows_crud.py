@@ -0,0 +1,109 @@
+import random
+from datetime import timedelta
+
+import pytest
+
+from challenge.database.daylight_windows_crud import get_daylight_windows, update_daylight_windows, \
+    rebuild_daylight_windows, check_daylight_windows
+from challenge.database.iss_crud import add_iss_positions, get_iss_positions
+from challenge.database.models.models import DaylightWindow
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows
+
+
+def _add_iss_positions(db, iss_positions, batch_size=1):
+    for first in range(0, len(iss_positions), batch_size):
+        update_daylight_windows(db, add_iss_positions(db, iss_positions[first:first + batch_size]))
+
+
+def test_update_daylight_windows(db):
+    """
+    Tests that update_daylight_windows opens and closes windows on visibility transitions
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.DAYLIGHT,
+                                              Visibility.ECLIPSED, Visibility.DAYLIGHT])
+    _add_iss_positions(db, iss_positions)
+    daylight_windows = [(window.start_time, window.end_time) for window in db.query(DaylightWindow).all()]
+    assert daylight_windows == [(iss_positions[1].timestamp, iss_positions[3].timestamp),
+                                (iss_positions[4].timestamp, None)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_daylight_windows_match_reference(db, seed):
+    """
+    Tests that get_daylight_windows returns the same windows as get_daylight_time_windows on random ranges, both with
+    the incrementally maintained table and with the rebuilt one
+    :param db: the DB
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    visibilities = [Visibility.DAYLIGHT if rng.random() < 0.6 else Visibility.ECLIPSED for _ in range(120)]
+    _add_iss_positions(db, get_sample_iss_positions(visibilities), batch_size=rng.randint(1, 10))
+    ranges = [(FIRST_TIMESTAMP + timedelta(seconds=rng.randint(-40, 2400)),
+               FIRST_TIMESTAMP + timedelta(seconds=rng.randint(0, 2500))) for _ in range(50)]
+
+    for _ in range(2):
+        for start_time, end_time in ranges:
+            expected_windows = get_daylight_time_windows(get_iss_positions(db, start_time, end_time))
+            assert get_daylight_windows(db, start_time, end_time) == expected_windows
+        assert check_daylight_windows(db)
+        rebuild_daylight_windows(db)
+
+
+def test_check_daylight_windows(db):
+    """
+    Tests that check_daylight_windows detects an inconsistent daylight_windows table
+    :param db: the DB
+    """
+    _add_iss_positions(db, get_sample_iss_positions([Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.ECLIPSED]))
+    assert check_daylight_windows(db)
+    db.query(DaylightWindow).delete()
+    assert not check_daylight_windows(db)
+    assert rebuild_daylight_windows(db) == 1
+    assert check_daylight_windows(db)
+
+
+def test_check_daylight_windows_of_satellites(db):
+    """
+    Tests that check_daylight_windows checks the windows of every satellite on its own IssPositions
+    :param db: the DB
+    """
+    add_iss_positions(db, get_sample_iss_positions([Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.ECLIPSED],
+                                                   satellite_id=1) +
+                      get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT],
+                                               wait_time=10, satellite_id=2))
+    rebuild_daylight_windows(db)
+    assert check_daylight_windows(db)
+    assert check_daylight_windows(db, satellite_id=2)
+    db.query(DaylightWindow).filter(DaylightWindow.satellite_id == 2).delete()
+    assert check_daylight_windows(db, satellite_id=1)
+    assert not check_daylight_windows(db)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_rebuild_daylight_windows_range(db, seed):
+    """
+    Tests that rebuilding the windows around IssPositions added in a gap, e.g. by a backfill, gives the same table as
+    a full rebuild
+    :param db: the DB
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    visibilities = []
+    while len(visibilities) < 120:
+        visibilities += [rng.choice(list(Visibility))] * rng.randint(1, 10)
+    iss_positions = get_sample_iss_positions(visibilities[:120])
+    gap_start = rng.randint(0, 110)
+    gap_end = rng.randint(gap_start + 1, 120)
+    add_iss_positions(db, iss_positions[:gap_start] + iss_positions[gap_end:])
+    rebuild_daylight_windows(db)
+    add_iss_positions(db, iss_positions[gap_start:gap_end])
+    rebuild_daylight_windows(db, 25544, iss_positions[gap_start].timestamp, iss_positions[gap_end - 1].timestamp)
+    daylight_windows = [(window.start_time, window.end_time) for window in
+                        db.query(DaylightWindow).order_by(DaylightWindow.start_time).all()]
+    assert check_daylight_windows(db)
+    rebuild_daylight_windows(db)
+    assert daylight_windows == [(window.start_time, window.end_time) for window in
+                                db.query(DaylightWindow).order_by(DaylightWindow.start_time).all()]
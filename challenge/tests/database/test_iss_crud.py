@@ -0,0 +1,184 @@
+from datetime import datetime
+
+import numpy as np
+
+from challenge.database.iss_crud import add_iss_position, add_iss_positions, iter_iss_position_columns, \
+    get_iss_position_rows, get_iss_position_columns, get_iss_positions, get_latest_iss_position, \
+    get_iss_position_gaps, get_iss_position_page, get_downsampled_iss_position_rows, count_iss_positions, \
+    get_latest_iss_position_row_id, get_iss_positions_added_after
+from challenge.database.models import models
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions
+
+
+def test_iter_iss_position_columns(db):
+    """
+    Tests that iter_iss_position_columns provides the timestamp and visibility columns in chunks
+    :param db: the DB
+    """
+    visibilities = [Visibility.DAYLIGHT, Visibility.ECLIPSED] * 5
+    iss_positions = get_sample_iss_positions(visibilities)
+    for iss_position in iss_positions:
+        add_iss_position(db, iss_position)
+
+    column_chunks = list(iter_iss_position_columns(db, datetime.min, datetime.max, chunk_size=4))
+    assert [len(timestamps) for timestamps, _ in column_chunks] == [4, 4, 2]
+    assert [timestamp.item() for timestamps, _ in column_chunks for timestamp in timestamps] == \
+           [iss_position.timestamp for iss_position in iss_positions]
+    assert [visibility for _, chunk in column_chunks for visibility in chunk] == visibilities
+
+
+def test_get_iss_position_projections(db):
+    """
+    Tests that get_iss_position_rows and get_iss_position_columns only provide the requested columns
+    :param db: the DB
+    """
+    visibilities = [Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT]
+    iss_positions = get_sample_iss_positions(visibilities)
+    for iss_position in iss_positions:
+        add_iss_position(db, iss_position)
+
+    rows = get_iss_position_rows(db, ('timestamp', 'latitude', 'visibility'), iss_positions[1].timestamp, datetime.max)
+    assert rows == [(iss_position.timestamp, iss_position.latitude, iss_position.visibility)
+                    for iss_position in iss_positions[1:]]
+
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), datetime.min, datetime.max)
+    assert timestamps.dtype == np.dtype('datetime64[us]')
+    assert timestamps.tolist() == [iss_position.timestamp for iss_position in iss_positions]
+    assert daylight.tolist() == [True, False, True]
+
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), datetime.max, datetime.max)
+    assert len(timestamps) == 0 and daylight.dtype == np.bool_
+
+
+def test_get_iss_positions_of_satellite(db):
+    """
+    Tests that the reads filtered by satellite_id only provide the IssPositions of that satellite
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED], satellite_id=1)
+    other_iss_positions = get_sample_iss_positions([Visibility.ECLIPSED, Visibility.ECLIPSED, Visibility.DAYLIGHT],
+                                                   wait_time=10, satellite_id=2)
+    add_iss_positions(db, iss_positions + other_iss_positions)
+
+    assert [(iss_position.satellite_id, iss_position.timestamp) for iss_position in
+            get_iss_positions(db, datetime.min, datetime.max, satellite_id=1)] == \
+           [(1, iss_position.timestamp) for iss_position in iss_positions]
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), datetime.min, datetime.max,
+                                                    satellite_id=2)
+    assert timestamps.tolist() == [iss_position.timestamp for iss_position in other_iss_positions]
+    assert daylight.tolist() == [False, False, True]
+    assert get_latest_iss_position(db, 1).timestamp == iss_positions[-1].timestamp
+    assert get_latest_iss_position(db).timestamp == other_iss_positions[-1].timestamp
+    assert count_iss_positions(db, datetime.min, datetime.max, satellite_id=2) == 3
+    assert count_iss_positions(db, other_iss_positions[1].timestamp, datetime.max) == 3
+
+
+def test_get_iss_position_gaps(db):
+    """
+    Tests that get_iss_position_gaps finds the gaps larger than the given seconds of the given satellite only
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 10, satellite_id=1)
+    add_iss_positions(db, iss_positions[:2] + iss_positions[3:6] + iss_positions[9:])
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 10, wait_time=60, satellite_id=2))
+
+    assert get_iss_position_gaps(db, 1, 30, datetime.min, datetime.max) == [
+        (iss_positions[1].timestamp, iss_positions[3].timestamp),
+        (iss_positions[5].timestamp, iss_positions[9].timestamp)]
+    assert get_iss_position_gaps(db, 1, 30, iss_positions[3].timestamp, datetime.max) == [
+        (iss_positions[5].timestamp, iss_positions[9].timestamp)]
+    assert get_iss_position_gaps(db, 1, 80, datetime.min, datetime.max) == [
+        (iss_positions[5].timestamp, iss_positions[9].timestamp)]
+
+
+def test_get_iss_position_page(db):
+    """
+    Tests that walking the pages of get_iss_position_page returns every IssPosition and IssPositionRollup of the given
+    satellite once, in order, and that a page after the last key of another satellite starts where it should
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED] * 5, satellite_id=1)
+    add_iss_positions(db, iss_positions[3:])
+    db.add_all([models.IssPositionRollup(**iss_position.model_dump(), resolution=300)
+                for iss_position in iss_positions[:3]])
+    db.commit()
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 5, satellite_id=2))
+
+    rows, after = [], None
+    while True:
+        page = get_iss_position_page(db, ('timestamp', 'visibility'), satellite_id=1, after=after, limit=3)
+        rows.extend(page)
+        if len(page) < 3:
+            break
+        after = page[-1][-2:]
+    assert rows == [(iss_position.timestamp, iss_position.visibility, 1, iss_position.timestamp)
+                    for iss_position in iss_positions]
+
+    assert get_iss_position_page(db, ('latitude',), start_time=iss_positions[8].timestamp, satellite_id=1,
+                                 after=(1, iss_positions[2].timestamp)) == \
+           [(iss_position.latitude, 1, iss_position.timestamp) for iss_position in iss_positions[8:]]
+    assert len(get_iss_position_page(db, ('latitude',), satellite_id=2, after=(1, iss_positions[9].timestamp))) == 5
+    assert get_iss_position_page(db, ('latitude',), satellite_id=1, after=(2, iss_positions[0].timestamp)) == []
+    assert [row[-2] for row in get_iss_position_page(db, ('latitude',), after=(1, iss_positions[8].timestamp))] == \
+           [1] + [2] * 5
+
+
+def test_get_downsampled_iss_position_rows(db):
+    """
+    Tests that get_downsampled_iss_position_rows keeps the first IssPosition of every time bucket, the last one and
+    both sides of every visibility transition, across the IssPositions and IssPositionRollups
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 12 + [Visibility.ECLIPSED] * 3 +
+                                             [Visibility.DAYLIGHT] * 15, satellite_id=1)
+    add_iss_positions(db, iss_positions[10:])
+    db.add_all([models.IssPositionRollup(**iss_position.model_dump(), resolution=300)
+                for iss_position in iss_positions[:10]])
+    db.commit()
+    add_iss_positions(db, get_sample_iss_positions([Visibility.ECLIPSED] * 30, satellite_id=2))
+
+    rows = get_downsampled_iss_position_rows(db, ('timestamp', 'visibility'), 3, satellite_id=1)
+    # Buckets of 10 IssPositions, and the transitions between 11-12 and 14-15
+    assert rows == [(iss_positions[i].timestamp, iss_positions[i].visibility) for i in (0, 10, 11, 12, 14, 15, 20, 29)]
+    # The buckets of the satellites are the same, satellite 2 has no transition
+    assert len(get_downsampled_iss_position_rows(db, ('timestamp',), 3)) == 8 + 4
+    assert get_downsampled_iss_position_rows(db, ('timestamp',), 3, satellite_id=3) == []
+    # A single bucket holds both transitions, so it is read in full
+    assert get_downsampled_iss_position_rows(db, ('timestamp',), 1, satellite_id=1) == [
+        (iss_positions[i].timestamp,) for i in (0, 11, 12, 14, 15, 29)]
+
+
+def test_add_iss_positions(db):
+    """
+    Tests that add_iss_positions skips the IssPositions already stored and provides the added ones once, even when
+    the same key appears twice in the batch
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT])
+    assert add_iss_positions(db, iss_positions[:1]) == iss_positions[:1]
+
+    added_iss_positions = add_iss_positions(db, [iss_positions[0], iss_positions[1], iss_positions[1],
+                                                 iss_positions[2]])
+    assert added_iss_positions == iss_positions[1:]
+    assert db.query(models.IssPosition).count() == 3
+
+
+def test_get_iss_positions_added_after(db):
+    """
+    Tests that the IssPositions added after a rowid are provided in the order they were added, even the older ones
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 6)
+    assert get_latest_iss_position_row_id(db) == 0
+    add_iss_positions(db, iss_positions[2:4])
+    row_id = get_latest_iss_position_row_id(db)
+    add_iss_positions(db, iss_positions[4:] + iss_positions[:2])
+
+    rows = get_iss_positions_added_after(db, row_id, limit=3)
+    assert [iss_position.timestamp for _, iss_position in rows] == \
+           [iss_position.timestamp for iss_position in iss_positions[4:] + iss_positions[:1]]
+    rows += get_iss_positions_added_after(db, rows[-1][0])
+    assert [row_id for row_id, _ in rows] == list(range(row_id + 1, row_id + 5))
+    assert rows[-1][0] == get_latest_iss_position_row_id(db)
+    assert get_iss_positions_added_after(db, rows[-1][0]) == []
@@ -0,0 +1,88 @@
+import random
+from datetime import timedelta
+
+import numpy as np
+
+from challenge.database.iss_crud import add_iss_positions, add_iss_position
+from challenge.database.models.models import IssPositionCell
+from challenge.database.models.visibility import Visibility
+from challenge.database.position_cells_crud import get_iss_position_cell_columns, rebuild_iss_position_cells, \
+    init_iss_position_cells, clear_iss_position_cells
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+from challenge.utils.operations.spatial_utils import get_cell_ranges, get_haversine_distances
+
+
+def _get_random_iss_positions(seed: int, length: int = 500) -> list:
+    random_generator = random.Random(seed)
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * length)
+    # The edges of the grid, then random coordinates
+    coordinates = [(-90, -180), (90, 180), (0, 0), (51.6, 179.999)]
+    coordinates += [(random_generator.uniform(-51.6, 51.6), random_generator.uniform(-180, 180))
+                    for _ in range(length - len(coordinates))]
+    return [iss_position.model_copy(update={'latitude': latitude, 'longitude': longitude})
+            for iss_position, (latitude, longitude) in zip(iss_positions, coordinates)]
+
+
+def _get_cells(db) -> set:
+    return {(cell.cell, cell.satellite_id, cell.timestamp) for cell in db.query(IssPositionCell).all()}
+
+
+def test_cells_are_added_with_the_positions(db):
+    """
+    Tests that the cells of the added IssPositions are indexed, and that rebuilding the table gives the same cells
+    :param db: the DB
+    """
+    iss_positions = _get_random_iss_positions(0)
+    add_iss_position(db, iss_positions[0])
+    add_iss_positions(db, iss_positions)
+    cells = _get_cells(db)
+    assert len(cells) == len(iss_positions)
+
+    db.query(IssPositionCell).delete()
+    init_iss_position_cells(db)
+    assert _get_cells(db) == cells
+    assert rebuild_iss_position_cells(db) == len(iss_positions)
+    assert _get_cells(db) == cells
+
+
+def test_cells_are_not_added_when_the_index_is_disabled(db):
+    """
+    Tests that no cells are indexed when the spatial index is disabled, and that clearing the table lets it be rebuilt
+    once the index is enabled again
+    :param db: the DB
+    """
+    iss_positions = _get_random_iss_positions(1)
+    assert len(add_iss_positions(db, iss_positions[:100], index_cells=False)) == 100
+    assert _get_cells(db) == set()
+
+    add_iss_positions(db, iss_positions[100:])
+    assert len(_get_cells(db)) == len(iss_positions) - 100
+    clear_iss_position_cells(db)
+    assert _get_cells(db) == set()
+    init_iss_position_cells(db)
+    assert len(_get_cells(db)) == len(iss_positions)
+
+
+def test_get_iss_position_cell_columns(db):
+    """
+    Tests that the IssPositions of the cell ranges hold every IssPosition within the distance of the range
+    :param db: the DB
+    """
+    iss_positions = _get_random_iss_positions(1, length=2000)
+    add_iss_positions(db, iss_positions)
+    add_iss_positions(db, get_sample_iss_positions([Visibility.DAYLIGHT] * 10, satellite_id=20580))
+    latitudes = np.array([iss_position.latitude for iss_position in iss_positions])
+    longitudes = np.array([iss_position.longitude for iss_position in iss_positions])
+    start_time, end_time = FIRST_TIMESTAMP + timedelta(seconds=4000), FIRST_TIMESTAMP + timedelta(seconds=30000)
+    for latitude, longitude, radius_km in [(45.46, 9.19, 1500), (0, 179.5, 2000), (-30, -100, 3000)]:
+        close = get_haversine_distances(latitude, longitude, latitudes, longitudes) <= radius_km
+        expected_timestamps = {iss_position.timestamp for iss_position, is_close in zip(iss_positions, close)
+                               if is_close and start_time <= iss_position.timestamp <= end_time}
+        timestamps, candidate_latitudes, candidate_longitudes = get_iss_position_cell_columns(
+            db, get_cell_ranges(latitude, longitude, radius_km), start_time, end_time, satellite_id=25544)
+        candidate_close = get_haversine_distances(latitude, longitude, candidate_latitudes,
+                                                  candidate_longitudes) <= radius_km
+        assert expected_timestamps
+        assert set(timestamps[candidate_close].tolist()) == expected_timestamps
+        assert len(timestamps) < len(iss_positions) / 2
+        assert timestamps.tolist() == sorted(timestamps.tolist())
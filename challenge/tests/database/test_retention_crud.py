@@ -0,0 +1,148 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from challenge.database.daylight_windows_crud import get_daylight_windows, rebuild_daylight_windows
+from challenge.database.iss_crud import add_iss_positions, get_iss_positions, get_iss_position_columns, \
+    get_latest_iss_position
+from challenge.database.models.models import IssPosition, IssPositionRollup, IssPositionCell
+from challenge.database.models.visibility import Visibility
+from challenge.database.retention_crud import compact_iss_positions, purge_iss_positions
+from challenge.tests.database_fixtures import db, get_sample_iss_positions, FIRST_TIMESTAMP
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows
+
+
+def _get_random_visibilities(seed: int, length: int = 1000) -> list[Visibility]:
+    random_generator = random.Random(seed)
+    visibilities = []
+    while len(visibilities) < length:
+        visibilities.extend([random_generator.choice([Visibility.DAYLIGHT, Visibility.ECLIPSED])] *
+                            random_generator.randint(1, 60))
+    return visibilities[:length]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_compaction_preserves_daylight_windows(db, seed):
+    """
+    Tests that the daylight time windows of the whole history are the same before and after the compaction, both
+    when computed from the IssPositions and when read from the daylight_windows table
+    :param db: the DB
+    :param seed: the seed of the random generator
+    """
+    iss_positions = get_sample_iss_positions(_get_random_visibilities(seed))
+    add_iss_positions(db, iss_positions)
+    rebuild_daylight_windows(db)
+    start_time, end_time = iss_positions[0].timestamp, iss_positions[-1].timestamp
+    expected_windows = get_daylight_time_windows(get_iss_positions(db, start_time, end_time))
+    expected_table_windows = get_daylight_windows(db, start_time, end_time)
+
+    horizon = iss_positions[700].timestamp
+    dropped = compact_iss_positions(db, horizon, resolution=600, batch_size=100)
+
+    assert dropped > 0
+    assert db.query(IssPosition).filter(IssPosition.timestamp < horizon).count() == 0
+    assert db.query(IssPosition).count() + db.query(IssPositionRollup).count() == len(iss_positions) - dropped
+    assert get_daylight_time_windows(get_iss_positions(db, start_time, end_time)) == expected_windows
+    timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time)
+    assert list(timestamps) == sorted(timestamps)
+    assert get_daylight_windows(db, start_time, end_time) == expected_table_windows
+    rebuild_daylight_windows(db)
+    assert get_daylight_windows(db, start_time, end_time) == expected_table_windows
+
+
+def test_compaction_keeps_one_position_per_bucket(db):
+    """
+    Tests that a constant visibility is compacted to the first IssPosition of every resolution bucket, whatever the
+    batch size, and that a coarser tier compacts the rollups again
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 360)
+    add_iss_positions(db, iss_positions)
+    horizon = iss_positions[-1].timestamp + timedelta(seconds=1)
+
+    compact_iss_positions(db, horizon, resolution=600, batch_size=7)
+    rollups = db.query(IssPositionRollup).order_by(IssPositionRollup.timestamp).all()
+    assert db.query(IssPosition).count() == 0
+    assert all(rollup.resolution == 600 for rollup in rollups)
+    assert len(rollups) == len({int((rollup.timestamp - datetime(1970, 1, 1)).total_seconds()) // 600
+                                    for rollup in rollups}) + 1
+    assert rollups[0].timestamp == FIRST_TIMESTAMP
+    assert rollups[-1].timestamp == iss_positions[-1].timestamp
+
+    compact_iss_positions(db, horizon, resolution=3600, batch_size=7)
+    coarser_rollups = db.query(IssPositionRollup).all()
+    assert len(coarser_rollups) < len(rollups)
+    assert all(rollup.resolution == 3600 for rollup in coarser_rollups)
+    assert compact_iss_positions(db, horizon, resolution=3600, batch_size=7) == 0
+    # Only the cells of the kept IssPositions are left
+    assert {(cell.satellite_id, cell.timestamp) for cell in db.query(IssPositionCell).all()} == \
+           {(rollup.satellite_id, rollup.timestamp) for rollup in coarser_rollups}
+
+
+def test_compaction_keeps_latest_position(db):
+    """
+    Tests that the latest IssPosition is still provided after a history older than the horizon, e.g. the one shipped
+    with the app, has been fully compacted into rollups
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED] * 30)
+    add_iss_positions(db, iss_positions)
+
+    compact_iss_positions(db, datetime.now(), resolution=300)
+
+    assert db.query(IssPosition).count() == 0
+    latest_iss_position = get_latest_iss_position(db, 25544)
+    assert latest_iss_position.timestamp == iss_positions[-1].timestamp
+    assert latest_iss_position.latitude == iss_positions[-1].latitude
+    assert get_latest_iss_position(db, 1) is None
+    purge_iss_positions(db, datetime.now())
+    assert db.query(IssPositionRollup).count() == 1
+    assert get_latest_iss_position(db, 25544).timestamp == iss_positions[-1].timestamp
+
+
+def test_purge_iss_positions(db):
+    """
+    Tests that purge_iss_positions deletes the IssPositions and rollups older than the horizon, with their cells and
+    closed daylight windows, except the latest IssPosition of every satellite
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions(([Visibility.DAYLIGHT] * 5 + [Visibility.ECLIPSED] * 5) * 12)
+    add_iss_positions(db, iss_positions)
+    rebuild_daylight_windows(db)
+    compact_iss_positions(db, iss_positions[60].timestamp, resolution=600)
+    horizon = iss_positions[90].timestamp
+
+    purged = purge_iss_positions(db, horizon, batch_size=7)
+
+    assert purged > 0
+    assert db.query(IssPositionRollup).count() == 0
+    assert db.query(IssPosition).filter(IssPosition.timestamp < horizon).count() == 0
+    assert db.query(IssPosition).count() == 30
+    assert db.query(IssPositionCell).count() == 30
+    assert all(end_time is None or end_time >= horizon
+               for _, end_time in get_daylight_windows(db, datetime.min, datetime.max))
+
+    # The latest IssPosition is never deleted
+    assert purge_iss_positions(db, datetime.now()) == 29
+    assert get_latest_iss_position(db, 25544).timestamp == iss_positions[-1].timestamp
+
+
+def test_add_compacted_iss_positions(db):
+    """
+    Tests that the IssPositions already compacted into rollups, e.g. backfilled again, are not added back to the raw
+    IssPositions, while the newer ones are
+    :param db: the DB
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 60)
+    add_iss_positions(db, iss_positions[:40])
+    compact_iss_positions(db, iss_positions[30].timestamp, resolution=600)
+    rollup_keys = {(rollup.satellite_id, rollup.timestamp) for rollup in db.query(IssPositionRollup).all()}
+
+    added_iss_positions = add_iss_positions(db, iss_positions)
+
+    assert added_iss_positions == [iss_position for iss_position in iss_positions[:30]
+                                   if (iss_position.satellite_id, iss_position.timestamp) not in rollup_keys] + \
+           iss_positions[40:]
+    assert not {(iss_position.satellite_id, iss_position.timestamp)
+                for iss_position in db.query(IssPosition).all()} & rollup_keys
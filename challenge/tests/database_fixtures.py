@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from challenge.database.database import Base
+from challenge.database.schemas import IssPosition
+
+FIRST_TIMESTAMP = datetime.fromtimestamp(1699658022)
+
+
+def get_sample_iss_position(visibility, timestamp: datetime, satellite_id: int = 25544) -> IssPosition:
+    return IssPosition(name='iss', satellite_id=satellite_id, latitude=3.7993878441372, longitude=100.21269424675,
+                       altitude=418.710774125, velocity=27581.144139331, visibility=visibility,
+                       footprint=4500.8986337084, timestamp=timestamp, daynum=2460259.4678472,
+                       solar_lat=-17.276144046636, solar_lon=187.56023046706, units='kilometers')
+
+
+def get_sample_iss_positions(visibilities: list, wait_time: int = 20, satellite_id: int = 25544) -> list[IssPosition]:
+    return [get_sample_iss_position(visibility, FIRST_TIMESTAMP + timedelta(seconds=wait_time * i), satellite_id)
+            for i, visibility in enumerate(visibilities)]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine('sqlite://', connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 
 from challenge.database.models.models import IssPosition
 from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_positions
 
 SAMPLE_ISS_POSITION = IssPosition(name='iss', satellite_id=25544, latitude=3.7993878441372, longitude=100.21269424675,
                                   altitude=418.710774125, velocity=27581.144139331, visibility=Visibility.DAYLIGHT,
@@ -25,6 +26,12 @@ def override_get_db():
 def client():
     from challenge.routers.iss_router import _get_db
     from challenge.fastapi_main import app
+    from challenge.utils.fastapi.fastapi_utils import time_windows_cache, limiter, position_payload_cache
+    if time_windows_cache:
+        time_windows_cache.clear()
+    position_payload_cache.clear()
+    # The limits may be shared with the previous runs through the storage file
+    limiter.reset()
     client = TestClient(app)
     app.dependency_overrides[_get_db] = override_get_db
     return client
@@ -39,16 +46,48 @@ def mock_latest_iss_position(mocker):
 
 @pytest.fixture
 def mock_iss_positions(mocker):
-    return mocker.patch('challenge.routers.iss_router.get_iss_positions')
+    return mocker.patch('challenge.routers.iss_router.get_iss_position_columns', return_value=([], []))
 
 
 @pytest.fixture
 def mock_daylight_time_windows(mocker):
-    mocker.patch('challenge.routers.iss_router.get_daylight_time_windows',
+    mocker.patch('challenge.routers.iss_router.get_daylight_time_windows_vectorized',
                  return_value=SAMPLE_TIME_WINDOWS)
     return SAMPLE_TIME_WINDOWS
 
 
+@pytest.fixture
+def mock_daylight_windows(mocker):
+    return mocker.patch('challenge.routers.iss_router.get_daylight_windows', return_value=SAMPLE_TIME_WINDOWS)
+
+
+@pytest.fixture
+def disabled_daylight_windows_table(mocker):
+    return mocker.patch('challenge.routers.iss_router.daylight_windows_table_enabled', False)
+
+
+@pytest.fixture
+def filled_iss_position_buffer(mocker):
+    from challenge.utils.buffers.iss_position_buffer import IssPositionBuffers
+    iss_position_buffers = IssPositionBuffers([25544])
+    iss_position_buffer = iss_position_buffers.get(25544)
+    iss_position_buffer.covered_from = datetime.min
+    for iss_position in get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT]):
+        iss_position_buffers.append(iss_position)
+    mocker.patch('challenge.routers.iss_router.iss_position_buffers', iss_position_buffers)
+    return iss_position_buffer
+
+
+@pytest.fixture
+def mock_iss_position_columns(mocker):
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT,
+                                              Visibility.DAYLIGHT, Visibility.ECLIPSED])
+    column_chunks = [([iss_position.timestamp for iss_position in iss_positions[start:start + 2]],
+                      [iss_position.visibility for iss_position in iss_positions[start:start + 2]])
+                     for start in range(0, len(iss_positions), 2)]
+    return mocker.patch('challenge.routers.iss_router.iter_iss_position_columns', return_value=column_chunks)
+
+
 @pytest.fixture
 def mock_set_up_db(mocker):
     return mocker.patch('challenge.utils.fastapi.fastapi_utils.set_up_db')
@@ -57,3 +96,38 @@ def mock_set_up_db(mocker):
 @pytest.fixture
 def mock_lifespan_db(mocker):
     return mocker.patch('challenge.utils.fastapi.fastapi_utils.get_lifespan_db')
+
+
+@pytest.fixture
+def time_windows_cache(mocker):
+    from challenge.utils.caches.time_windows_cache import TimeWindowsCache
+    return mocker.patch('challenge.routers.iss_router.time_windows_cache', TimeWindowsCache(quantum_seconds=3600))
+
+
+@pytest.fixture
+def latest_position_slots(mocker, tmp_path):
+    from challenge.utils.buffers.latest_position_slots import LatestPositionSlots
+    latest_position_slots = LatestPositionSlots(str(tmp_path / 'locations.db.latest'), [25544])
+    mocker.patch('challenge.routers.iss_router.latest_position_slots', latest_position_slots)
+    yield latest_position_slots
+    latest_position_slots.close()
+
+
+@pytest.fixture
+def position_hub(mocker):
+    from challenge.utils.streaming.position_hub import PositionHub
+    position_hub = PositionHub(max_subscribers=2)
+    mocker.patch('challenge.routers.iss_router.position_hub', position_hub)
+    return position_hub
+
+
+@pytest.fixture
+def warmed_daylight_interval_index(mocker):
+    from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndexes
+    daylight_interval_indexes = DaylightIntervalIndexes([25544])
+    daylight_interval_index = daylight_interval_indexes.get(25544)
+    daylight_interval_index.warmed = True
+    for iss_position in get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT]):
+        daylight_interval_indexes.append(iss_position)
+    mocker.patch('challenge.routers.iss_router.daylight_interval_indexes', daylight_interval_indexes)
+    return daylight_interval_index
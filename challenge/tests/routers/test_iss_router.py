@@ -1,11 +1,30 @@
+import asyncio
 import datetime
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from unittest import mock
 
+import httpx
+import numpy as np
 import pytest
+from fastapi import WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from challenge.database.database import Base
+from challenge.database.iss_crud import add_iss_positions
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_position, get_sample_iss_positions, FIRST_TIMESTAMP
 from challenge.tests.fastapi_fixtures import client, mock_set_up_db, mock_latest_iss_position, \
-    mock_iss_positions, mock_daylight_time_windows
+    mock_iss_positions, mock_daylight_time_windows, mock_daylight_windows, disabled_daylight_windows_table, \
+    filled_iss_position_buffer, mock_iss_position_columns, time_windows_cache, latest_position_slots, position_hub, \
+    warmed_daylight_interval_index
+from challenge.routers.iss_router import _iter_position_events
+from challenge.utils.metrics.iss_metrics import sun_request_seconds, sun_fetch_seconds
 
 
 @pytest.fixture
@@ -16,13 +35,14 @@ def disabled_limiter():
     return limiter
 
 
-def test_iss_position(mock_set_up_db, client, mock_latest_iss_position, disabled_limiter):
+def test_iss_position(mock_set_up_db, client, mock_latest_iss_position, latest_position_slots, disabled_limiter):
     """
     Test for read_position
 
     :param mock_set_up_db: the mock for the set_up db method
     :param client: the client to send requests with
     :param mock_latest_iss_position: the latest iss position that is set to be returned
+    :param latest_position_slots: the empty LatestPositionSlots
     :param limiter the disabled limiter
     """
     base_endpoint = '/iss/position'
@@ -40,7 +60,8 @@ def test_iss_position(mock_set_up_db, client, mock_latest_iss_position, disabled
     assert response.json() == jsonable_encoder(mock_latest_iss_position)
 
 
-def test_iss_sun(mock_set_up_db, client, mock_iss_positions, mock_daylight_time_windows, disabled_limiter):
+def test_iss_sun(mock_set_up_db, client, mock_iss_positions, mock_daylight_time_windows, disabled_limiter,
+                 disabled_daylight_windows_table):
     """
     Test for read_sun
 
@@ -49,6 +70,7 @@ def test_iss_sun(mock_set_up_db, client, mock_iss_positions, mock_daylight_time_
     :param mock_iss_positions: the mocked list of IssPosition
     :param mock_daylight_time_windows: the List of TimeWindow expected to ber returned
     :param limiter the disabled limiter
+    :param disabled_daylight_windows_table: the disabled daylight_windows table
     """
 
     base_endpoint = '/iss/sun'
@@ -59,7 +81,7 @@ def test_iss_sun(mock_set_up_db, client, mock_iss_positions, mock_daylight_time_
     assert response.json() == jsonable_encoder(
         [{'start_time': time_window[0], 'end_time': time_window[1]} for time_window in
          mock_daylight_time_windows])
-    mock_iss_positions.assert_called_once_with(mock.ANY, None, None, 86400)
+    mock_iss_positions.assert_called_once_with(mock.ANY, ('timestamp', 'daylight'), None, None, 86400, 25544)
 
     # 2: Request with start and end time
     start_time = '2023-11-11T01:00:00'
@@ -67,16 +89,436 @@ def test_iss_sun(mock_set_up_db, client, mock_iss_positions, mock_daylight_time_
     response = client.get(
         f'{base_endpoint}?start_time={start_time}&end_time={end_time}')
     assert response.status_code == 200
-    mock_iss_positions.assert_called_with(mock.ANY, datetime.datetime.fromisoformat(start_time),
+    mock_iss_positions.assert_called_with(mock.ANY, ('timestamp', 'daylight'),
+                                          datetime.datetime.fromisoformat(start_time),
                                           datetime.datetime.fromisoformat(
                                               end_time),
-                                          86400)
+                                          86400, 25544)
 
     # 3: Request with time_window_size
     time_window_size = 100
     response = client.get(
         f'{base_endpoint}?time_window_size={time_window_size}')
     assert response.status_code == 200
-    mock_iss_positions.assert_called_with(mock.ANY, None,
+    mock_iss_positions.assert_called_with(mock.ANY, ('timestamp', 'daylight'), None,
                                           None,
-                                          time_window_size)
+                                          time_window_size, 25544)
+
+    # 4: Request for another satellite
+    response = client.get(f'{base_endpoint}?satellite_id=20580')
+    assert response.status_code == 200
+    mock_iss_positions.assert_called_with(mock.ANY, ('timestamp', 'daylight'), None, None, 86400, 20580)
+
+
+def test_iss_sun_daylight_windows_table(mock_set_up_db, client, mock_daylight_windows, mock_iss_positions,
+                                        disabled_limiter):
+    """
+    Test for read_sun when the daylight_windows table is enabled
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mock_daylight_windows: the List of TimeWindow returned by the daylight_windows table
+    :param mock_iss_positions: the mocked list of IssPosition
+    :param limiter the disabled limiter
+    """
+    response = client.get('/iss/sun?time_window_size=100')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder(
+        [{'start_time': time_window[0], 'end_time': time_window[1]} for time_window in
+         mock_daylight_windows.return_value])
+    mock_daylight_windows.assert_called_once_with(mock.ANY, None, None, 100, 25544)
+    mock_iss_positions.assert_not_called()
+
+
+def test_iss_position_slots(mock_set_up_db, client, mocker, latest_position_slots, disabled_limiter):
+    """
+    Test for read_position when it is served by the latest IssPosition shared by the ingesting worker, and by the DB
+    once it is stale
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param latest_position_slots: the LatestPositionSlots
+    :param limiter the disabled limiter
+    """
+    mock_latest_iss_position = mocker.patch('challenge.routers.iss_router.get_latest_iss_position',
+                                            return_value=None)
+    iss_position = get_sample_iss_position(Visibility.DAYLIGHT, datetime.datetime(2023, 11, 10, 12))
+    latest_position_slots.publish(iss_position)
+
+    response = client.get('/iss/position?detailed=true')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder(iss_position)
+    mock_latest_iss_position.assert_not_called()
+
+    latest_position_slots.max_age_seconds = -1
+    assert client.get('/iss/position').json() == {}
+    mock_latest_iss_position.assert_called_once()
+
+
+def test_iss_positions(mock_set_up_db, client, mocker, disabled_limiter):
+    """
+    Test for read_positions, which returns the requested fields of a page of IssPositions along with the cursor of the
+    next page, and rejects the unknown fields and invalid cursors
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param limiter the disabled limiter
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT])
+    rows = [(iss_position.timestamp, iss_position.visibility, iss_position.satellite_id, iss_position.timestamp)
+            for iss_position in iss_positions]
+    mock_iss_position_page = mocker.patch('challenge.routers.iss_router.get_iss_position_page', return_value=rows)
+    mocker.patch('challenge.routers.iss_router.positions_max_page_size', 2)
+
+    response = client.get('/iss/positions?fields=timestamp,visibility&limit=5')
+    assert response.status_code == 200
+    assert response.json()['positions'] == jsonable_encoder(
+        [{'timestamp': iss_position.timestamp, 'visibility': iss_position.visibility}
+         for iss_position in iss_positions[:2]])
+    assert mock_iss_position_page.call_args.args[1:] == (('timestamp', 'visibility'), None, None, 25544, None, 3)
+
+    mock_iss_position_page.return_value = rows[2:]
+    response = client.get(f'/iss/positions?fields=timestamp,visibility&cursor={response.json()["next_cursor"]}')
+    assert response.json() == {'positions': jsonable_encoder(
+        [{'timestamp': iss_positions[2].timestamp, 'visibility': iss_positions[2].visibility}]), 'next_cursor': None}
+    assert mock_iss_position_page.call_args.args[5] == (25544, iss_positions[1].timestamp)
+
+    assert client.get('/iss/positions?fields=timestamp,speed').status_code == 400
+    assert client.get('/iss/positions?cursor=not-a-cursor').status_code == 400
+
+
+def test_iss_positions_downsampled(mock_set_up_db, client, mocker, disabled_limiter):
+    """
+    Test for read_positions with max_points, which downsamples the range in the DB with the bucket downsampling and
+    with LTTB over the columns of the range otherwise, keeping both sides of every visibility transition
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param limiter the disabled limiter
+    """
+    iss_positions = get_sample_iss_positions([Visibility.DAYLIGHT] * 10 + [Visibility.ECLIPSED] * 10)
+    mock_downsampled_rows = mocker.patch('challenge.routers.iss_router.get_downsampled_iss_position_rows',
+                                         return_value=[(iss_positions[0].timestamp,)])
+    response = client.get('/iss/positions?fields=timestamp&max_points=4')
+    assert response.json() == {'positions': jsonable_encoder([{'timestamp': iss_positions[0].timestamp}]),
+                               'next_cursor': None}
+    assert mock_downsampled_rows.call_args.args[1:] == (('timestamp',), 4, None, None, 25544)
+
+    mock_iss_position_columns = mocker.patch(
+        'challenge.routers.iss_router.get_iss_position_columns',
+        return_value=(np.array([iss_position.timestamp for iss_position in iss_positions], dtype='datetime64[us]'),
+                      np.array([iss_position.visibility for iss_position in iss_positions], dtype=object),
+                      np.array([50 if i in (4, 14) else 0 for i in range(len(iss_positions))], dtype=np.float64),
+                      np.array([iss_position.visibility == Visibility.DAYLIGHT for iss_position in iss_positions])))
+    response = client.get('/iss/positions?fields=timestamp,visibility,latitude&max_points=4&downsampling=lttb')
+    assert response.status_code == 200
+    # The 4 points of LTTB, including the peaks of the latitudes, and both sides of the transition
+    assert [position['timestamp'] for position in response.json()['positions']] == jsonable_encoder(
+        [iss_positions[i].timestamp for i in (0, 4, 9, 10, 14, 19)])
+    assert response.json()['positions'][1]['latitude'] == 50
+    assert mock_iss_position_columns.call_args.args[1] == ('timestamp', 'visibility', 'latitude', 'daylight')
+
+    assert client.get('/iss/positions?max_points=4&cursor=MQ==').status_code == 400
+    assert client.get('/iss/positions?max_points=1').status_code == 422
+
+
+def test_iss_position_websocket(mock_set_up_db, client, position_hub, disabled_limiter):
+    """
+    Test for position_websocket, which sends the latest IssPosition and then every newer one
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param position_hub: the PositionHub
+    :param limiter the disabled limiter
+    """
+    iss_positions = [get_sample_iss_position(Visibility.DAYLIGHT, datetime.datetime(2023, 11, 10, 12, 0, seconds))
+                     for seconds in (0, 20)]
+    position_hub.publish(iss_positions[0])
+    with client.websocket_connect('/iss/ws') as websocket:
+        assert websocket.receive_json() == jsonable_encoder(iss_positions[0])
+        # Published from the loop of the app, like the listener of the writer
+        websocket.portal.call(position_hub.publish, iss_positions[1])
+        assert websocket.receive_json() == jsonable_encoder(iss_positions[1])
+    assert position_hub.subscribers == 0
+
+    position_hub.max_subscribers = 0
+    with client.websocket_connect('/iss/ws') as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+        assert exc_info.value.code == 1013
+
+
+@pytest.mark.asyncio
+async def test_iss_position_stream(mock_set_up_db, client, mocker, position_hub, disabled_limiter):
+    """
+    Test for read_position_stream, which streams the IssPositions as Server-Sent Events with keepalives in between,
+    and rejects the clients beyond the maximum number of subscribers
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param position_hub: the PositionHub
+    :param limiter the disabled limiter
+    """
+    mocker.patch('challenge.routers.iss_router.position_stream_timeout', 0.01)
+    iss_position = get_sample_iss_position(Visibility.DAYLIGHT, datetime.datetime(2023, 11, 10, 12))
+    position_hub.publish(iss_position)
+    position_events = _iter_position_events(iss_position.satellite_id)
+    assert await position_events.__anext__() == \
+           f'id: 1\nevent: position\ndata: {iss_position.model_dump_json()}\n\n'.encode()
+    assert await position_events.__anext__() == b': keepalive\n\n'
+    assert position_hub.subscribers == 1
+    await position_events.aclose()
+    assert position_hub.subscribers == 0
+
+    position_hub.max_subscribers = 0
+    response = client.get('/iss/position/stream')
+    assert response.status_code == 503
+
+
+def test_iss_position_buffer(mock_set_up_db, client, filled_iss_position_buffer, mock_iss_positions,
+                             mock_daylight_windows, disabled_limiter):
+    """
+    Test for read_position and read_sun when they are served by the IssPosition buffer
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param filled_iss_position_buffer: the IssPositionBuffer
+    :param mock_iss_positions: the mocked list of IssPosition
+    :param mock_daylight_windows: the mocked get_daylight_windows
+    :param limiter the disabled limiter
+    """
+    latest_iss_position = filled_iss_position_buffer.latest()
+    response = client.get('/iss/position')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder({'latitude': latest_iss_position.latitude,
+                                                'longitude': latest_iss_position.longitude,
+                                                'timestamp': latest_iss_position.timestamp})
+
+    timestamps, _ = filled_iss_position_buffer.get_columns(datetime.datetime.min, datetime.datetime.max)
+    response = client.get(f'/iss/sun?start_time={timestamps[0]}&end_time={timestamps[-1]}')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder([{'start_time': None, 'end_time': timestamps[1].item()},
+                                                {'start_time': timestamps[2].item(), 'end_time': None}])
+    mock_iss_positions.assert_not_called()
+    mock_daylight_windows.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_slow_sun_does_not_block_position(mock_set_up_db, client, mock_latest_iss_position, mock_daylight_windows,
+                                                disabled_limiter):
+    """
+    Tests that a slow /iss/sun query does not delay /iss/position, since the DB is accessed off the event loop
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client, used to set up the app
+    :param mock_latest_iss_position: the latest iss position that is set to be returned
+    :param mock_daylight_windows: the mocked get_daylight_windows, made slow
+    :param limiter the disabled limiter
+    """
+    from challenge.fastapi_main import app
+    slow_query_seconds = 0.5
+    mock_daylight_windows.side_effect = lambda *args: time.sleep(slow_query_seconds) or []
+    async with httpx.AsyncClient(app=app, base_url='http://test') as async_client:
+        sun_request = asyncio.create_task(async_client.get('/iss/sun'))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        position_response = await async_client.get('/iss/position')
+        position_elapsed = time.perf_counter() - start
+        assert not sun_request.done()
+        sun_response = await sun_request
+    assert position_response.status_code == 200
+    assert sun_response.status_code == 200
+    assert position_elapsed < slow_query_seconds / 2
+
+
+def test_iss_sun_stream(mock_set_up_db, client, mock_iss_position_columns, disabled_limiter):
+    """
+    Test for read_sun_stream
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mock_iss_position_columns: the mocked chunks of timestamps and visibilities
+    :param limiter the disabled limiter
+    """
+    timestamps = [timestamp for timestamps, _ in mock_iss_position_columns.return_value for timestamp in timestamps]
+    response = client.get('/iss/sun/stream?time_window_size=100')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.text.splitlines()] == jsonable_encoder(
+        [{'start_time': None, 'end_time': timestamps[1]}, {'start_time': timestamps[2], 'end_time': timestamps[4]}])
+    mock_iss_position_columns.assert_called_once_with(mock.ANY, None, None, 100, satellite_id=25544)
+
+
+def test_iss_sun_cache(mock_set_up_db, client, mock_daylight_windows, time_windows_cache, disabled_limiter):
+    """
+    Test for read_sun when it is served by the cache, until an IssPosition is added within the cached range
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mock_daylight_windows: the List of TimeWindow returned by the daylight_windows table
+    :param time_windows_cache: the TimeWindowsCache
+    :param limiter the disabled limiter
+    """
+    cache_requests = sun_request_seconds.get_count(('cache',))
+    daylight_windows_fetches = sun_fetch_seconds.get_count(('daylight_windows',))
+    for _ in range(3):
+        response = client.get('/iss/sun')
+        assert response.status_code == 200
+        assert response.json() == jsonable_encoder(
+            [{'start_time': time_window[0], 'end_time': time_window[1]} for time_window in
+             mock_daylight_windows.return_value])
+    mock_daylight_windows.assert_called_once()
+    assert sun_request_seconds.get_count(('cache',)) == cache_requests + 2
+    assert sun_fetch_seconds.get_count(('daylight_windows',)) == daylight_windows_fetches + 1
+
+    time_windows_cache.invalidate(get_sample_iss_position(Visibility.DAYLIGHT, datetime.datetime.now()))
+    client.get('/iss/sun')
+    assert mock_daylight_windows.call_count == 2
+
+    response = client.get('/iss/sun/cache')
+    assert response.status_code == 200
+    assert {key: response.json()[key] for key in ('hits', 'misses', 'invalidations', 'entries')} == \
+           {'hits': 2, 'misses': 2, 'invalidations': 1, 'entries': 1}
+
+
+def test_iss_sun_at_and_summary(mock_set_up_db, client, warmed_daylight_interval_index, mock_daylight_windows,
+                                disabled_limiter):
+    """
+    Test for read_sun_at and read_sun_summary when they are served by the daylight interval index
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param warmed_daylight_interval_index: the DaylightIntervalIndex
+    :param mock_daylight_windows: the mocked get_daylight_windows
+    :param limiter the disabled limiter
+    """
+    timestamps = [FIRST_TIMESTAMP + datetime.timedelta(seconds=seconds) for seconds in (0, 20, 40)]
+    response = client.get(f'/iss/sun/at?timestamp={timestamps[1] + datetime.timedelta(seconds=10)}')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder({'timestamp': timestamps[1] + datetime.timedelta(seconds=10),
+                                                'daylight': False, 'start_time': timestamps[1],
+                                                'end_time': timestamps[2]})
+    response = client.get(f'/iss/sun/at?timestamp={timestamps[0] - datetime.timedelta(seconds=1)}')
+    assert response.json()['daylight'] is None
+
+    response = client.get(f'/iss/sun/summary?start_time={timestamps[0] - datetime.timedelta(days=1)}'
+                          f'&end_time={timestamps[2] + datetime.timedelta(days=1)}')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder({'start_time': timestamps[0], 'end_time': timestamps[2],
+                                                'daylight_seconds': 20, 'eclipsed_seconds': 20,
+                                                'daylight_windows': 2})
+    mock_daylight_windows.assert_not_called()
+
+
+def test_iss_sun_summary_not_warmed(mock_set_up_db, client, mocker, disabled_limiter):
+    """
+    Test for read_sun_summary when the daylight interval index is not warmed, e.g. in the workers that do not ingest
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param limiter the disabled limiter
+    """
+    start_time, end_time = FIRST_TIMESTAMP, FIRST_TIMESTAMP + datetime.timedelta(seconds=3600)
+    mocker.patch('challenge.utils.indexes.daylight_interval_index.get_timestamp_range',
+                 return_value=(start_time, end_time))
+    mock_daylight_windows = mocker.patch('challenge.utils.indexes.daylight_interval_index.get_daylight_windows',
+                                         return_value=[(None, start_time + datetime.timedelta(seconds=600)),
+                                                       (start_time + datetime.timedelta(seconds=3000), None)])
+    response = client.get(f'/iss/sun/summary?start_time={start_time}&end_time={end_time}')
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder({'start_time': start_time, 'end_time': end_time,
+                                                'daylight_seconds': 1200, 'eclipsed_seconds': 2400,
+                                                'daylight_windows': 2})
+    mock_daylight_windows.assert_called_once()
+
+
+@pytest.mark.parametrize('spatial_index_enabled', [True, False])
+def test_iss_passes(mock_set_up_db, client, mocker, disabled_limiter, spatial_index_enabled):
+    """
+    Test for read_passes, with the IssPositions pruned by the spatial index or scanned
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param limiter the disabled limiter
+    :param spatial_index_enabled: whether the IssPositions are pruned with the iss_position_cells table
+    """
+    mocker.patch('challenge.routers.iss_router.spatial_index_enabled', spatial_index_enabled)
+    seconds = [0, 20, 40, 5600]
+    columns = (np.array([FIRST_TIMESTAMP + datetime.timedelta(seconds=second) for second in seconds],
+                        dtype='datetime64[us]'), np.array([45.0, 45.5, 46.5, 45.4]), np.array([9.0, 9.2, 9.4, 9.2]))
+    mock_cell_columns = mocker.patch('challenge.routers.iss_router.get_iss_position_cell_columns',
+                                     return_value=columns)
+    mock_columns = mocker.patch('challenge.routers.iss_router.get_iss_position_columns', return_value=columns)
+    response = client.get('/iss/passes?lat=45.46&lon=9.19&radius_km=100')
+    assert response.status_code == 200
+    passes = response.json()
+    assert [[iss_pass['start_time'], iss_pass['end_time'], iss_pass['closest_time']] for iss_pass in passes] == \
+           jsonable_encoder([(FIRST_TIMESTAMP, FIRST_TIMESTAMP + datetime.timedelta(seconds=20),
+                              FIRST_TIMESTAMP + datetime.timedelta(seconds=20)),
+                             (FIRST_TIMESTAMP + datetime.timedelta(seconds=5600),
+                              FIRST_TIMESTAMP + datetime.timedelta(seconds=5600),
+                              FIRST_TIMESTAMP + datetime.timedelta(seconds=5600))])
+    assert passes[0]['min_distance_km'] < 5
+    assert (mock_cell_columns if spatial_index_enabled else mock_columns).call_count == 1
+    assert (mock_columns if spatial_index_enabled else mock_cell_columns).call_count == 0
+
+    assert client.get('/iss/passes?lat=91&lon=9.19').status_code == 422
+    assert client.get('/iss/passes?lat=45.46&lon=9.19&radius_km=0').status_code == 422
+
+
+def test_iss_sun_parallel(mock_set_up_db, client, mocker, disabled_limiter, disabled_daylight_windows_table,
+                          tmp_path):
+    """
+    Test for read_sun when the range is long enough to be split into time chunks computed by the process pool: the
+    time windows are the same as the ones computed by the worker
+
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    :param mocker: the mocker
+    :param limiter the disabled limiter
+    :param disabled_daylight_windows_table: the disabled daylight_windows table
+    :param tmp_path: the directory of the DB file
+    """
+    from challenge.routers.iss_router import _get_db, get_parallel_time_windows_async
+    from challenge.fastapi_main import app
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}')
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    add_iss_positions(db, get_sample_iss_positions(([Visibility.DAYLIGHT] * 7 + [Visibility.ECLIPSED] * 5) * 50))
+    app.dependency_overrides[_get_db] = lambda: db
+    mocker.patch('challenge.routers.iss_router.time_windows_cache', None)
+    mock_parallel = mocker.patch('challenge.routers.iss_router.get_parallel_time_windows_async',
+                                 wraps=get_parallel_time_windows_async)
+    endpoint = f'/iss/sun?start_time={FIRST_TIMESTAMP}&end_time={FIRST_TIMESTAMP + datetime.timedelta(hours=4)}'
+    serial_response = client.get(endpoint)
+    assert serial_response.status_code == 200
+    assert len(serial_response.json()) == 50
+    mock_parallel.assert_not_called()
+
+    mocker.patch('challenge.routers.iss_router.sun_parallel_min_rows', 100)
+    mocker.patch('challenge.routers.iss_router.sun_parallel_chunks', 3)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as process_pool:
+        mocker.patch('challenge.routers.iss_router.sun_process_pool', process_pool)
+        response = client.get(endpoint)
+        # The processes could not open an in-memory DB, so its ranges stay in the worker
+        memory_engine = create_engine('sqlite://', connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=memory_engine)
+        memory_db = sessionmaker(bind=memory_engine)()
+        add_iss_positions(memory_db, get_sample_iss_positions(([Visibility.DAYLIGHT] * 7 + [Visibility.ECLIPSED] * 5)
+                                                              * 50))
+        app.dependency_overrides[_get_db] = lambda: memory_db
+        memory_response = client.get(endpoint)
+    assert response.status_code == 200
+    assert response.json() == serial_response.json()
+    assert memory_response.json() == serial_response.json()
+    mock_parallel.assert_called_once()
+    memory_db.close()
+    memory_engine.dispose()
+    db.close()
+    engine.dispose()
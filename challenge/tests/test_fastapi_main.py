@@ -1,6 +1,15 @@
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
 
+from challenge.database.daylight_windows_crud import update_daylight_windows, rebuild_daylight_windows
+from challenge.database.iss_crud import add_iss_positions
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_position
+
 from challenge.tests.fastapi_fixtures import client, mock_set_up_db
+from challenge.utils.metrics.iss_metrics import sun_request_seconds
 
 
 def test_read_main(mock_set_up_db, client):
@@ -13,3 +22,107 @@ def test_read_main(mock_set_up_db, client):
     assert response.status_code == 200
     assert response.json() == {
         "message": "Welcome to the ISS Tracker challenge!"}
+
+
+def test_read_metrics(mock_set_up_db, client):
+    """
+    Test for read_metrics
+    :param mock_set_up_db: the mock for the set_up db method
+    :param client: the client to send requests with
+    """
+    sun_request_seconds.observe(0.01, ('cache',))
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert '# TYPE iss_sun_request_seconds histogram' in response.text
+    assert 'iss_sun_request_seconds_count{source="cache"}' in response.text
+    assert '# TYPE iss_rate_limit_rejections_total counter' in response.text
+
+
+@pytest.mark.asyncio
+async def test_warm_iss_position_buffers_and_indexes(mocker, db):
+    """
+    Tests that the buffers and indexes warmed on the DB executor replace the live ones along with the IssPositions
+    added while they were loading
+    :param mocker: the mocker
+    :param db: the DB
+    """
+    from challenge import fastapi_main
+    from challenge.fastapi_main import warm_iss_position_buffers_and_indexes, _get_warmed_buffers_and_indexes
+    from challenge.utils.fastapi.fastapi_utils import iss_position_buffers, daylight_interval_indexes
+    now = datetime.now().replace(microsecond=0)
+    stored_iss_positions = [get_sample_iss_position(visibility, now - timedelta(seconds=60 - 20 * i))
+                            for i, visibility in enumerate([Visibility.ECLIPSED, Visibility.DAYLIGHT])]
+    update_daylight_windows(db, add_iss_positions(db, stored_iss_positions))
+    added_iss_position = get_sample_iss_position(Visibility.ECLIPSED, now)
+    position_listeners = []
+
+    def get_warmed_buffers_and_indexes(*args):
+        warmed_buffers_and_indexes = _get_warmed_buffers_and_indexes(*args)
+        # Added by the IssPositionWriter while the copies were loading
+        for position_listener in position_listeners:
+            position_listener(added_iss_position)
+        return warmed_buffers_and_indexes
+
+    # Restored after the test, as they are replaced
+    mocker.patch.object(iss_position_buffers, '_buffers', iss_position_buffers._buffers)
+    mocker.patch.object(daylight_interval_indexes, '_indexes', daylight_interval_indexes._indexes)
+    mocker.patch.object(fastapi_main, 'ReadOnlySessionLocal', return_value=db)
+    mocker.patch.object(fastapi_main, '_get_warmed_buffers_and_indexes', get_warmed_buffers_and_indexes)
+    await warm_iss_position_buffers_and_indexes(position_listeners)
+    assert position_listeners == []
+    assert iss_position_buffers.get(25544).latest() == added_iss_position
+    assert iss_position_buffers.get(25544).get_columns(now - timedelta(seconds=60), now)[1].tolist() == \
+           [False, True, False]
+    assert daylight_interval_indexes.get(25544).lookup(now - timedelta(seconds=30)) == \
+           (True, now - timedelta(seconds=40), now)
+
+
+@pytest.mark.asyncio
+async def test_relay_shared_positions(mocker, db):
+    """
+    Tests that a worker relaying the IssPositions stored by the leader warms its daylight interval indexes, keeps them
+    up to date with the IssPositions added since, and warms them again when older ones are backfilled, while its buffers
+    stay cold
+    :param mocker: the mocker
+    :param db: the DB
+    """
+    from challenge import fastapi_main
+    from challenge.fastapi_main import relay_shared_positions
+    from challenge.utils.fastapi.fastapi_utils import iss_position_buffers, daylight_interval_indexes, position_hub
+    now = datetime.now().replace(microsecond=0)
+    stored_iss_positions = [get_sample_iss_position(visibility, now - timedelta(seconds=60 - 20 * i))
+                            for i, visibility in enumerate([Visibility.ECLIPSED, Visibility.DAYLIGHT])]
+    update_daylight_windows(db, add_iss_positions(db, stored_iss_positions))
+    mocker.patch.object(iss_position_buffers, '_buffers', iss_position_buffers._buffers)
+    mocker.patch.object(daylight_interval_indexes, '_indexes', daylight_interval_indexes._indexes)
+    mocker.patch.object(position_hub, '_channels', {})
+    mocker.patch.object(fastapi_main, 'ReadOnlySessionLocal', return_value=db)
+
+    relay_task = asyncio.create_task(relay_shared_positions())
+    await asyncio.sleep(0.2)
+    # A burst of IssPositions added between two relays
+    visibilities = [Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.ECLIPSED]
+    shared_iss_positions = [get_sample_iss_position(visibility, now - timedelta(seconds=10 - 5 * i))
+                            for i, visibility in enumerate(visibilities)]
+    update_daylight_windows(db, add_iss_positions(db, shared_iss_positions))
+    await asyncio.sleep(1)
+    assert daylight_interval_indexes.get(25544).warmed
+    assert daylight_interval_indexes.get(25544).lookup(now - timedelta(seconds=30)) == \
+           (True, now - timedelta(seconds=40), now - timedelta(seconds=10))
+    assert daylight_interval_indexes.get(25544).lookup(now - timedelta(seconds=3)) == \
+           (True, now - timedelta(seconds=5), now)
+    assert position_hub.get_latest(25544).timestamp == now
+
+    backfilled_iss_position = get_sample_iss_position(Visibility.ECLIPSED, now - timedelta(seconds=30))
+    add_iss_positions(db, [backfilled_iss_position])
+    rebuild_daylight_windows(db, 25544, now - timedelta(seconds=60), now)
+    # Relayed, then warmed again
+    await asyncio.sleep(1.2)
+    relay_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await relay_task
+
+    assert daylight_interval_indexes.get(25544).lookup(now - timedelta(seconds=20)) == \
+           (False, now - timedelta(seconds=30), now - timedelta(seconds=5))
+    assert iss_position_buffers.get(25544).latest() is None
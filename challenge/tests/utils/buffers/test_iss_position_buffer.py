@@ -0,0 +1,104 @@
+from datetime import timedelta, datetime
+from unittest.mock import Mock
+
+import pytest
+
+from challenge.database.iss_crud import add_iss_position
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions
+from challenge.utils.buffers.iss_position_buffer import IssPositionBuffer, IssPositionBuffers
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows, \
+    get_daylight_time_windows_vectorized
+
+VISIBILITIES = [Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.DAYLIGHT, Visibility.ECLIPSED,
+                Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.ECLIPSED, Visibility.DAYLIGHT]
+
+
+@pytest.fixture
+def iss_position_buffer():
+    iss_position_buffer = IssPositionBuffer(coverage_seconds=100, wait_time=20)
+    iss_position_buffer.covered_from = datetime.min
+    return iss_position_buffer
+
+
+def test_append_and_evict(iss_position_buffer):
+    """
+    Tests that the buffer keeps the latest IssPositions and moves its coverage forward on eviction
+    :param iss_position_buffer: the IssPositionBuffer
+    """
+    assert iss_position_buffer.latest() is None
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+    for iss_position in iss_positions:
+        iss_position_buffer.append(iss_position)
+    # Older or duplicated IssPositions are ignored
+    iss_position_buffer.append(iss_positions[-2])
+
+    assert iss_position_buffer.latest() == iss_positions[-1]
+    assert iss_position_buffer.covers(iss_positions[2].timestamp)
+    assert not iss_position_buffer.covers(iss_positions[1].timestamp)
+    timestamps, daylight = iss_position_buffer.get_columns(datetime.min, datetime.max)
+    assert timestamps.tolist() == [iss_position.timestamp for iss_position in iss_positions[2:]]
+    assert daylight.tolist() == [visibility == Visibility.DAYLIGHT for visibility in VISIBILITIES[2:]]
+
+
+def test_get_columns(iss_position_buffer):
+    """
+    Tests that the time windows computed from the buffer columns match the reference on every range
+    :param iss_position_buffer: the IssPositionBuffer
+    """
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+    for iss_position in iss_positions:
+        iss_position_buffer.append(iss_position)
+    for first in range(2, len(iss_positions)):
+        for last in range(first, len(iss_positions)):
+            start_time = iss_positions[first].timestamp - timedelta(seconds=1)
+            end_time = iss_positions[last].timestamp
+            expected_windows = get_daylight_time_windows(iss_positions[first:last + 1])
+            assert get_daylight_time_windows_vectorized(
+                *iss_position_buffer.get_columns(start_time, end_time)) == expected_windows
+
+
+def test_warm(db, mocker):
+    """
+    Tests that warm loads the recent IssPositions from the DB
+    :param db: the DB
+    :param mocker: the mocker
+    """
+    iss_positions = get_sample_iss_positions(VISIBILITIES)
+    for iss_position in iss_positions:
+        add_iss_position(db, iss_position)
+    now = iss_positions[-1].timestamp + timedelta(seconds=1)
+    mocker.patch('challenge.utils.buffers.iss_position_buffer.datetime', Mock(now=Mock(return_value=now)))
+
+    iss_position_buffer = IssPositionBuffer(coverage_seconds=60, wait_time=20)
+    assert not iss_position_buffer.covers(now)
+    iss_position_buffer.warm(db)
+    assert iss_position_buffer.covered_from == now - timedelta(seconds=60)
+    assert iss_position_buffer.latest() == iss_positions[-1]
+    timestamps, _ = iss_position_buffer.get_columns(datetime.min, datetime.max)
+    assert timestamps.tolist() == [iss_position.timestamp for iss_position in iss_positions[-3:]]
+
+
+def test_buffers_per_satellite(db, mocker):
+    """
+    Tests that IssPositionBuffers warms and appends the IssPositions of every satellite to its own buffer only
+    :param db: the DB
+    :param mocker: the mocker
+    """
+    iss_positions = get_sample_iss_positions(VISIBILITIES, satellite_id=1)
+    other_iss_positions = get_sample_iss_positions(VISIBILITIES, satellite_id=2)
+    for iss_position in iss_positions[:-1] + other_iss_positions[:-1]:
+        add_iss_position(db, iss_position)
+    now = iss_positions[-1].timestamp + timedelta(seconds=1)
+    mocker.patch('challenge.utils.buffers.iss_position_buffer.datetime', Mock(now=Mock(return_value=now)))
+
+    iss_position_buffers = IssPositionBuffers([1, 2], coverage_seconds=3600, wait_time=20)
+    iss_position_buffers.warm(db)
+    iss_position_buffers.append(iss_positions[-1])
+    iss_position_buffers.append(get_sample_iss_positions(VISIBILITIES, satellite_id=3)[-1])
+
+    assert iss_position_buffers.get(3) is None
+    assert iss_position_buffers.get(1).latest() == iss_positions[-1]
+    assert iss_position_buffers.get(2).latest() == other_iss_positions[-2]
+    timestamps, _ = iss_position_buffers.get(2).get_columns(datetime.min, datetime.max)
+    assert timestamps.tolist() == [iss_position.timestamp for iss_position in other_iss_positions[:-1]]
@@ -0,0 +1,96 @@
+import multiprocessing
+from datetime import datetime, timedelta
+
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_position
+from challenge.utils.buffers.latest_position_slots import LatestPositionSlots, MAX_TEXT_BYTES
+
+FIRST_TIMESTAMP = datetime(2023, 11, 10)
+PUBLISHED_POSITIONS = 20000
+
+
+def _publish(path: str, started) -> None:
+    latest_position_slots = LatestPositionSlots(path, [25544, 43013])
+    iss_position = get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP)
+    started.set()
+    for i in range(1, PUBLISHED_POSITIONS + 1):
+        # Every field depends on i, so that a torn read mixes values of different IssPositions
+        latest_position_slots.publish(iss_position.model_copy(update={
+            'latitude': i, 'longitude': -i, 'altitude': 2 * i, 'timestamp': FIRST_TIMESTAMP + timedelta(seconds=i),
+            'visibility': Visibility.DAYLIGHT if i % 2 else Visibility.ECLIPSED}))
+    latest_position_slots.close()
+
+
+def test_publish_and_read(tmp_path):
+    """
+    Tests that the published IssPositions are read back per satellite, and that older ones are ignored
+    """
+    path = str(tmp_path / 'locations.db.latest')
+    writer = LatestPositionSlots(path, [25544, 43013])
+    reader = LatestPositionSlots(path, [25544, 43013])
+    assert reader.read(25544) is None
+    assert reader.read(1) is None
+
+    iss_position = get_sample_iss_position(Visibility.ECLIPSED, FIRST_TIMESTAMP + timedelta(seconds=20))
+    other_iss_position = get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP, satellite_id=43013)
+    writer.publish(iss_position)
+    writer.publish(other_iss_position)
+    writer.publish(get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP))
+    assert reader.read(25544) == iss_position
+    assert reader.read(43013) == other_iss_position
+
+    reader.max_age_seconds = -1
+    assert reader.read(25544) is None
+    writer.close()
+    reader.close()
+
+
+def test_publish_text_that_does_not_fit(tmp_path):
+    """
+    Tests that multibyte names are read back whole, and that an IssPosition whose name does not fit its field empties
+    the slot instead of being published cut
+    """
+    path = str(tmp_path / 'locations.db.latest')
+    latest_position_slots = LatestPositionSlots(path, [25544])
+    iss_position = get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP)
+    iss_position = iss_position.model_copy(update={'name': 'é' * (MAX_TEXT_BYTES // 2)})
+    latest_position_slots.publish(iss_position)
+    assert latest_position_slots.read(25544) == iss_position
+
+    latest_position_slots.publish(iss_position.model_copy(update={
+        'name': 'é' * (MAX_TEXT_BYTES // 2) + 'x', 'timestamp': FIRST_TIMESTAMP + timedelta(seconds=1)}))
+    assert latest_position_slots.read(25544) is None
+    next_iss_position = iss_position.model_copy(update={'timestamp': FIRST_TIMESTAMP + timedelta(seconds=2)})
+    latest_position_slots.publish(next_iss_position)
+    assert latest_position_slots.read(25544) == next_iss_position
+    latest_position_slots.close()
+
+
+def test_read_while_another_process_publishes(tmp_path):
+    """
+    Tests that the reads are never torn nor going back in time while another process keeps publishing
+    """
+    path = str(tmp_path / 'locations.db.latest')
+    context = multiprocessing.get_context('spawn')
+    started = context.Event()
+    writer_process = context.Process(target=_publish, args=(path, started))
+    writer_process.start()
+    reader = LatestPositionSlots(path, [25544, 43013])
+    try:
+        assert started.wait(10)
+        previous_i = 0
+        while writer_process.is_alive():
+            iss_position = reader.read(25544)
+            if iss_position is None:
+                continue
+            i = int(iss_position.latitude)
+            assert (iss_position.longitude, iss_position.altitude, iss_position.timestamp,
+                    iss_position.visibility) == (-i, 2 * i, FIRST_TIMESTAMP + timedelta(seconds=i),
+                                                 Visibility.DAYLIGHT if i % 2 else Visibility.ECLIPSED)
+            assert i >= previous_i
+            previous_i = i
+        assert reader.read(25544).latitude == PUBLISHED_POSITIONS
+        assert reader.read(43013) is None
+    finally:
+        writer_process.join()
+        reader.close()
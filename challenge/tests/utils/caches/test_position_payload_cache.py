@@ -0,0 +1,39 @@
+import json
+from datetime import timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from challenge.database.models import models
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+from challenge.tests.database_fixtures import get_sample_iss_position, FIRST_TIMESTAMP
+from challenge.utils.caches.position_payload_cache import PositionPayloadCache, encode_position
+
+
+def test_encode_position():
+    """
+    Tests that the encoded IssPositions, both models and schemas, match the JSON of jsonable_encoder
+    """
+    iss_position = get_sample_iss_position(Visibility.ECLIPSED, FIRST_TIMESTAMP + timedelta(microseconds=250))
+    for position in (iss_position, models.IssPosition(**iss_position.model_dump())):
+        assert json.loads(encode_position(position, True)) == jsonable_encoder(IssPosition.model_validate(position))
+        assert json.loads(encode_position(position, False)) == jsonable_encoder(
+            {'latitude': position.latitude, 'longitude': position.longitude, 'timestamp': position.timestamp})
+
+
+def test_get():
+    """
+    Tests that the payloads are encoded once per IssPosition and variant, until a newer IssPosition is served
+    """
+    position_payload_cache = PositionPayloadCache()
+    iss_position = get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP)
+    brief_payload = position_payload_cache.get(iss_position, False)
+    detailed_payload = position_payload_cache.get(iss_position, True)
+    assert brief_payload != detailed_payload
+    assert position_payload_cache.get(IssPosition.model_validate(iss_position), False) is brief_payload
+    assert position_payload_cache.get_stats() == {'hits': 1, 'misses': 2, 'entries': 2}
+
+    newer_iss_position = get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP + timedelta(seconds=20))
+    assert json.loads(position_payload_cache.get(newer_iss_position, False))['timestamp'] == \
+           newer_iss_position.timestamp.isoformat()
+    assert position_payload_cache.get_stats() == {'hits': 1, 'misses': 3, 'entries': 2}
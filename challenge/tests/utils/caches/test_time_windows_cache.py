@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_position, FIRST_TIMESTAMP
+from challenge.utils.caches.time_windows_cache import TimeWindowsCache
+
+TIME_WINDOWS = [{'start_time': FIRST_TIMESTAMP, 'end_time': FIRST_TIMESTAMP + timedelta(minutes=30)}]
+
+
+def test_get_key(mocker):
+    """
+    Tests that the ranges without an end time are rounded up to the quantum, while the others are kept as they are
+    :param mocker: the mocker
+    """
+    now = datetime(2023, 11, 11, 10, 0, 5)
+    mocker.patch('challenge.utils.caches.time_windows_cache.datetime', Mock(now=Mock(return_value=now),
+                                                                            fromtimestamp=datetime.fromtimestamp))
+    time_windows_cache = TimeWindowsCache(quantum_seconds=20)
+
+    assert time_windows_cache.get_key(1, None, None, 3600) == (1, datetime(2023, 11, 11, 9, 0, 20),
+                                                               datetime(2023, 11, 11, 10, 0, 20))
+    assert time_windows_cache.get_key(1, FIRST_TIMESTAMP, now, 3600) == (1, FIRST_TIMESTAMP, now)
+
+
+def test_get_and_put():
+    """
+    Tests the hits and misses of the cache, and the expiration of the entries
+    """
+    time_windows_cache = TimeWindowsCache()
+    key = (1, FIRST_TIMESTAMP, FIRST_TIMESTAMP + timedelta(days=1))
+    assert time_windows_cache.get(key) is None
+    time_windows_cache.put(key, TIME_WINDOWS)
+    assert time_windows_cache.get(key) == TIME_WINDOWS
+    assert time_windows_cache.get_stats()['hits'] == 1 and time_windows_cache.get_stats()['misses'] == 1
+
+    expired_time_windows_cache = TimeWindowsCache(ttl_seconds=-1)
+    expired_time_windows_cache.put(key, TIME_WINDOWS)
+    assert expired_time_windows_cache.get(key) is None
+    assert expired_time_windows_cache.get_stats()['entries'] == 0
+
+
+def test_memory_budget():
+    """
+    Tests that the least recently used entries are evicted to stay within the memory budget
+    """
+    entry_size_bytes = TimeWindowsCache._get_size_bytes(TIME_WINDOWS)
+    time_windows_cache = TimeWindowsCache(max_bytes=entry_size_bytes * 2)
+    keys = [(1, FIRST_TIMESTAMP + timedelta(hours=i), FIRST_TIMESTAMP + timedelta(hours=i + 1)) for i in range(3)]
+    time_windows_cache.put(keys[0], TIME_WINDOWS)
+    time_windows_cache.put(keys[1], TIME_WINDOWS)
+    time_windows_cache.get(keys[0])
+    time_windows_cache.put(keys[2], TIME_WINDOWS)
+
+    assert time_windows_cache.get(keys[1]) is None
+    assert time_windows_cache.get(keys[0]) == TIME_WINDOWS
+    assert time_windows_cache.get_stats()['evictions'] == 1
+    assert time_windows_cache.size_bytes == entry_size_bytes * 2
+
+    time_windows_cache.put((2, FIRST_TIMESTAMP, FIRST_TIMESTAMP), TIME_WINDOWS * 10)
+    assert time_windows_cache.get_stats()['entries'] == 2
+
+
+def test_invalidate():
+    """
+    Tests that only the entries of the same satellite whose range covers the added IssPosition are invalidated
+    """
+    time_windows_cache = TimeWindowsCache()
+    keys = [(1, FIRST_TIMESTAMP, FIRST_TIMESTAMP + timedelta(hours=1)),
+            (1, FIRST_TIMESTAMP + timedelta(hours=2), FIRST_TIMESTAMP + timedelta(hours=3)),
+            (2, FIRST_TIMESTAMP, FIRST_TIMESTAMP + timedelta(hours=1))]
+    for key in keys:
+        time_windows_cache.put(key, TIME_WINDOWS)
+
+    time_windows_cache.invalidate(get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP + timedelta(minutes=1),
+                                                          satellite_id=1))
+
+    assert time_windows_cache.get(keys[0]) is None
+    assert time_windows_cache.get(keys[1]) == TIME_WINDOWS
+    assert time_windows_cache.get(keys[2]) == TIME_WINDOWS
+    assert time_windows_cache.get_stats()['invalidations'] == 1
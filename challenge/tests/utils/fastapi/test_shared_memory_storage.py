@@ -0,0 +1,94 @@
+import multiprocessing
+
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from challenge.utils.fastapi.shared_memory_storage import SharedMemoryStorage
+
+NOW = 1699660800.0
+
+
+def _hit(uri: str, hits: int, allowed) -> None:
+    storage = storage_from_string(uri)
+    rate_limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse('100/minute')
+    allowed.put(sum(rate_limiter.hit(item, '127.0.0.1', '/iss/sun') for _ in range(hits)))
+    storage.close()
+
+
+@pytest.fixture
+def clock(mocker):
+    clock = mocker.patch('challenge.utils.fastapi.shared_memory_storage.time.time', return_value=NOW)
+    mocker.patch('limits.strategies.time.time', clock)
+    return clock
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = storage_from_string(f'shm://{tmp_path}/locations.db.limits?slots=16')
+    yield storage
+    storage.close()
+
+
+def test_fixed_window(storage, clock):
+    """
+    Tests the fixed-window strategy: the hits are counted per key until the window aligned on the epoch ends
+    """
+    assert isinstance(storage, SharedMemoryStorage)
+    rate_limiter = FixedWindowRateLimiter(storage)
+    item = parse('3/minute')
+    assert [rate_limiter.hit(item, 'first') for _ in range(4)] == [True, True, True, False]
+    assert rate_limiter.hit(item, 'second')
+    assert storage.get_expiry(item.key_for('first')) == NOW + 60
+
+    clock.return_value = NOW + 60
+    assert rate_limiter.hit(item, 'first')
+    storage.clear(item.key_for('first'))
+    assert storage.get(item.key_for('first')) == 0
+
+
+def test_sliding_window_counter(storage, clock):
+    """
+    Tests the sliding-window-counter strategy: the hits of the previous window count as much as the previous window
+    still overlaps the sliding window
+    """
+    rate_limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse('10/minute')
+    assert all(rate_limiter.hit(item, 'first') for _ in range(10))
+    assert not rate_limiter.hit(item, 'first')
+
+    # A quarter into the next window, 7.5 of the 10 previous hits still count
+    clock.return_value = NOW + 75
+    assert [rate_limiter.hit(item, 'first') for _ in range(3)] == [True, True, False]
+
+    clock.return_value = NOW + 180
+    assert rate_limiter.get_window_stats(item, 'first').remaining == 10
+
+
+def test_slots_are_reused(storage, clock):
+    """
+    Tests that more keys than slots can be limited, the expired or oldest counters being replaced
+    """
+    rate_limiter = FixedWindowRateLimiter(storage)
+    item = parse('1/second')
+    for i in range(100):
+        assert rate_limiter.hit(item, str(i))
+        clock.return_value += 0.1
+    assert not rate_limiter.hit(item, '99')
+
+
+def test_limits_shared_between_processes(tmp_path):
+    """
+    Tests that a limit is enforced once across several processes hitting it at the same time
+    """
+    uri = f'shm://{tmp_path}/locations.db.limits'
+    context = multiprocessing.get_context('spawn')
+    allowed = context.Queue()
+    processes = [context.Process(target=_hit, args=(uri, 60, allowed)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    assert sum(allowed.get(timeout=30) for _ in processes) == 100
+    for process in processes:
+        process.join()
@@ -0,0 +1,111 @@
+from datetime import timedelta, datetime
+
+import pytest
+
+from challenge.database.daylight_windows_crud import update_daylight_windows
+from challenge.database.iss_crud import add_iss_positions
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import db, get_sample_iss_positions
+from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndex, DaylightIntervalIndexes
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows
+
+VISIBILITIES = [Visibility.DAYLIGHT, Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.ECLIPSED,
+                Visibility.DAYLIGHT, Visibility.ECLIPSED, Visibility.DAYLIGHT, Visibility.DAYLIGHT]
+
+
+def get_expected_daylight_seconds(iss_positions: list, start_time: datetime, end_time: datetime) -> float:
+    # Every IssPosition keeps its visibility until the next one
+    return sum((min(next_position.timestamp, end_time) - max(iss_position.timestamp, start_time)).total_seconds()
+               for iss_position, next_position in zip(iss_positions, iss_positions[1:])
+               if iss_position.visibility == Visibility.DAYLIGHT and iss_position.timestamp < end_time and
+               next_position.timestamp > start_time)
+
+
+@pytest.fixture
+def iss_positions():
+    return get_sample_iss_positions(VISIBILITIES)
+
+
+@pytest.fixture
+def daylight_interval_index(iss_positions):
+    daylight_interval_index = DaylightIntervalIndex(25544)
+    daylight_interval_index.warmed = True
+    for iss_position in iss_positions:
+        daylight_interval_index.append(iss_position)
+    return daylight_interval_index
+
+
+def test_lookup(daylight_interval_index, iss_positions):
+    """
+    Tests that the visibility at any time is the one of the latest IssPosition at or before it
+    :param daylight_interval_index: the DaylightIntervalIndex
+    :param iss_positions: the appended IssPositions
+    """
+    timestamps = [iss_position.timestamp for iss_position in iss_positions]
+    assert daylight_interval_index.lookup(timestamps[0] - timedelta(seconds=1)) is None
+    assert daylight_interval_index.lookup(timestamps[0]) == (True, timestamps[0], timestamps[2])
+    assert daylight_interval_index.lookup(timestamps[1] + timedelta(seconds=5)) == (True, timestamps[0], timestamps[2])
+    assert daylight_interval_index.lookup(timestamps[2]) == (False, timestamps[2], timestamps[4])
+    assert daylight_interval_index.lookup(timestamps[4]) == (True, timestamps[4], timestamps[5])
+    assert daylight_interval_index.lookup(timestamps[5] + timedelta(seconds=19)) == (False, timestamps[5],
+                                                                                      timestamps[6])
+    # The last window is still open
+    assert daylight_interval_index.lookup(timestamps[7] + timedelta(days=1)) == (True, timestamps[6], None)
+
+
+def test_get_summary(daylight_interval_index, iss_positions):
+    """
+    Tests that the daylight seconds of every range match the sum over the IssPositions
+    :param daylight_interval_index: the DaylightIntervalIndex
+    :param iss_positions: the appended IssPositions
+    """
+    for first in range(len(iss_positions)):
+        for last in range(first, len(iss_positions)):
+            start_time = iss_positions[first].timestamp + timedelta(seconds=7)
+            end_time = iss_positions[last].timestamp + timedelta(seconds=3)
+            summary = daylight_interval_index.get_summary(start_time, end_time)
+            covered_end_time = min(end_time, iss_positions[-1].timestamp)
+            if start_time > covered_end_time:
+                assert summary['start_time'] is None and summary['daylight_seconds'] == 0
+                continue
+            expected_seconds = get_expected_daylight_seconds(iss_positions, start_time, covered_end_time)
+            assert summary['daylight_seconds'] == expected_seconds
+            assert summary['eclipsed_seconds'] == (covered_end_time - start_time).total_seconds() - expected_seconds
+            assert summary['daylight_windows'] == len([
+                (window_start, window_end) for window_start, window_end in get_daylight_time_windows(iss_positions)
+                if (window_start or iss_positions[0].timestamp) <= covered_end_time and
+                (window_end is None or window_end > start_time)])
+    summary = daylight_interval_index.get_summary(datetime.min, datetime.max)
+    assert summary['start_time'] == iss_positions[0].timestamp and summary['end_time'] == iss_positions[-1].timestamp
+    assert summary['daylight_seconds'] == 80 and summary['eclipsed_seconds'] == 60
+    assert summary['daylight_windows'] == 3
+
+
+@pytest.mark.parametrize('use_daylight_windows_table', [True, False])
+def test_warm(db, daylight_interval_index, iss_positions, use_daylight_windows_table):
+    """
+    Tests that warming the index from the DB gives the same answers as following the added IssPositions
+    :param db: the DB
+    :param daylight_interval_index: the DaylightIntervalIndex that followed the IssPositions
+    :param iss_positions: the IssPositions
+    :param use_daylight_windows_table: whether the windows are read from the daylight_windows table
+    """
+    add_iss_positions(db, iss_positions, commit=False)
+    update_daylight_windows(db, iss_positions)
+    daylight_interval_indexes = DaylightIntervalIndexes([25544])
+    warmed_index = daylight_interval_indexes.get(25544)
+    daylight_interval_indexes.append(iss_positions[0])
+    assert warmed_index.lookup(iss_positions[0].timestamp) is None
+
+    daylight_interval_indexes.warm(db, use_daylight_windows_table)
+    for i in range(len(iss_positions)):
+        timestamp = iss_positions[i].timestamp + timedelta(seconds=i)
+        assert warmed_index.lookup(timestamp) == daylight_interval_index.lookup(timestamp)
+    assert warmed_index.get_summary(datetime.min, datetime.max) == \
+           daylight_interval_index.get_summary(datetime.min, datetime.max)
+
+    # Then it follows the added IssPositions
+    iss_position = get_sample_iss_positions(VISIBILITIES + [Visibility.ECLIPSED])[-1]
+    daylight_interval_indexes.append(iss_position)
+    assert warmed_index.lookup(iss_position.timestamp) == (False, iss_position.timestamp, None)
+    assert warmed_index.get_summary(datetime.min, datetime.max)['daylight_seconds'] == 100
@@ -0,0 +1,57 @@
+import pytest
+
+from challenge.utils.metrics.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    """
+    Provides a MetricsRegistry isolated from the default one
+    :return: the MetricsRegistry
+    """
+    return MetricsRegistry()
+
+
+def test_counter(registry):
+    """
+    Tests that a Counter sums the increments per label values and renders one sample per label values
+    """
+    counter = Counter('requests_total', 'Requests', ('path',), registry=registry)
+    counter.inc(label_values=('/iss/sun',))
+    counter.inc(2, ('/iss/sun',))
+    counter.inc(label_values=('/iss/position',))
+    assert counter.get(('/iss/sun',)) == 3
+    assert counter.get(('/',)) == 0
+    assert registry.render() == ('# HELP requests_total Requests\n'
+                                 '# TYPE requests_total counter\n'
+                                 'requests_total{path="/iss/sun"} 3\n'
+                                 'requests_total{path="/iss/position"} 1\n')
+
+
+def test_gauge(registry):
+    """
+    Tests that a Gauge renders either its value or the value of its function, NaN included
+    """
+    gauge = Gauge('temperature', 'Temperature', registry=registry)
+    gauge.set(1.5)
+    assert gauge.get() == 1.5
+    Gauge('unknown', 'Unknown', lambda: float('nan'), registry=registry)
+    assert registry.render().splitlines()[2::3] == ['temperature 1.5', 'unknown NaN']
+
+
+def test_histogram(registry):
+    """
+    Tests that a Histogram renders cumulative buckets, the sum and the count of the observed values
+    """
+    histogram = Histogram('latency_seconds', 'Latency', ('source',), buckets=(0.1, 1), registry=registry)
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, ('db',))
+    assert histogram.get_count(('db',)) == 4
+    assert histogram.get_count(('cache',)) == 0
+    assert registry.render() == ('# HELP latency_seconds Latency\n'
+                                 '# TYPE latency_seconds histogram\n'
+                                 'latency_seconds_bucket{source="db",le="0.1"} 2\n'
+                                 'latency_seconds_bucket{source="db",le="1"} 3\n'
+                                 'latency_seconds_bucket{source="db",le="+Inf"} 4\n'
+                                 'latency_seconds_sum{source="db"} 2.65\n'
+                                 'latency_seconds_count{source="db"} 4\n')
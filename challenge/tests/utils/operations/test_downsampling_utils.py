@@ -0,0 +1,33 @@
+import numpy as np
+
+from challenge.utils.operations.downsampling_utils import get_lttb_indexes, get_transition_indexes
+
+
+def test_get_transition_indexes():
+    """
+    Tests that both sides of every transition are found
+    """
+    daylight = np.array([True, True, False, False, False, True, False])
+    assert get_transition_indexes(daylight).tolist() == [1, 2, 4, 5, 6]
+    assert get_transition_indexes(np.ones(5, dtype=bool)).tolist() == []
+    assert get_transition_indexes(np.empty(0, dtype=bool)).tolist() == []
+
+
+def test_get_lttb_indexes():
+    """
+    Tests that LTTB keeps the first and last points, the given number of points and the peaks of the series
+    """
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 1000 * 4 * np.pi)
+    y[333] = 10
+    indexes = get_lttb_indexes(x, y, 50)
+    assert len(indexes) == 50
+    assert indexes[0] == 0 and indexes[-1] == 999
+    assert np.all(np.diff(indexes) > 0)
+    assert 333 in indexes
+    # The extremes of the sine are kept within a bucket
+    assert abs(y[indexes].max() - 10) < 1e-9 and y[indexes].min() < -0.99
+
+    assert get_lttb_indexes(x[:10], y[:10], 50).tolist() == list(range(10))
+    assert get_lttb_indexes(x, y, 2).tolist() == [0, 999]
+    assert len(get_lttb_indexes(x[:4], y[:4], 3)) == 3
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from challenge.utils.operations.spatial_utils import get_cells, get_cell_ranges, get_haversine_distances, \
+    get_passes, GRID_COLUMNS
+
+
+def test_get_cells():
+    """
+    Tests that the cells are numbered row by row from the south-west corner, the edges of the grid included
+    """
+    latitudes = np.array([-90, -89.5, 0, 0.5, 89.99, 90])
+    longitudes = np.array([-180, -179.5, 0, 1.5, 179.99, 180])
+    assert get_cells(latitudes, longitudes).tolist() == [0, 0, 90 * GRID_COLUMNS + 180, 90 * GRID_COLUMNS + 181,
+                                                         179 * GRID_COLUMNS + 359, 179 * GRID_COLUMNS]
+
+
+@pytest.mark.parametrize('latitude,longitude,radius_km', [(45.46, 9.19, 500), (-33.87, 151.21, 2000),
+                                                          (64.13, -21.9, 3000), (0, 179.8, 800), (10, -179.9, 50),
+                                                          (85, 30, 1000)])
+def test_get_cell_ranges(latitude, longitude, radius_km):
+    """
+    Tests that the cell ranges hold every coordinate within the distance, across the antimeridian and near the poles
+    :param latitude: the latitude of the location
+    :param longitude: the longitude of the location
+    :param radius_km: the distance
+    """
+    random_generator = np.random.default_rng(0)
+    latitudes = random_generator.uniform(-90, 90, 200000)
+    longitudes = random_generator.uniform(-180, 180, 200000)
+    close = get_haversine_distances(latitude, longitude, latitudes, longitudes) <= radius_km
+    cells = get_cells(latitudes[close], longitudes[close])
+    cell_ranges = get_cell_ranges(latitude, longitude, radius_km)
+    assert close.any()
+    assert all(any(first_cell <= cell <= last_cell for first_cell, last_cell in cell_ranges) for cell in cells)
+    assert cell_ranges == sorted(cell_ranges)
+    assert all(previous[1] + 1 < following[0] for previous, following in zip(cell_ranges, cell_ranges[1:]))
+
+
+def test_get_haversine_distances():
+    """
+    Tests the great-circle distances against known ones
+    """
+    distances = get_haversine_distances(51.5007, -0.1246, np.array([51.5007, 40.6892, -51.5007]),
+                                        np.array([-0.1246, -74.0445, 179.8754]))
+    assert distances[0] == 0
+    assert abs(distances[1] - 5574.8) < 1
+    assert abs(distances[2] - 20015.1) < 1
+
+
+def test_get_passes():
+    """
+    Tests that the close IssPositions are split into passes on long gaps, each one with its closest IssPosition
+    """
+    first_timestamp = datetime(2023, 11, 10)
+    seconds = [0, 20, 40, 60, 5600, 5620, 11200]
+    timestamps = np.array([first_timestamp + timedelta(seconds=second) for second in seconds], dtype='datetime64[us]')
+    distances = np.array([300, 120, 80, 250, 400, 350, 10])
+    passes = [(first_timestamp + timedelta(seconds=start), first_timestamp + timedelta(seconds=end),
+               first_timestamp + timedelta(seconds=closest), min_distance_km)
+              for start, end, closest, min_distance_km in [(0, 60, 40, 80), (5600, 5620, 5620, 350),
+                                                           (11200, 11200, 11200, 10)]]
+    assert get_passes(timestamps, distances) == [
+        {'start_time': start_time, 'end_time': end_time, 'closest_time': closest_time,
+         'min_distance_km': min_distance_km} for start_time, end_time, closest_time, min_distance_km in passes]
+    assert get_passes(timestamps[:0], distances[:0]) == []
@@ -1,10 +1,14 @@
+import random
 from datetime import datetime, timedelta
 
+import numpy as np
 import pytest
 
 from challenge.database.models.models import IssPosition
 from challenge.database.models.visibility import Visibility
-from challenge.utils.operations.time_windows_utils import get_daylight_time_windows
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows, \
+    get_daylight_time_windows_vectorized, iter_daylight_time_windows, get_chunk_daylight_time_windows, \
+    merge_daylight_time_windows
 
 
 @pytest.fixture
@@ -144,3 +148,76 @@ def test_get_daylight_small_lists(timestamps):
         visibility=Visibility.DAYLIGHT, timestamp=timestamps[2]))
     time_windows = get_daylight_time_windows(test_list)
     assert time_windows == [(None, None)]
+
+
+def _get_vectorized_time_windows(iss_positions: list[IssPosition]) -> list[tuple]:
+    return get_daylight_time_windows_vectorized([iss_position.timestamp for iss_position in iss_positions],
+                                                [iss_position.visibility for iss_position in iss_positions])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_vectorized_matches_reference(timestamps, seed):
+    """
+    Tests that get_daylight_time_windows_vectorized returns exactly the same time windows as the reference
+    get_daylight_time_windows on random lists of IssPosition, edge windows included
+    :param timestamps: the timestamps fixture
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    now = timestamps[-1]
+    for size in range(0, 40):
+        test_list = [IssPosition(visibility=rng.choice(list(Visibility)), timestamp=now + timedelta(seconds=20 * i))
+                     for i in range(size)]
+        assert _get_vectorized_time_windows(test_list) == get_daylight_time_windows(test_list)
+
+
+def test_vectorized_accepts_columns(timestamps):
+    """
+    Tests get_daylight_time_windows_vectorized with a boolean daylight mask and datetime64 timestamps
+    :param timestamps: the timestamps fixture
+    """
+    daylight = np.array([True, False, False, True, True, False, True])
+    time_windows = get_daylight_time_windows_vectorized(np.array(timestamps[:7], dtype='datetime64[us]'), daylight)
+    assert time_windows == [(None, timestamps[1]), (timestamps[3], timestamps[5]), (timestamps[6], None)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_streaming_matches_reference(timestamps, seed):
+    """
+    Tests that iter_daylight_time_windows yields the same time windows as the reference get_daylight_time_windows,
+    whatever the chunks the columns are split into
+    :param timestamps: the timestamps fixture
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    now = timestamps[-1]
+    for size in range(0, 40):
+        test_list = [IssPosition(visibility=rng.choice(list(Visibility)), timestamp=now + timedelta(seconds=20 * i))
+                     for i in range(size)]
+        boundaries = sorted(rng.sample(range(size + 1), rng.randint(0, size + 1)))
+        chunks = [test_list[start:end] for start, end in zip([0] + boundaries, boundaries + [size])]
+        column_chunks = [([iss_position.timestamp for iss_position in chunk],
+                          [iss_position.visibility for iss_position in chunk]) for chunk in chunks]
+        assert list(iter_daylight_time_windows(column_chunks)) == get_daylight_time_windows(test_list)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_merged_chunks_match_reference(timestamps, seed):
+    """
+    Tests that the time windows of the chunks merged by merge_daylight_time_windows are the same as the ones of the
+    reference get_daylight_time_windows, whatever the chunks the IssPositions are split into, empty ones included
+    :param timestamps: the timestamps fixture
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    now = timestamps[-1]
+    for size in range(0, 40):
+        test_list = [IssPosition(visibility=rng.choice(list(Visibility)), timestamp=now + timedelta(seconds=20 * i))
+                     for i in range(size)]
+        boundaries = sorted(rng.choices(range(size + 1), k=rng.randint(0, 8)))
+        chunks = [test_list[start:end] for start, end in zip([0] + boundaries, boundaries + [size])]
+        chunk_time_windows = [get_chunk_daylight_time_windows(
+            np.array([iss_position.timestamp for iss_position in chunk], dtype='datetime64[us]'),
+            np.array([iss_position.visibility == Visibility.DAYLIGHT for iss_position in chunk], dtype=np.bool_))
+            for chunk in chunks]
+        assert merge_daylight_time_windows(chunk_time_windows) == get_daylight_time_windows(test_list)
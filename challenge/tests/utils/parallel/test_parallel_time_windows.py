@@ -0,0 +1,89 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from challenge.database.database import Base
+from challenge.database.iss_crud import add_iss_positions, get_iss_position_columns
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_positions, FIRST_TIMESTAMP
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows_vectorized
+from challenge.utils.parallel.parallel_time_windows import get_time_chunks, get_parallel_time_windows, \
+    get_parallel_time_windows_async
+
+SIZE = 2001
+
+
+@pytest.fixture(scope='module')
+def process_pool():
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as process_pool:
+        yield process_pool
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    database_url = f'sqlite:///{tmp_path / "test.db"}'
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    yield database_url
+    engine.dispose()
+
+
+def test_get_time_chunks():
+    """
+    Tests that get_time_chunks covers the whole range with disjoint chunks
+    """
+    start_time = datetime(2023, 11, 10)
+    chunks = get_time_chunks(start_time, start_time + timedelta(seconds=3), 3)
+    assert chunks == [(start_time, start_time + timedelta(microseconds=999999)),
+                      (start_time + timedelta(seconds=1), start_time + timedelta(microseconds=1999999)),
+                      (start_time + timedelta(seconds=2), start_time + timedelta(seconds=3))]
+    # Ranges too short to be split keep a single chunk
+    assert get_time_chunks(start_time, start_time + timedelta(microseconds=1), 3) == [
+        (start_time, start_time + timedelta(microseconds=1))]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_parallel_matches_serial(process_pool, database_url, seed):
+    """
+    Tests that the time windows computed chunk by chunk by the worker processes are the same as the ones computed
+    serially, on random IssPositions and whatever the number of chunks, with 8 chunks the boundaries fall on
+    IssPositions
+    :param process_pool: the process pool fixture
+    :param database_url: the database URL fixture
+    :param seed: the seed of the random generator
+    """
+    rng = random.Random(seed)
+    # Runs of random length, so that windows cross the chunk boundaries
+    visibilities = []
+    while len(visibilities) < SIZE:
+        visibilities += [rng.choice(list(Visibility))] * rng.randint(1, 300)
+    db = sessionmaker(bind=create_engine(database_url))()
+    add_iss_positions(db, get_sample_iss_positions(visibilities[:SIZE]))
+    start_time, end_time = FIRST_TIMESTAMP, FIRST_TIMESTAMP + timedelta(seconds=20 * (SIZE - 1))
+    expected = get_daylight_time_windows_vectorized(*get_iss_position_columns(db, ('timestamp', 'daylight'),
+                                                                              start_time, end_time))
+    db.close()
+    for chunks in (1, 3, 8, 40):
+        assert get_parallel_time_windows(process_pool, database_url, start_time, end_time, chunks) == expected
+
+
+@pytest.mark.asyncio
+async def test_get_parallel_time_windows_async(process_pool, database_url):
+    """
+    Tests that get_parallel_time_windows_async provides the same time windows as get_parallel_time_windows
+    :param process_pool: the process pool fixture
+    :param database_url: the database URL fixture
+    """
+    db = sessionmaker(bind=create_engine(database_url))()
+    add_iss_positions(db, get_sample_iss_positions(([Visibility.DAYLIGHT] * 70 + [Visibility.ECLIPSED] * 50) * 5))
+    db.close()
+    start_time, end_time = FIRST_TIMESTAMP, FIRST_TIMESTAMP + timedelta(seconds=20 * 599)
+    expected = get_parallel_time_windows(process_pool, database_url, start_time, end_time, 1)
+
+    assert len(expected) == 5
+    assert await get_parallel_time_windows_async(process_pool, database_url, start_time, end_time, 4) == expected
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from challenge.utils.requests.host_rate_limiter import HostRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_acquire_spaces_requests_per_host():
+    """
+    Tests that the requests to the same host are spaced by the configured rate, while other hosts are not delayed
+    """
+    host_rate_limiter = HostRateLimiter(requests_per_second=20)
+    start = time.monotonic()
+    await asyncio.gather(*[host_rate_limiter.acquire(f'http://first/satellites/{i}') for i in range(5)])
+    assert time.monotonic() - start >= 4 / 20
+
+    start = time.monotonic()
+    await host_rate_limiter.acquire('http://second/satellites/1')
+    assert time.monotonic() - start < 1 / 20
+
+
+@pytest.mark.asyncio
+async def test_acquire_without_limit():
+    """
+    Tests that no request is delayed when the rate is not limited
+    """
+    host_rate_limiter = HostRateLimiter()
+    start = time.monotonic()
+    await asyncio.gather(*[host_rate_limiter.acquire('http://first/satellites/1') for _ in range(100)])
+    assert time.monotonic() - start < 0.05
+
+
+def test_get_spread_seconds():
+    """
+    Tests that get_spread_seconds is bounded by the host with the most URLs
+    """
+    urls = [f'http://first/satellites/{i}' for i in range(50)] + ['http://second/satellites/1']
+    assert HostRateLimiter(requests_per_second=5).get_spread_seconds(urls) == 49 / 5
+    assert HostRateLimiter().get_spread_seconds(urls) == 0
+    assert HostRateLimiter(requests_per_second=5).get_spread_seconds([]) == 0
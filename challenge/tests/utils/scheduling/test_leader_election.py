@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from challenge.utils.scheduling.leader_election import LeaderElection
+
+
+def _lead(lock_path: str, elected) -> None:
+    leader_election = LeaderElection(lock_path)
+    if leader_election.try_acquire():
+        elected.set()
+    time.sleep(60)
+
+
+def test_single_leader(tmp_path):
+    """
+    Tests that only one worker holds the leadership at a time, and that another one can take it once it is released
+    """
+    lock_path = str(tmp_path / 'leader.lock')
+    leader = LeaderElection(lock_path)
+    follower = LeaderElection(lock_path)
+    assert leader.try_acquire()
+    assert leader.try_acquire()
+    assert not follower.try_acquire()
+    assert not follower.is_leader
+
+    leader.release()
+    assert not leader.is_leader
+    assert follower.try_acquire()
+    assert not leader.try_acquire()
+    follower.release()
+
+
+@pytest.mark.asyncio
+async def test_failover_when_leader_dies(tmp_path):
+    """
+    Tests that a follower takes over within one retry interval once the leader's process is killed
+    """
+    lock_path = str(tmp_path / 'leader.lock')
+    context = multiprocessing.get_context('spawn')
+    elected = context.Event()
+    leader_process = context.Process(target=_lead, args=(lock_path, elected))
+    leader_process.start()
+    try:
+        assert elected.wait(10)
+        follower = LeaderElection(lock_path, retry_interval=0.05)
+        assert not follower.try_acquire()
+
+        waiting = asyncio.create_task(follower.wait_until_elected())
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+
+        os.kill(leader_process.pid, signal.SIGKILL)
+        await asyncio.wait_for(waiting, 1)
+        assert follower.is_leader
+        follower.release()
+    finally:
+        leader_process.kill()
+        leader_process.join()
+
+
+@pytest.mark.asyncio
+async def test_release_stops_waiting(tmp_path):
+    """
+    Tests that release() stops a follower waiting for the leadership
+    """
+    lock_path = str(tmp_path / 'leader.lock')
+    leader = LeaderElection(lock_path)
+    leader.try_acquire()
+    follower = LeaderElection(lock_path, retry_interval=10)
+    waiting = asyncio.create_task(follower.wait_until_elected())
+    await asyncio.sleep(0.05)
+    follower.release()
+    await asyncio.wait_for(waiting, 1)
+    assert not follower.is_leader
+    leader.release()
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from challenge.utils.scheduling.poll_scheduler import PollScheduler, SKIP, CATCH_UP
+
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when the scheduler sleeps or a job pretends to take some time
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+def get_job(clock: FakeClock, durations: list[float], runs: list[float], ticks: int):
+    async def job():
+        runs.append(clock.now - 1000)
+        clock.now += durations[(len(runs) - 1) % len(durations)]
+
+    return job, lambda: len(runs) >= ticks
+
+
+@pytest.mark.asyncio
+async def test_ticks_do_not_drift():
+    """
+    Tests that the runs stay aligned to the grid of deadlines whatever the duration of the job
+    """
+    clock = FakeClock()
+    runs = []
+    poll_scheduler = PollScheduler(20, clock=clock, sleep=clock.sleep)
+    job, should_stop = get_job(clock, [3, 7.5, 0.1], runs, 6)
+
+    await poll_scheduler.run(job, should_stop)
+
+    assert runs == [0, 20, 40, 60, 80, 100]
+    assert clock.sleeps == pytest.approx([17, 12.5, 19.9, 17, 12.5])
+    assert poll_scheduler.missed_ticks == 0
+
+
+@pytest.mark.asyncio
+async def test_skip_missed_ticks():
+    """
+    Tests that the ticks missed by a slow run are skipped, waiting for the next deadline of the grid
+    """
+    clock = FakeClock()
+    runs = []
+    poll_scheduler = PollScheduler(20, SKIP, clock=clock, sleep=clock.sleep)
+    job, should_stop = get_job(clock, [45, 1], runs, 4)
+
+    await poll_scheduler.run(job, should_stop)
+
+    assert runs == [0, 60, 80, 140]
+    assert poll_scheduler.missed_ticks == 4
+
+
+@pytest.mark.asyncio
+async def test_catch_up_missed_ticks():
+    """
+    Tests that the ticks missed by a slow run are caught up with one immediate run
+    """
+    clock = FakeClock()
+    runs = []
+    poll_scheduler = PollScheduler(20, CATCH_UP, clock=clock, sleep=clock.sleep)
+    job, should_stop = get_job(clock, [45, 1], runs, 4)
+
+    await poll_scheduler.run(job, should_stop)
+
+    assert runs == [0, 45, 60, 105]
+    assert poll_scheduler.missed_ticks == 4
+
+
+@pytest.mark.asyncio
+async def test_runs_do_not_overlap():
+    """
+    Tests that a run that is still in flight is awaited before the next one starts
+    """
+    in_flight = []
+    overlaps = []
+    runs = []
+
+    async def job():
+        overlaps.append(bool(in_flight))
+        in_flight.append(True)
+        await asyncio.sleep(0.03)
+        in_flight.pop()
+        runs.append(True)
+
+    poll_scheduler = PollScheduler(0.01)
+    await asyncio.wait_for(poll_scheduler.run(job, lambda: len(runs) >= 3), 1)
+    assert overlaps == [False, False, False]
+
+
+@pytest.mark.asyncio
+async def test_stop_and_cancel():
+    """
+    Tests that stop() interrupts the wait for the next deadline and that the schedule can be cancelled
+    """
+    runs = []
+
+    async def job():
+        runs.append(True)
+
+    poll_scheduler = PollScheduler(3600)
+    task = asyncio.create_task(poll_scheduler.run(job))
+    await asyncio.sleep(0.01)
+    poll_scheduler.stop()
+    await asyncio.wait_for(task, 1)
+    assert runs == [True]
+
+    task = asyncio.create_task(poll_scheduler.run(job))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert runs == [True, True]
+
+
+def test_unknown_policy():
+    """
+    Tests that an unknown missed ticks policy is rejected
+    """
+    with pytest.raises(ValueError):
+        PollScheduler(20, 'unknown')
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from challenge.database.models.visibility import Visibility
+from challenge.tests.database_fixtures import get_sample_iss_position
+from challenge.utils.streaming.position_hub import PositionHub, PositionHubFullError
+
+FIRST_TIMESTAMP = datetime(2023, 11, 10)
+
+
+def get_iss_position(seconds: int, satellite_id: int = 25544):
+    return get_sample_iss_position(Visibility.DAYLIGHT, FIRST_TIMESTAMP + timedelta(seconds=seconds), satellite_id)
+
+
+@pytest.mark.asyncio
+async def test_publish_to_all_subscribers():
+    """
+    Tests that every subscriber of a satellite receives the same serialized update, and that older IssPositions or
+    other satellites are not published to it
+    """
+    position_hub = PositionHub()
+    position_hub.publish(get_iss_position(0))
+    subscriptions = [position_hub.subscribe(25544) for _ in range(3)]
+    first_updates = [await subscription.__anext__() for subscription in subscriptions]
+    assert len({id(update) for update in first_updates}) == 1
+    assert first_updates[0].json == get_iss_position(0).model_dump_json()
+    assert first_updates[0].event == f'id: 1\nevent: position\ndata: {first_updates[0].json}\n\n'.encode()
+
+    next_updates = [asyncio.create_task(subscription.__anext__()) for subscription in subscriptions]
+    await asyncio.sleep(0)
+    position_hub.publish(get_iss_position(0))
+    position_hub.publish(get_iss_position(20, satellite_id=43013))
+    position_hub.publish(get_iss_position(20))
+    updates = await asyncio.gather(*next_updates)
+    assert {update.version for update in updates} == {2}
+    assert position_hub.get_stats() == {'subscribers': 3, 'max_subscribers': 10000, 'skipped_updates': 0}
+    for subscription in subscriptions:
+        await subscription.aclose()
+    assert position_hub.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_latest_update():
+    """
+    Tests that the updates published while a subscriber is busy are conflated into the latest one
+    """
+    position_hub = PositionHub()
+    position_hub.publish(get_iss_position(0))
+    subscription = position_hub.subscribe(25544)
+    assert (await subscription.__anext__()).version == 1
+    for seconds in (20, 40, 60):
+        position_hub.publish(get_iss_position(seconds))
+    update = await subscription.__anext__()
+    assert (update.version, update.timestamp) == (4, FIRST_TIMESTAMP + timedelta(seconds=60))
+    assert position_hub.skipped_updates == 2
+    await subscription.aclose()
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_cancellation():
+    """
+    Tests that a subscriber with a timeout gets None without updates, and that cancelling a waiting subscriber does
+    not affect the others
+    """
+    position_hub = PositionHub()
+    subscription = position_hub.subscribe(25544, timeout=0.01)
+    assert await subscription.__anext__() is None
+
+    cancelled = asyncio.create_task(position_hub.subscribe(25544).__anext__())
+    waiting = asyncio.create_task(position_hub.subscribe(25544).__anext__())
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.sleep(0.01)
+    position_hub.publish(get_iss_position(0))
+    assert (await asyncio.wait_for(waiting, 1)).version == 1
+    await subscription.aclose()
+
+
+@pytest.mark.asyncio
+async def test_max_subscribers():
+    """
+    Tests that the subscribers beyond the maximum are rejected until a subscriber leaves
+    """
+    position_hub = PositionHub(max_subscribers=1)
+    position_hub.publish(get_iss_position(0))
+    subscription = position_hub.subscribe(25544)
+    await subscription.__anext__()
+    assert position_hub.is_full()
+    with pytest.raises(PositionHubFullError):
+        await position_hub.subscribe(25544).__anext__()
+    await subscription.aclose()
+    assert (await position_hub.subscribe(25544).__anext__()).version == 1
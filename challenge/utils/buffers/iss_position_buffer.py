@@ -0,0 +1,154 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Union
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from challenge.database.iss_crud import get_iss_position_rows
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+
+logger = logging.getLogger(__name__)
+
+
+class IssPositionBuffer:
+    """
+    Bounded, array-backed ring buffer of the most recent IssPositions. Once warmed from the DB, it holds every
+    IssPosition more recent than covered_from, so that queries on that range can be answered without the DB
+    """
+    __slots__ = ['coverage_seconds', 'satellite_id', 'covered_from', '_timestamps', '_daylight', '_positions', '_start',
+                 '_size']
+
+    def __init__(self, coverage_seconds: int = 86400, wait_time: int = 20, satellite_id: int = None):
+        """
+        :param coverage_seconds: the time in seconds of recent IssPositions to keep
+        :param wait_time: the wait time between two IssPositions, used to size the buffer
+        :param satellite_id: the id of the satellite whose IssPositions are buffered, None for any satellite
+        """
+        capacity = -(-coverage_seconds // wait_time) + 1
+        self.coverage_seconds = coverage_seconds
+        self.satellite_id = satellite_id
+        self.covered_from = None
+        self._timestamps = np.empty(capacity, dtype='datetime64[us]')
+        self._daylight = np.zeros(capacity, dtype=np.bool_)
+        self._positions = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def warm(self, db: Session) -> None:
+        """
+        Fills the buffer with the IssPositions of the last coverage_seconds stored in the DB
+        :param db: the DB
+        """
+        end_time = datetime.now()
+        start_time = end_time - timedelta(seconds=self.coverage_seconds)
+        self._start = 0
+        self._size = 0
+        self.covered_from = start_time
+        columns = tuple(IssPosition.model_fields)
+        for row in get_iss_position_rows(db, columns, start_time, end_time, satellite_id=self.satellite_id):
+            self.append(IssPosition(**dict(zip(columns, row))))
+        logger.debug("Warmed the IssPosition buffer with %s positions", self._size)
+
+    def append(self, iss_position: IssPosition) -> None:
+        """
+        Appends the given IssPosition, evicting the oldest one if the buffer is full. IssPositions that are not more
+        recent than the latest one are ignored
+        :param iss_position: the IssPosition
+        """
+        if self.covered_from is None or (self._size and iss_position.timestamp <= self.latest().timestamp):
+            return
+        capacity = len(self._positions)
+        if self._size == capacity:
+            self.covered_from = self._positions[self._start].timestamp + timedelta(microseconds=1)
+            self._start = (self._start + 1) % capacity
+            self._size -= 1
+        i = (self._start + self._size) % capacity
+        self._timestamps[i] = iss_position.timestamp
+        self._daylight[i] = iss_position.visibility == Visibility.DAYLIGHT
+        self._positions[i] = iss_position
+        self._size += 1
+
+    def latest(self) -> Union[IssPosition, None]:
+        """
+        Provides the latest IssPosition in the buffer
+        :return: the latest IssPosition, None if the buffer is empty
+        """
+        if not self._size:
+            return None
+        return self._positions[(self._start + self._size - 1) % len(self._positions)]
+
+    def covers(self, start_time: datetime) -> bool:
+        """
+        Tells whether the buffer holds every IssPosition from the given start time on
+        :param start_time: the start time
+        :return: true if the buffer covers the range from start_time on
+        """
+        return self.covered_from is not None and start_time >= self.covered_from
+
+    def get_columns(self, start_time: datetime, end_time: datetime) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Provides the timestamp and daylight columns of the buffered IssPositions between the given start and end times
+        :param start_time: the start time
+        :param end_time: the end time
+        :return: a Tuple with the timestamps and the boolean daylight mask
+        """
+        timestamps = self._get_ordered(self._timestamps)
+        first = np.searchsorted(timestamps, np.datetime64(start_time, 'us'), side='left')
+        last = np.searchsorted(timestamps, np.datetime64(end_time, 'us'), side='right')
+        return timestamps[first:last], self._get_ordered(self._daylight)[first:last]
+
+    def _get_ordered(self, array: np.ndarray) -> np.ndarray:
+        end = self._start + self._size
+        if end <= len(array):
+            return array[self._start:end]
+        return np.concatenate((array[self._start:], array[:end - len(array)]))
+
+
+class IssPositionBuffers:
+    """
+    One IssPositionBuffer per tracked satellite
+    """
+    __slots__ = ['_buffers']
+
+    def __init__(self, satellite_ids: list[int], coverage_seconds: int = 86400, wait_time: int = 20):
+        """
+        :param satellite_ids: the ids of the tracked satellites
+        :param coverage_seconds: the time in seconds of recent IssPositions to keep for each satellite
+        :param wait_time: the wait time between two IssPositions, used to size the buffers
+        """
+        self._buffers = {satellite_id: IssPositionBuffer(coverage_seconds, wait_time, satellite_id)
+                         for satellite_id in satellite_ids}
+
+    def warm(self, db: Session) -> None:
+        """
+        Fills every buffer with the IssPositions of its satellite stored in the DB
+        :param db: the DB
+        """
+        for iss_position_buffer in self._buffers.values():
+            iss_position_buffer.warm(db)
+
+    def append(self, iss_position: IssPosition) -> None:
+        """
+        Appends the given IssPosition to the buffer of its satellite. IssPositions of untracked satellites are ignored
+        :param iss_position: the IssPosition
+        """
+        iss_position_buffer = self._buffers.get(iss_position.satellite_id)
+        if iss_position_buffer:
+            iss_position_buffer.append(iss_position)
+
+    def replace(self, iss_position_buffers: 'IssPositionBuffers') -> None:
+        """
+        Replaces the buffers with the ones of the given IssPositionBuffers, e.g. warmed on another thread
+        :param iss_position_buffers: the IssPositionBuffers
+        """
+        self._buffers = iss_position_buffers._buffers
+
+    def get(self, satellite_id: int) -> Union[IssPositionBuffer, None]:
+        """
+        Provides the buffer of the given satellite
+        :param satellite_id: the id of the satellite
+        :return: the IssPositionBuffer, None if the satellite is not tracked
+        """
+        return self._buffers.get(satellite_id)
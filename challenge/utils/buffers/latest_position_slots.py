@@ -0,0 +1,130 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Union
+
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+
+logger = logging.getLogger(__name__)
+
+_SEQUENCE = struct.Struct('<Q')
+# satellite_id, latitude, longitude, altitude, velocity, footprint, timestamp, daynum, solar_lat, solar_lon,
+# published_at, daylight, name, units
+_PAYLOAD = struct.Struct('<q10d?64s64s')
+# The name and units are stored whole, as cutting their UTF-8 encoding could split a character
+MAX_TEXT_BYTES = 64
+_EMPTY_PAYLOAD = _PAYLOAD.pack(-1, *[0.0] * 10, False, b'', b'')
+# Every slot starts on its own cache line
+SLOT_SIZE = -(-(_SEQUENCE.size + _PAYLOAD.size) // 64) * 64
+MAX_READ_ATTEMPTS = 100
+
+
+class LatestPositionSlots:
+    """
+    Latest IssPosition of every satellite, published by the ingesting worker into a memory-mapped file so that every
+    worker reads it without the DB. Each satellite has a fixed-layout slot guarded by a seqlock: the single writer makes
+    the sequence odd while it updates the slot and even again afterward, and a reader retries until it sees the same
+    even sequence before and after reading the slot
+    """
+    __slots__ = ['path', 'satellite_ids', 'max_age_seconds', '_indexes', '_mmap']
+
+    def __init__(self, path: str, satellite_ids: list[int], max_age_seconds: float = 60):
+        """
+        :param path: the path of the file mapped by every worker
+        :param satellite_ids: the ids of the satellites, in the same order in every worker
+        :param max_age_seconds: the time in seconds after which a published IssPosition is stale
+        """
+        self.path = path
+        self.satellite_ids = satellite_ids
+        self.max_age_seconds = max_age_seconds
+        self._indexes = {satellite_id: i for i, satellite_id in enumerate(satellite_ids)}
+        self._mmap = None
+
+    def publish(self, iss_position: IssPosition) -> None:
+        """
+        Publishes the given IssPosition if it is more recent than the published one. Only one process must publish
+        :param iss_position: the IssPosition
+        """
+        offset = self._get_offset(iss_position.satellite_id)
+        if offset is None:
+            return
+        timestamp = iss_position.timestamp.timestamp()
+        sequence, = _SEQUENCE.unpack_from(self._mmap, offset)
+        published_satellite_id, *values = _PAYLOAD.unpack_from(self._mmap, offset + _SEQUENCE.size)
+        if sequence and published_satellite_id == iss_position.satellite_id and values[5] >= timestamp:
+            return
+        name = iss_position.name.encode()
+        units = iss_position.units.encode()
+        _SEQUENCE.pack_into(self._mmap, offset, sequence + 1)
+        if len(name) > MAX_TEXT_BYTES or len(units) > MAX_TEXT_BYTES:
+            # The slot is emptied rather than left with an older IssPosition, so that the readers use the DB
+            logger.warning(f'The name or units of the IssPosition of satellite {iss_position.satellite_id} exceed '
+                           f'{MAX_TEXT_BYTES} bytes, so it is not published')
+            self._mmap[offset + _SEQUENCE.size:offset + _SEQUENCE.size + _PAYLOAD.size] = _EMPTY_PAYLOAD
+        else:
+            _PAYLOAD.pack_into(self._mmap, offset + _SEQUENCE.size, iss_position.satellite_id,
+                               iss_position.latitude, iss_position.longitude, iss_position.altitude,
+                               iss_position.velocity, iss_position.footprint, timestamp, iss_position.daynum,
+                               iss_position.solar_lat, iss_position.solar_lon, time.time(),
+                               iss_position.visibility == Visibility.DAYLIGHT, name, units)
+        _SEQUENCE.pack_into(self._mmap, offset, sequence + 2)
+
+    def read(self, satellite_id: int) -> Union[IssPosition, None]:
+        """
+        Provides the latest IssPosition published for the given satellite
+        :param satellite_id: the id of the satellite
+        :return: the IssPosition, None if the slot is empty, stale or kept busy by the writer
+        """
+        offset = self._get_offset(satellite_id)
+        if offset is None:
+            return None
+        for _ in range(MAX_READ_ATTEMPTS):
+            sequence, = _SEQUENCE.unpack_from(self._mmap, offset)
+            if sequence & 1:
+                continue
+            payload = _PAYLOAD.unpack_from(self._mmap, offset + _SEQUENCE.size)
+            if _SEQUENCE.unpack_from(self._mmap, offset)[0] == sequence:
+                break
+        else:
+            return None
+        (published_satellite_id, latitude, longitude, altitude, velocity, footprint, timestamp, daynum, solar_lat,
+         solar_lon, published_at, daylight, name, units) = payload
+        if not sequence or published_satellite_id != satellite_id or \
+                time.time() - published_at > self.max_age_seconds:
+            return None
+        return IssPosition(name=name.rstrip(b'\0').decode(), satellite_id=satellite_id, latitude=latitude,
+                           longitude=longitude, altitude=altitude, velocity=velocity,
+                           visibility=Visibility.DAYLIGHT if daylight else Visibility.ECLIPSED, footprint=footprint,
+                           timestamp=datetime.fromtimestamp(timestamp), daynum=daynum, solar_lat=solar_lat,
+                           solar_lon=solar_lon, units=units.rstrip(b'\0').decode())
+
+    def close(self) -> None:
+        """
+        Unmaps the file
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _get_offset(self, satellite_id: int) -> Union[int, None]:
+        i = self._indexes.get(satellite_id)
+        if i is None:
+            return None
+        if self._mmap is None:
+            self._map()
+        return i * SLOT_SIZE
+
+    def _map(self) -> None:
+        # Mapped on first use, so that the file is only created by the workers that serve or publish positions
+        size = SLOT_SIZE * max(len(self.satellite_ids), 1)
+        file_descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(file_descriptor).st_size < size:
+                os.ftruncate(file_descriptor, size)
+            self._mmap = mmap.mmap(file_descriptor, size)
+        finally:
+            os.close(file_descriptor)
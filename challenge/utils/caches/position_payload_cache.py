@@ -0,0 +1,67 @@
+import logging
+from typing import Union
+
+import orjson
+
+from challenge.database.models import models
+from challenge.database.schemas import IssPosition, IssPositionBrief
+
+logger = logging.getLogger(__name__)
+
+DETAILED_FIELDS = tuple(IssPosition.model_fields)
+BRIEF_FIELDS = tuple(IssPositionBrief.model_fields)
+
+
+def encode_position(iss_position: Union[IssPosition, models.IssPosition], detailed: bool) -> bytes:
+    """
+    Encodes the given IssPosition as the JSON body of /iss/position, without going through jsonable_encoder
+    :param iss_position: the IssPosition, either the schema or the model
+    :param detailed: if false, only the latitude, longitude and timestamp are encoded
+    :return: the JSON as bytes
+    """
+    fields = DETAILED_FIELDS if detailed else BRIEF_FIELDS
+    return orjson.dumps({field: getattr(iss_position, field) for field in fields})
+
+
+class PositionPayloadCache:
+    """
+    Encoded JSON bodies of the latest IssPosition of every satellite, both brief and detailed. An entry is reused as
+    long as the latest IssPosition has the same timestamp, so it is encoded once per insert whatever its source is:
+    the buffer, the shared slots or the DB
+    """
+    __slots__ = ['hits', 'misses', '_entries']
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def get(self, iss_position: Union[IssPosition, models.IssPosition], detailed: bool) -> bytes:
+        """
+        Provides the encoded JSON body of the given IssPosition, encoding it if it is not cached yet
+        :param iss_position: the latest IssPosition of its satellite
+        :param detailed: if false, only the latitude, longitude and timestamp are encoded
+        :return: the JSON as bytes
+        """
+        key = (iss_position.satellite_id, detailed)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == iss_position.timestamp:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        payload = encode_position(iss_position, detailed)
+        self._entries[key] = (iss_position.timestamp, payload)
+        return payload
+
+    def clear(self) -> None:
+        """
+        Removes all the entries
+        """
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Provides the counters of the cache
+        :return: a dict with the hits, misses and entries
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
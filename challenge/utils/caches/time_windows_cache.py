@@ -0,0 +1,124 @@
+import logging
+import math
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Union
+
+from challenge.database.iss_crud import get_time_range
+from challenge.database.schemas import IssPosition
+
+logger = logging.getLogger(__name__)
+
+
+class TimeWindowsCache:
+    """
+    LRU cache of the time windows served by /iss/sun, bounded by a memory budget in bytes. Each entry expires after
+    ttl_seconds and is invalidated as soon as an IssPosition of its satellite is added within its range
+    """
+    __slots__ = ['max_bytes', 'ttl_seconds', 'quantum_seconds', 'size_bytes', 'hits', 'misses', 'evictions',
+                 'invalidations', '_entries']
+
+    def __init__(self, max_bytes: int = 8388608, ttl_seconds: float = 3600, quantum_seconds: int = 20):
+        """
+        :param max_bytes: the memory budget in bytes of the cached time windows
+        :param ttl_seconds: the time in seconds an entry stays cached
+        :param quantum_seconds: the granularity in seconds of the ranges without an end time, usually the wait time
+        between two IssPositions
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.quantum_seconds = quantum_seconds
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+
+    def get_key(self, satellite_id: int, start_time: datetime = None, end_time: datetime = None,
+                timedelta_seconds: int = 86400) -> tuple[int, datetime, datetime]:
+        """
+        Normalizes the given range into a cache key. Without an end time, the range ends at now time rounded up to the
+        quantum, so that the requests of the same quantum share the entry
+        :param satellite_id: the id of the satellite
+        :param start_time: the start time. If None, it'll be the end time - the timedelta_seconds
+        :param end_time: the end time. If None, it'll be now time rounded up to the quantum
+        :param timedelta_seconds: the timedelta to be used to calculate the start time if it is None
+        :return: a Tuple with the satellite id and the normalized start and end times
+        """
+        if not end_time:
+            now = datetime.now().timestamp()
+            end_time = datetime.fromtimestamp(math.ceil(now / self.quantum_seconds) * self.quantum_seconds)
+        return (satellite_id, *get_time_range(start_time, end_time, timedelta_seconds))
+
+    def get(self, key: tuple[int, datetime, datetime]) -> Union[list[dict], None]:
+        """
+        Provides the time windows cached with the given key
+        :param key: the key provided by get_key
+        :return: the time windows, None if they are not cached or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[2] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple[int, datetime, datetime], time_windows: list[dict]) -> None:
+        """
+        Caches the given time windows, evicting the least recently used entries beyond the memory budget
+        :param key: the key provided by get_key
+        :param time_windows: the time windows
+        """
+        size_bytes = self._get_size_bytes(time_windows)
+        if size_bytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time_windows, size_bytes, time.monotonic() + self.ttl_seconds)
+        self.size_bytes += size_bytes
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, iss_position: IssPosition) -> None:
+        """
+        Removes the entries whose range covers the given IssPosition, as their time windows may have changed
+        :param iss_position: the IssPosition that has just been added
+        """
+        stale_keys = [key for key in self._entries if key[0] == iss_position.satellite_id and
+                      key[1] <= iss_position.timestamp <= key[2]]
+        for key in stale_keys:
+            self._remove(key)
+        self.invalidations += len(stale_keys)
+
+    def clear(self) -> None:
+        """
+        Removes all the entries
+        """
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Provides the counters of the cache
+        :return: a dict with the hits, misses, evictions, invalidations, entries and size in bytes
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self._entries), 'size_bytes': self.size_bytes,
+                'max_bytes': self.max_bytes}
+
+    def _remove(self, key: tuple[int, datetime, datetime]) -> None:
+        _, size_bytes, _ = self._entries.pop(key)
+        self.size_bytes -= size_bytes
+
+    @staticmethod
+    def _get_size_bytes(time_windows: list[dict]) -> int:
+        return sys.getsizeof(time_windows) + sum(
+            sys.getsizeof(time_window) + sum(sys.getsizeof(value) for value in time_window.values())
+            for time_window in time_windows)
@@ -10,12 +10,57 @@ class ConfigUtils:
     _outbound_requests_section = 'OutboundRequestConfig'
     _inbound_requests_section = 'InboundRequestConfig'
     _fast_api_section = 'FastAPIConfig'
+    _database_section = 'DatabaseConfig'
+    _retention_section = 'RetentionConfig'
+    _backfill_section = 'BackfillConfig'
+    _leader_election_section = 'LeaderElectionConfig'
     _user_agent_key = 'User-Agent'
     _wait_time_key = 'wait_time_seconds'
-    _iss_position_url_key = 'iss_position_url'
+    _satellite_ids_key = 'satellite_ids'
+    _satellite_url_template_key = 'satellite_url_template'
+    _satellite_positions_url_template_key = 'satellite_positions_url_template'
+    _max_concurrent_requests_key = 'max_concurrent_requests'
+    _host_requests_per_second_key = 'host_requests_per_second'
     _iss_router_rate_limit = 'iss_router_rate_limit'
     _limits_enabled = 'limits_enabled'
+    _limits_storage_uri = 'limits_storage_uri'
+    _limits_strategy = 'limits_strategy'
+    _position_buffer_seconds = 'position_buffer_seconds'
+    _sun_cache_enabled = 'sun_cache_enabled'
+    _sun_cache_max_bytes = 'sun_cache_max_bytes'
+    _sun_cache_ttl_seconds = 'sun_cache_ttl_seconds'
+    _latest_position_slots_enabled = 'latest_position_slots_enabled'
+    _latest_position_max_age_seconds = 'latest_position_max_age_seconds'
+    _position_stream_max_subscribers = 'position_stream_max_subscribers'
+    _position_stream_timeout_seconds = 'position_stream_timeout_seconds'
+    _positions_page_size = 'positions_page_size'
+    _positions_max_page_size = 'positions_max_page_size'
+    _positions_max_points = 'positions_max_points'
+    _sun_parallel_min_rows = 'sun_parallel_min_rows'
+    _sun_parallel_processes = 'sun_parallel_processes'
     _default_positions_time_window_seconds = 'default_positions_time_window_seconds'
+    _daylight_windows_table_enabled = 'daylight_windows_table_enabled'
+    _spatial_index_enabled = 'spatial_index_enabled'
+    _write_batch_size = 'write_batch_size'
+    _write_flush_interval_seconds = 'write_flush_interval_seconds'
+    _write_max_pending = 'write_max_pending'
+    _db_path = 'db_path'
+    _storage_profile_enabled = 'storage_profile_enabled'
+    _journal_mode = 'journal_mode'
+    _synchronous = 'synchronous'
+    _cache_size = 'cache_size'
+    _mmap_size = 'mmap_size'
+    _reader_pool_size = 'reader_pool_size'
+    _retention_enabled = 'retention_enabled'
+    _rollup_tiers = 'rollup_tiers'
+    _retention_max_age_days = 'retention_max_age_days'
+    _retention_batch_size = 'retention_batch_size'
+    _retention_interval_seconds = 'retention_interval_seconds'
+    _backfill_enabled = 'backfill_enabled'
+    _backfill_batch_size = 'backfill_batch_size'
+    _backfill_max_age_seconds = 'backfill_max_age_seconds'
+    _leader_election_enabled = 'leader_election_enabled'
+    _leader_lock_path = 'leader_lock_path'
 
     def __init__(self, config_path: str = './challenge/config.ini'):
         self._config = ConfigParser()
@@ -41,16 +86,62 @@ class ConfigUtils:
         except (NoSectionError, NoOptionError):
             return "Mozilla/5.0"
 
-    def get_iss_position_url(self) -> str:
+    def get_satellite_ids(self) -> list[int]:
         """
-        Provides the URL to be used for getting the ISS position
-        :return: the URL as string
+        Provides the NORAD ids of the satellites to track, configured as a comma separated list
+        :return: the satellite ids as a list of int
+        """
+        try:
+            satellite_ids = self._config.get(section=ConfigUtils._outbound_requests_section,
+                                             option=ConfigUtils._satellite_ids_key)
+            return [int(satellite_id) for satellite_id in satellite_ids.split(',') if satellite_id.strip()] or [25544]
+        except (NoSectionError, NoOptionError):
+            return [25544]
+
+    def get_satellite_url_template(self) -> str:
+        """
+        Provides the URL template to be used for getting the position of a satellite, with a {satellite_id} field
+        :return: the URL template as string
+        """
+        try:
+            return self._config.get(section=ConfigUtils._outbound_requests_section,
+                                    option=ConfigUtils._satellite_url_template_key)
+        except (NoSectionError, NoOptionError):
+            return "https://api.wheretheiss.at/v1/satellites/{satellite_id}"
+
+    def get_satellite_positions_url_template(self) -> str:
+        """
+        Provides the URL template to be used for getting the positions of a satellite at given times, with a
+        {satellite_id} and a {timestamps} field
+        :return: the URL template as string
         """
         try:
             return self._config.get(section=ConfigUtils._outbound_requests_section,
-                                    option=ConfigUtils._iss_position_url_key)
+                                    option=ConfigUtils._satellite_positions_url_template_key)
+        except (NoSectionError, NoOptionError):
+            return "https://api.wheretheiss.at/v1/satellites/{satellite_id}/positions?timestamps={timestamps}"
+
+    def get_max_concurrent_requests(self) -> int:
+        """
+        Provides the maximum number of concurrent requests to the satellite positions API
+        :return: the max_concurrent_requests as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._outbound_requests_section,
+                                       option=ConfigUtils._max_concurrent_requests_key)
+        except (NoSectionError, NoOptionError):
+            return 10
+
+    def get_host_requests_per_second(self) -> float:
+        """
+        Provides the maximum rate of requests to the same host, 0 for no limit
+        :return: the host_requests_per_second as float
+        """
+        try:
+            return self._config.getfloat(section=ConfigUtils._outbound_requests_section,
+                                         option=ConfigUtils._host_requests_per_second_key)
         except (NoSectionError, NoOptionError):
-            return 'https://api.wheretheiss.at/v1/satellites/25544'
+            return 0
 
     def get_iss_router_rate_limit(self) -> str:
         """
@@ -73,3 +164,404 @@ class ConfigUtils:
                                            option=ConfigUtils._limits_enabled)
         except (NoSectionError, NoOptionError):
             return False
+
+    def get_limits_storage_uri(self) -> str:
+        """
+        Provides the URI of the storage of the rate limits
+        :return: the limits_storage_uri, memory:// if it is empty
+        """
+        try:
+            return self._config.get(section=ConfigUtils._fast_api_section,
+                                    option=ConfigUtils._limits_storage_uri) or 'memory://'
+        except (NoSectionError, NoOptionError):
+            return 'memory://'
+
+    def get_limits_strategy(self) -> str:
+        """
+        Provides the strategy of the rate limits
+        :return: the limits_strategy, fixed-window if it is empty
+        """
+        try:
+            return self._config.get(section=ConfigUtils._fast_api_section,
+                                    option=ConfigUtils._limits_strategy) or 'fixed-window'
+        except (NoSectionError, NoOptionError):
+            return 'fixed-window'
+
+    def get_position_buffer_seconds(self) -> int:
+        """
+        Provides the time in seconds of recent IssPositions kept in memory
+        :return: the position_buffer_seconds as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section,
+                                       option=ConfigUtils._position_buffer_seconds)
+        except (NoSectionError, NoOptionError):
+            return 86400
+
+    def get_sun_cache_enabled(self) -> bool:
+        """
+        Provides the boolean value for sun_cache_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._fast_api_section,
+                                           option=ConfigUtils._sun_cache_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_sun_cache_max_bytes(self) -> int:
+        """
+        Provides the memory budget in bytes of the /iss/sun cache
+        :return: the sun_cache_max_bytes as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section, option=ConfigUtils._sun_cache_max_bytes)
+        except (NoSectionError, NoOptionError):
+            return 8388608
+
+    def get_sun_cache_ttl(self) -> int:
+        """
+        Provides the time in seconds an /iss/sun response stays cached
+        :return: the sun_cache_ttl_seconds as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section,
+                                       option=ConfigUtils._sun_cache_ttl_seconds)
+        except (NoSectionError, NoOptionError):
+            return 3600
+
+    def get_latest_position_slots_enabled(self) -> bool:
+        """
+        Provides the boolean value for latest_position_slots_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._fast_api_section,
+                                           option=ConfigUtils._latest_position_slots_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_latest_position_max_age(self) -> float:
+        """
+        Provides the time in seconds after which the latest IssPosition shared by the leader is stale
+        :return: the latest_position_max_age_seconds as float
+        """
+        try:
+            return self._config.getfloat(section=ConfigUtils._fast_api_section,
+                                         option=ConfigUtils._latest_position_max_age_seconds)
+        except (NoSectionError, NoOptionError):
+            return 60
+
+    def get_position_stream_max_subscribers(self) -> int:
+        """
+        Provides the maximum number of clients streaming the IssPositions per worker
+        :return: the position_stream_max_subscribers as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section,
+                                       option=ConfigUtils._position_stream_max_subscribers)
+        except (NoSectionError, NoOptionError):
+            return 10000
+
+    def get_position_stream_timeout(self) -> float:
+        """
+        Provides the time in seconds between two keepalives of the Server-Sent Events, also used as the timeout of a
+        WebSocket send
+        :return: the position_stream_timeout_seconds as float
+        """
+        try:
+            return self._config.getfloat(section=ConfigUtils._fast_api_section,
+                                         option=ConfigUtils._position_stream_timeout_seconds)
+        except (NoSectionError, NoOptionError):
+            return 15
+
+    def get_positions_page_size(self) -> int:
+        """
+        Provides the number of IssPositions per page of /iss/positions when the client does not ask for one
+        :return: the positions_page_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section, option=ConfigUtils._positions_page_size)
+        except (NoSectionError, NoOptionError):
+            return 100
+
+    def get_positions_max_page_size(self) -> int:
+        """
+        Provides the maximum number of IssPositions per page of /iss/positions
+        :return: the positions_max_page_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section,
+                                       option=ConfigUtils._positions_max_page_size)
+        except (NoSectionError, NoOptionError):
+            return 1000
+
+    def get_positions_max_points(self) -> int:
+        """
+        Provides the maximum number of IssPositions a /iss/positions range is downsampled to
+        :return: the positions_max_points as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section, option=ConfigUtils._positions_max_points)
+        except (NoSectionError, NoOptionError):
+            return 10000
+
+    def get_sun_parallel_min_rows(self) -> int:
+        """
+        Provides the number of IssPositions from which a /iss/sun range is computed by the process pool
+        :return: the sun_parallel_min_rows as int, 0 if the process pool is disabled
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section, option=ConfigUtils._sun_parallel_min_rows)
+        except (NoSectionError, NoOptionError):
+            return 500000
+
+    def get_sun_parallel_processes(self) -> int:
+        """
+        Provides the number of processes of the /iss/sun process pool
+        :return: the sun_parallel_processes as int, 0 for one per CPU
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._fast_api_section,
+                                       option=ConfigUtils._sun_parallel_processes)
+        except (NoSectionError, NoOptionError):
+            return 0
+
+    def get_daylight_windows_table_enabled(self) -> bool:
+        """
+        Provides the boolean value for daylight_windows_table_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._database_section,
+                                           option=ConfigUtils._daylight_windows_table_enabled)
+        except (NoSectionError, NoOptionError):
+            return True
+
+    def get_spatial_index_enabled(self) -> bool:
+        """
+        Provides the boolean value for spatial_index_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._database_section,
+                                           option=ConfigUtils._spatial_index_enabled)
+        except (NoSectionError, NoOptionError):
+            return True
+
+    def get_write_batch_size(self) -> int:
+        """
+        Provides the number of pending IssPositions that triggers a write to the DB
+        :return: the write_batch_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._database_section,
+                                       option=ConfigUtils._write_batch_size)
+        except (NoSectionError, NoOptionError):
+            return 50
+
+    def get_write_flush_interval(self) -> float:
+        """
+        Provides the maximum time in seconds an IssPosition waits before being written to the DB
+        :return: the write_flush_interval_seconds as float
+        """
+        try:
+            return self._config.getfloat(section=ConfigUtils._database_section,
+                                         option=ConfigUtils._write_flush_interval_seconds)
+        except (NoSectionError, NoOptionError):
+            return 0
+
+    def get_write_max_pending(self) -> int:
+        """
+        Provides the maximum number of IssPositions waiting to be written to the DB, the oldest ones being dropped
+        beyond it while the writes fail
+        :return: the write_max_pending as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._database_section,
+                                       option=ConfigUtils._write_max_pending)
+        except (NoSectionError, NoOptionError):
+            return 10000
+
+    def get_db_path(self) -> str:
+        """
+        Provides the path of the SQLite DB file
+        :return: the path as string, None if not configured
+        """
+        try:
+            return self._config.get(section=ConfigUtils._database_section, option=ConfigUtils._db_path) or None
+        except (NoSectionError, NoOptionError):
+            return None
+
+    def get_storage_profile_enabled(self) -> bool:
+        """
+        Provides the boolean value for storage_profile_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._database_section,
+                                           option=ConfigUtils._storage_profile_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_journal_mode(self) -> str:
+        """
+        Provides the SQLite journal_mode of the storage profile
+        :return: the journal_mode as string
+        """
+        try:
+            return self._config.get(section=ConfigUtils._database_section, option=ConfigUtils._journal_mode)
+        except (NoSectionError, NoOptionError):
+            return 'WAL'
+
+    def get_synchronous(self) -> str:
+        """
+        Provides the SQLite synchronous setting of the storage profile
+        :return: the synchronous setting as string
+        """
+        try:
+            return self._config.get(section=ConfigUtils._database_section, option=ConfigUtils._synchronous)
+        except (NoSectionError, NoOptionError):
+            return 'NORMAL'
+
+    def get_cache_size(self) -> int:
+        """
+        Provides the SQLite cache_size of the storage profile: pages if positive, KiB if negative
+        :return: the cache_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._database_section, option=ConfigUtils._cache_size)
+        except (NoSectionError, NoOptionError):
+            return -65536
+
+    def get_mmap_size(self) -> int:
+        """
+        Provides the SQLite mmap_size in bytes of the storage profile
+        :return: the mmap_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._database_section, option=ConfigUtils._mmap_size)
+        except (NoSectionError, NoOptionError):
+            return 268435456
+
+    def get_reader_pool_size(self) -> int:
+        """
+        Provides the number of pooled read-only connections
+        :return: the reader_pool_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._database_section, option=ConfigUtils._reader_pool_size)
+        except (NoSectionError, NoOptionError):
+            return 5
+
+    def get_retention_enabled(self) -> bool:
+        """
+        Provides the boolean value for retention_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._retention_section,
+                                           option=ConfigUtils._retention_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_rollup_tiers(self) -> list[tuple[int, int]]:
+        """
+        Provides the rollup tiers, configured as comma separated age_days:resolution_seconds pairs, e.g. 7:300,90:3600
+        :return: a list of (age in seconds, resolution in seconds) tuples, sorted by age
+        """
+        try:
+            rollup_tiers = self._config.get(section=ConfigUtils._retention_section, option=ConfigUtils._rollup_tiers)
+        except (NoSectionError, NoOptionError):
+            rollup_tiers = '7:300,90:3600'
+        tiers = []
+        for rollup_tier in filter(None, (tier.strip() for tier in rollup_tiers.split(','))):
+            age_days, resolution_seconds = rollup_tier.split(':')
+            tiers.append((int(age_days) * 86400, int(resolution_seconds)))
+        return sorted(tiers)
+
+    def get_retention_max_age(self) -> int:
+        """
+        Provides the age after which the IssPositions and their rollups are deleted, configured in days
+        :return: the retention_max_age_days in seconds, 0 if they are kept forever
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._retention_section,
+                                       option=ConfigUtils._retention_max_age_days) * 86400
+        except (NoSectionError, NoOptionError):
+            return 365 * 86400
+
+    def get_retention_batch_size(self) -> int:
+        """
+        Provides the number of IssPositions compacted in one transaction
+        :return: the retention_batch_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._retention_section,
+                                       option=ConfigUtils._retention_batch_size)
+        except (NoSectionError, NoOptionError):
+            return 5000
+
+    def get_retention_interval(self) -> int:
+        """
+        Provides the time in seconds between two runs of the retention job
+        :return: the retention_interval_seconds as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._retention_section,
+                                       option=ConfigUtils._retention_interval_seconds)
+        except (NoSectionError, NoOptionError):
+            return 3600
+
+    def get_backfill_enabled(self) -> bool:
+        """
+        Provides the boolean value for backfill_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._backfill_section, option=ConfigUtils._backfill_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_backfill_batch_size(self) -> int:
+        """
+        Provides the number of missing timestamps requested at once
+        :return: the backfill_batch_size as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._backfill_section, option=ConfigUtils._backfill_batch_size)
+        except (NoSectionError, NoOptionError):
+            return 10
+
+    def get_backfill_max_age(self) -> int:
+        """
+        Provides the maximum age in seconds of the gaps to backfill
+        :return: the backfill_max_age_seconds as int
+        """
+        try:
+            return self._config.getint(section=ConfigUtils._backfill_section,
+                                       option=ConfigUtils._backfill_max_age_seconds)
+        except (NoSectionError, NoOptionError):
+            return 604800
+
+    def get_leader_election_enabled(self) -> bool:
+        """
+        Provides the boolean value for leader_election_enabled
+        :return: true or false
+        """
+        try:
+            return self._config.getboolean(section=ConfigUtils._leader_election_section,
+                                           option=ConfigUtils._leader_election_enabled)
+        except (NoSectionError, NoOptionError):
+            return False
+
+    def get_leader_lock_path(self) -> str:
+        """
+        Provides the path of the file locked by the worker that ingests the IssPositions
+        :return: the leader_lock_path, None if it is empty
+        """
+        try:
+            return self._config.get(section=ConfigUtils._leader_election_section,
+                                    option=ConfigUtils._leader_lock_path) or None
+        except (NoSectionError, NoOptionError):
+            return None
@@ -1,11 +1,36 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from challenge.database.database import engine, SessionLocal
+from challenge.database.database import engine, SessionLocal, SQLALCHEMY_DATABASE_PATH
 from challenge.database.models import models
+from challenge.utils.buffers.iss_position_buffer import IssPositionBuffers
+from challenge.utils.buffers.latest_position_slots import LatestPositionSlots
+from challenge.utils.caches.position_payload_cache import PositionPayloadCache
+from challenge.utils.caches.time_windows_cache import TimeWindowsCache
 from challenge.utils.config.config_utils import ConfigUtils
+from challenge.utils.fastapi.shared_memory_storage import SharedMemoryStorage
+from challenge.utils.indexes.daylight_interval_index import DaylightIntervalIndexes
+from challenge.utils.streaming.position_hub import PositionHub
+
+
+def get_limits_storage_uri(config_utils: ConfigUtils) -> str:
+    """
+    Provides the URI of the storage of the rate limits. A shm URI without a path shares the limits through the DB path
+    followed by .limits
+    :param config_utils: the ConfigUtils object
+    :return: the URI
+    """
+    limits_storage_uri = config_utils.get_limits_storage_uri()
+    if limits_storage_uri in (f'{scheme}://' for scheme in SharedMemoryStorage.STORAGE_SCHEME):
+        return f'{limits_storage_uri}{SQLALCHEMY_DATABASE_PATH}.limits'
+    return limits_storage_uri
+
 
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=get_limits_storage_uri(ConfigUtils()),
+                  strategy=ConfigUtils().get_limits_strategy())
 
 
 def set_up_db() -> None:
@@ -29,3 +54,43 @@ def get_config_utils() -> ConfigUtils:
     :return: a ConfigUtils instance
     """
     return ConfigUtils()
+
+
+def create_iss_position_buffers() -> IssPositionBuffers:
+    """
+    Creates empty IssPosition buffers for the configured satellites
+    :return: the IssPositionBuffers
+    """
+    return IssPositionBuffers(get_config_utils().get_satellite_ids(), get_config_utils().get_position_buffer_seconds(),
+                              get_config_utils().get_wait_time())
+
+
+def create_daylight_interval_indexes() -> DaylightIntervalIndexes:
+    """
+    Creates empty daylight interval indexes for the configured satellites
+    :return: the DaylightIntervalIndexes
+    """
+    return DaylightIntervalIndexes(get_config_utils().get_satellite_ids())
+
+
+iss_position_buffers = create_iss_position_buffers()
+daylight_interval_indexes = create_daylight_interval_indexes()
+# None when the /iss/sun cache is disabled
+time_windows_cache = TimeWindowsCache(get_config_utils().get_sun_cache_max_bytes(),
+                                      get_config_utils().get_sun_cache_ttl(),
+                                      get_config_utils().get_wait_time()) \
+    if get_config_utils().get_sun_cache_enabled() else None
+# None when the latest IssPositions are not shared between the workers
+latest_position_slots = LatestPositionSlots(f'{SQLALCHEMY_DATABASE_PATH}.latest',
+                                            get_config_utils().get_satellite_ids(),
+                                            get_config_utils().get_latest_position_max_age()) \
+    if get_config_utils().get_latest_position_slots_enabled() else None
+position_payload_cache = PositionPayloadCache()
+position_hub = PositionHub(get_config_utils().get_position_stream_max_subscribers())
+# None when every /iss/sun range is computed in the worker, which is also the case when the ranges are read from the
+# daylight_windows table. The processes are spawned, as forking a worker would copy its threads and DB connections,
+# and only when the first chunks are submitted
+sun_process_pool = ProcessPoolExecutor(max_workers=get_config_utils().get_sun_parallel_processes() or None,
+                                       mp_context=multiprocessing.get_context('spawn')) \
+    if get_config_utils().get_sun_parallel_min_rows() and not get_config_utils().get_daylight_windows_table_enabled() \
+    else None
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Union
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+try:
+    import fcntl
+except ImportError:
+    # Without advisory locks, e.g. on Windows, the counters are only consistent within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# key hash, window index, expiry, current window count, previous window count
+_SLOT = struct.Struct('<QqIII4x')
+MAX_PROBES = 8
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    """
+    Storage of the limits library shared by the workers of a host through a memory-mapped file, so that a rate limit is
+    enforced once across all of them. The file is a fixed-size open addressing table of counters, each one holding the
+    counts of the current and previous windows aligned on the epoch, so that every hit costs one lock and a bounded
+    number of slot reads. It supports the fixed-window and sliding-window-counter strategies.
+
+    The URI is shm:///path/of/the/file?slots=4096
+    """
+    STORAGE_SCHEME = ['shm']
+    __slots__ = ['path', 'slots', '_mmap', '_file_descriptor', '_thread_lock']
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        """
+        :param uri: the shm URI with the path of the file and, optionally, the number of slots
+        :param wrap_exceptions: whether to wrap the storage exceptions in a StorageError
+        """
+        super().__init__(uri, wrap_exceptions, **options)
+        parsed_uri = urllib.parse.urlparse(uri)
+        self.path = parsed_uri.path
+        self.slots = int(urllib.parse.parse_qs(parsed_uri.query).get('slots', [4096])[0])
+        self._file_descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = self.slots * _SLOT.size
+        if os.fstat(self._file_descriptor).st_size < size:
+            os.ftruncate(self._file_descriptor, size)
+        self._mmap = mmap.mmap(self._file_descriptor, size)
+        # The file lock excludes the other processes, the thread lock the other threads of this one
+        self._thread_lock = threading.Lock()
+
+    @property
+    def base_exceptions(self) -> Union[type[Exception], tuple[type[Exception], ...]]:
+        return OSError
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._lock():
+            key_hash = self._hash(key)
+            offset, window, current_count, _ = self._get_counts(key_hash, expiry, time.time())
+            current_count += amount
+            _SLOT.pack_into(self._mmap, offset, key_hash, window, expiry, current_count, 0)
+            return current_count
+
+    def get(self, key: str) -> int:
+        with self._lock():
+            offset = self._find(self._hash(key))
+            if offset is None:
+                return 0
+            _, window, expiry, current_count, _ = _SLOT.unpack_from(self._mmap, offset)
+            return current_count if window == math.floor(time.time() / expiry) else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock():
+            offset = self._find(self._hash(key))
+            if offset is None:
+                return time.time()
+            _, window, expiry, _, _ = _SLOT.unpack_from(self._mmap, offset)
+            return (window + 1) * expiry
+
+    def check(self) -> bool:
+        return not self._mmap.closed
+
+    def reset(self) -> int:
+        with self._lock():
+            self._mmap[:] = bytes(len(self._mmap))
+        return self.slots
+
+    def clear(self, key: str) -> None:
+        with self._lock():
+            offset = self._find(self._hash(key))
+            if offset is not None:
+                _SLOT.pack_into(self._mmap, offset, 0, 0, 0, 0, 0)
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self._lock():
+            now = time.time()
+            key_hash = self._hash(key)
+            offset, window, current_count, previous_count = self._get_counts(key_hash, expiry, now)
+            # The previous window weighs as much as it still overlaps the sliding window ending now
+            previous_weight = 1 - (now - window * expiry) / expiry
+            if previous_count * previous_weight + current_count + amount > limit:
+                return False
+            _SLOT.pack_into(self._mmap, offset, key_hash, window, expiry, current_count + amount, previous_count)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        with self._lock():
+            now = time.time()
+            _, window, current_count, previous_count = self._get_counts(self._hash(key), expiry, now)
+            current_window_ttl = (window + 1) * expiry - now
+            return previous_count, current_window_ttl, current_count, current_window_ttl + expiry
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the file
+        """
+        self._mmap.close()
+        os.close(self._file_descriptor)
+
+    @contextmanager
+    def _lock(self):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._file_descriptor, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file_descriptor, fcntl.LOCK_UN)
+
+    def _get_counts(self, key_hash: int, expiry: int, now: float) -> tuple[int, int, int, int]:
+        # Provides the offset of the slot of the key along with its counts rolled to the window of now
+        window = math.floor(now / expiry)
+        offset = self._find(key_hash, now)
+        stored_hash, stored_window, _, current_count, previous_count = _SLOT.unpack_from(self._mmap, offset)
+        if stored_hash != key_hash or stored_window < window - 1:
+            return offset, window, 0, 0
+        if stored_window == window - 1:
+            return offset, window, 0, current_count
+        return offset, window, current_count, previous_count
+
+    def _find(self, key_hash: int, now: float = None) -> Union[int, None]:
+        # Linear probing over at most MAX_PROBES slots. Without now, it only looks the key up; with now, it also
+        # provides the slot to claim for a new key: the first empty or expired one, or the one with the oldest window
+        first = key_hash % self.slots
+        candidate_offset, candidate_window = None, math.inf
+        for i in range(MAX_PROBES):
+            offset = (first + i) % self.slots * _SLOT.size
+            stored_hash, stored_window, stored_expiry, _, _ = _SLOT.unpack_from(self._mmap, offset)
+            if stored_hash == key_hash:
+                return offset
+            if now is None:
+                continue
+            if not stored_hash or stored_window < math.floor(now / stored_expiry) - 1:
+                stored_window = -math.inf
+            if stored_window < candidate_window:
+                candidate_offset, candidate_window = offset, stored_window
+        return candidate_offset
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks the empty slots
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
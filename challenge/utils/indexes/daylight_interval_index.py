@@ -0,0 +1,207 @@
+import logging
+from bisect import bisect_right
+from datetime import datetime
+from typing import Union
+
+from sqlalchemy.orm import Session
+
+from challenge.database.daylight_windows_crud import get_daylight_windows
+from challenge.database.iss_crud import get_iss_position_columns, get_timestamp_range
+from challenge.database.models.visibility import Visibility
+from challenge.database.schemas import IssPosition
+from challenge.utils.operations.time_windows_utils import get_daylight_time_windows_vectorized
+
+logger = logging.getLogger(__name__)
+
+
+class DaylightIntervalIndex:
+    """
+    Sorted in-memory index of the daylight time windows of a satellite, along with the prefix sums of their durations,
+    so that the visibility at a point in time and the daylight seconds of any range are answered with a bisection.
+    Once warmed from the DB, it is kept up to date with every added IssPosition. As in the daylight_windows table, a
+    window starts with its first DAYLIGHT IssPosition and ends with the next ECLIPSED one, and the first window of the
+    history starts with the first IssPosition
+    """
+    __slots__ = ['satellite_id', 'warmed', 'first_timestamp', 'last_timestamp', '_starts', '_ends',
+                 '_cumulative_seconds']
+
+    def __init__(self, satellite_id: int = None):
+        """
+        :param satellite_id: the id of the satellite whose windows are indexed, None for any satellite
+        """
+        self.satellite_id = satellite_id
+        self.warmed = False
+        self.reset([], None, None)
+
+    def warm(self, db: Session, use_daylight_windows_table: bool = True) -> None:
+        """
+        Fills the index with the whole history of the satellite stored in the DB, after which it follows the added
+        IssPositions
+        :param db: the DB
+        :param use_daylight_windows_table: whether to read the windows from the daylight_windows table instead of
+        computing them from the IssPositions
+        """
+        self.load(db, datetime.min, datetime.now(), use_daylight_windows_table)
+        self.warmed = True
+        logger.debug("Warmed the daylight interval index with %s windows", len(self._starts))
+
+    def load(self, db: Session, start_time: datetime, end_time: datetime,
+             use_daylight_windows_table: bool = True) -> None:
+        """
+        Fills the index with the windows of the IssPositions between the given start and end times stored in the DB
+        :param db: the DB
+        :param start_time: the start time
+        :param end_time: the end time
+        :param use_daylight_windows_table: whether to read the windows from the daylight_windows table instead of
+        computing them from the IssPositions
+        """
+        if use_daylight_windows_table:
+            first_timestamp, last_timestamp = get_timestamp_range(db, start_time, end_time, self.satellite_id)
+            time_windows = get_daylight_windows(db, start_time, end_time, satellite_id=self.satellite_id) \
+                if first_timestamp else []
+        else:
+            timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time,
+                                                            satellite_id=self.satellite_id)
+            first_timestamp, last_timestamp = (timestamps[0].item(), timestamps[-1].item()) if len(timestamps) \
+                else (None, None)
+            time_windows = get_daylight_time_windows_vectorized(timestamps, daylight)
+        self.reset(time_windows, first_timestamp, last_timestamp)
+
+    def reset(self, time_windows: list[tuple], first_timestamp: Union[datetime, None],
+              last_timestamp: Union[datetime, None]) -> None:
+        """
+        Replaces the indexed windows
+        :param time_windows: the daylight time windows sorted by start time, as provided by get_daylight_time_windows:
+        only the first one may have a None start time and only the last one a None end time
+        :param first_timestamp: the timestamp of the first IssPosition of the windows
+        :param last_timestamp: the timestamp of the last IssPosition of the windows
+        """
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+        self._starts = []
+        # The end times of the closed windows, only the last window may still be open
+        self._ends = []
+        # The daylight seconds of the closed windows before each window
+        self._cumulative_seconds = [0.]
+        for start_time, end_time in time_windows:
+            self._starts.append(start_time or first_timestamp)
+            if end_time is not None:
+                self._close(end_time)
+
+    def append(self, iss_position: IssPosition) -> None:
+        """
+        Opens or closes a window with the given IssPosition if it is a transition. IssPositions that are not more recent
+        than the latest one, or added before the index is warmed, are ignored
+        :param iss_position: the IssPosition
+        """
+        if not self.warmed or (self.last_timestamp and iss_position.timestamp <= self.last_timestamp):
+            return
+        if self.first_timestamp is None:
+            self.first_timestamp = iss_position.timestamp
+        daylight = iss_position.visibility == Visibility.DAYLIGHT
+        if daylight and not self._is_open():
+            self._starts.append(iss_position.timestamp)
+        elif not daylight and self._is_open():
+            self._close(iss_position.timestamp)
+        self.last_timestamp = iss_position.timestamp
+
+    def lookup(self, timestamp: datetime) -> Union[tuple[bool, datetime, datetime], None]:
+        """
+        Provides the visibility of the satellite at the given time, the one of the latest IssPosition at or before it,
+        along with the start and end times of the daylight window or of the eclipse it is part of
+        :param timestamp: the time
+        :return: a Tuple with whether it was in daylight, the start time and the end time, None if they are not known
+        yet. None if the time is before the first IssPosition
+        """
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            return None
+        i = bisect_right(self._starts, timestamp)
+        if i and (i > len(self._ends) or timestamp < self._ends[i - 1]):
+            return True, self._starts[i - 1], self._ends[i - 1] if i <= len(self._ends) else None
+        return False, self._ends[i - 1] if i else None, self._starts[i] if i < len(self._starts) else None
+
+    def get_summary(self, start_time: datetime, end_time: datetime) -> dict:
+        """
+        Provides the time spent in daylight and in eclipse between the given start and end times, within the
+        IssPositions of the index
+        :param start_time: the start time
+        :param end_time: the end time
+        :return: a dict with the covered start and end times, None if the range has no IssPosition, the daylight and
+        eclipsed seconds and the number of daylight windows overlapping the range
+        """
+        if self.first_timestamp is None:
+            start_time, end_time = None, None
+        else:
+            start_time, end_time = max(start_time, self.first_timestamp), min(end_time, self.last_timestamp)
+        if start_time is None or start_time > end_time:
+            return {'start_time': None, 'end_time': None, 'daylight_seconds': 0., 'eclipsed_seconds': 0.,
+                    'daylight_windows': 0}
+        daylight_seconds = self._get_daylight_seconds(end_time) - self._get_daylight_seconds(start_time)
+        # The windows starting before the end time, minus the ones closed at or before the start time
+        daylight_windows = bisect_right(self._starts, end_time) - bisect_right(self._ends, start_time)
+        return {'start_time': start_time, 'end_time': end_time, 'daylight_seconds': daylight_seconds,
+                'eclipsed_seconds': (end_time - start_time).total_seconds() - daylight_seconds,
+                'daylight_windows': daylight_windows}
+
+    def _get_daylight_seconds(self, timestamp: datetime) -> float:
+        # The daylight seconds between the first IssPosition and the given time
+        i = bisect_right(self._starts, timestamp)
+        if not i:
+            return 0.
+        end_time = min(timestamp, self._ends[i - 1]) if i <= len(self._ends) else timestamp
+        return self._cumulative_seconds[i - 1] + (end_time - self._starts[i - 1]).total_seconds()
+
+    def _is_open(self) -> bool:
+        return len(self._starts) > len(self._ends)
+
+    def _close(self, end_time: datetime) -> None:
+        self._cumulative_seconds.append(self._cumulative_seconds[-1] +
+                                        (end_time - self._starts[len(self._ends)]).total_seconds())
+        self._ends.append(end_time)
+
+
+class DaylightIntervalIndexes:
+    """
+    One DaylightIntervalIndex per tracked satellite
+    """
+    __slots__ = ['_indexes']
+
+    def __init__(self, satellite_ids: list[int]):
+        """
+        :param satellite_ids: the ids of the tracked satellites
+        """
+        self._indexes = {satellite_id: DaylightIntervalIndex(satellite_id) for satellite_id in satellite_ids}
+
+    def warm(self, db: Session, use_daylight_windows_table: bool = True) -> None:
+        """
+        Fills every index with the history of its satellite stored in the DB
+        :param db: the DB
+        :param use_daylight_windows_table: whether to read the windows from the daylight_windows table instead of
+        computing them from the IssPositions
+        """
+        for daylight_interval_index in self._indexes.values():
+            daylight_interval_index.warm(db, use_daylight_windows_table)
+
+    def append(self, iss_position: IssPosition) -> None:
+        """
+        Appends the given IssPosition to the index of its satellite. IssPositions of untracked satellites are ignored
+        :param iss_position: the IssPosition
+        """
+        daylight_interval_index = self._indexes.get(iss_position.satellite_id)
+        if daylight_interval_index:
+            daylight_interval_index.append(iss_position)
+
+    def replace(self, daylight_interval_indexes: 'DaylightIntervalIndexes') -> None:
+        """
+        Replaces the indexes with the ones of the given DaylightIntervalIndexes, e.g. warmed on another thread
+        :param daylight_interval_indexes: the DaylightIntervalIndexes
+        """
+        self._indexes = daylight_interval_indexes._indexes
+
+    def get(self, satellite_id: int) -> Union[DaylightIntervalIndex, None]:
+        """
+        Provides the index of the given satellite
+        :param satellite_id: the id of the satellite
+        :return: the DaylightIntervalIndex, None if the satellite is not tracked
+        """
+        return self._indexes.get(satellite_id)
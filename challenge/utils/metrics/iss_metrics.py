@@ -0,0 +1,38 @@
+import time
+
+from challenge.utils.metrics.metrics import Counter, Gauge, Histogram, ROWS_BUCKETS
+
+sun_request_seconds = Histogram('iss_sun_request_seconds', 'Latency of /iss/sun', ('source',))
+sun_fetch_seconds = Histogram('iss_sun_fetch_seconds', 'Time spent fetching the data of /iss/sun', ('source',))
+sun_compute_seconds = Histogram('iss_sun_compute_seconds', 'Time spent computing the time windows of /iss/sun',
+                                ('source',))
+rows_scanned = Histogram('iss_rows_scanned', 'IssPositions read per /iss/sun query', ('source',),
+                         buckets=ROWS_BUCKETS)
+store_seconds = Histogram('iss_position_store_seconds',
+                          'Time spent inserting and committing a batch of IssPositions')
+stored_positions = Counter('iss_positions_stored_total', 'IssPositions stored in the DB')
+dropped_positions = Counter('iss_positions_dropped_total',
+                            'Pending IssPositions dropped as the DB kept failing to store them')
+upstream_retries = Counter('iss_upstream_retries_total', 'Retried requests to the upstream API')
+upstream_failures = Counter('iss_upstream_failures_total', 'Requests to the upstream API that failed for good')
+ingestion_leader = Gauge('iss_ingestion_leader', 'Whether this worker polls and writes the IssPositions')
+rate_limit_rejections = Counter('iss_rate_limit_rejections_total', 'Requests rejected by the rate limiter', ('path',))
+
+# Monotonic time of the last poll that provided at least one IssPosition, None before the first one
+_last_successful_poll = None
+
+
+def mark_successful_poll() -> None:
+    """
+    Records that a poll of the upstream API has just provided IssPositions
+    """
+    global _last_successful_poll
+    _last_successful_poll = time.monotonic()
+
+
+def _get_seconds_since_last_poll() -> float:
+    return time.monotonic() - _last_successful_poll if _last_successful_poll is not None else float('nan')
+
+
+seconds_since_last_poll = Gauge('iss_seconds_since_last_successful_poll',
+                                'Time since the last poll that provided IssPositions', _get_seconds_since_last_poll)
@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text exposition format
+    """
+    __slots__ = ['_metrics']
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric) -> None:
+        """
+        Registers the given metric
+        :param metric: the Counter, Gauge or Histogram
+        """
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """
+        Renders every registered metric
+        :return: the metrics in the Prometheus text exposition format
+        """
+        return ''.join(metric.render() for metric in self._metrics)
+
+
+class _Metric:
+    __slots__ = ['name', 'description', 'label_names', '_lock']
+    metric_type = None
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 registry: MetricsRegistry = None):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def render(self) -> str:
+        return f'# HELP {self.name} {self.description}\n# TYPE {self.name} {self.metric_type}\n' + ''.join(
+            self._render_samples())
+
+    def _render_samples(self):
+        raise NotImplementedError
+
+    def _format_labels(self, label_values: tuple, extra_labels: str = '') -> str:
+        labels = [f'{name}="{value}"' for name, value in zip(self.label_names, label_values)]
+        if extra_labels:
+            labels.append(extra_labels)
+        return '{' + ','.join(labels) + '}' if labels else ''
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, optionally split by labels
+    """
+    __slots__ = ['_values']
+    metric_type = 'counter'
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 registry: MetricsRegistry = None):
+        """
+        :param name: the name of the metric
+        :param description: the help text of the metric
+        :param label_names: the names of the labels
+        :param registry: the MetricsRegistry. If None, the default one is used
+        """
+        super().__init__(name, description, label_names, registry)
+        self._values = {}
+
+    def inc(self, amount: float = 1, label_values: tuple = ()) -> None:
+        """
+        Increases the counter
+        :param amount: the non-negative amount to add
+        :param label_values: the values of the labels, in the order of label_names
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, label_values: tuple = ()) -> float:
+        """
+        Provides the current value of the counter
+        :param label_values: the values of the labels
+        :return: the value
+        """
+        return self._values.get(label_values, 0)
+
+    def _render_samples(self):
+        for label_values, value in list(self._values.items()):
+            yield f'{self.name}{self._format_labels(label_values)} {_format_value(value)}\n'
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, either set explicitly or computed by a function when rendered
+    """
+    __slots__ = ['_value', '_function']
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] = None,
+                 registry: MetricsRegistry = None):
+        """
+        :param name: the name of the metric
+        :param description: the help text of the metric
+        :param function: the optional function providing the value when rendered
+        :param registry: the MetricsRegistry. If None, the default one is used
+        """
+        super().__init__(name, description, (), registry)
+        self._value = 0
+        self._function = function
+
+    def set(self, value: float) -> None:
+        """
+        Sets the value of the gauge
+        :param value: the value
+        """
+        self._value = value
+
+    def get(self) -> float:
+        """
+        Provides the current value of the gauge
+        :return: the value
+        """
+        return self._function() if self._function else self._value
+
+    def _render_samples(self):
+        yield f'{self.name} {_format_value(self.get())}\n'
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, optionally split by labels
+    """
+    __slots__ = ['buckets', '_series']
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: MetricsRegistry = None):
+        """
+        :param name: the name of the metric
+        :param description: the help text of the metric
+        :param label_names: the names of the labels
+        :param buckets: the sorted upper bounds of the buckets, without +Inf
+        :param registry: the MetricsRegistry. If None, the default one is used
+        """
+        super().__init__(name, description, label_names, registry)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value: float, label_values: tuple = ()) -> None:
+        """
+        Records the given value
+        :param value: the value
+        :param label_values: the values of the labels, in the order of label_names
+        """
+        # The last slot counts the values above every bucket, so only one slot is updated per observation
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def get_count(self, label_values: tuple = ()) -> int:
+        """
+        Provides the number of observed values
+        :param label_values: the values of the labels
+        :return: the count
+        """
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def _render_samples(self):
+        for label_values, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for upper_bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = '+Inf' if upper_bound == math.inf else _format_value(upper_bound)
+                bucket_labels = self._format_labels(label_values, f'le="{le}"')
+                yield f'{self.name}_bucket{bucket_labels} {cumulative}\n'
+            yield f'{self.name}_sum{self._format_labels(label_values)} {_format_value(total)}\n'
+            yield f'{self.name}_count{self._format_labels(label_values)} {cumulative}\n'
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def get_transition_indexes(daylight: np.ndarray) -> np.ndarray:
+    """
+    Provides the indexes of the IssPositions on both sides of every DAYLIGHT/ECLIPSED transition
+    :param daylight: the boolean daylight mask of the IssPositions, sorted by timestamp
+    :return: a sorted array of indexes
+    """
+    changes = np.flatnonzero(daylight[1:] != daylight[:-1])
+    return np.union1d(changes, changes + 1)
+
+
+def get_lttb_indexes(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Downsamples the given series with Largest-Triangle-Three-Buckets: the first and last points are kept, and every
+    bucket in between keeps the point forming the largest triangle with the point kept in the previous bucket and the
+    average of the next bucket, which preserves the shape of the series
+    :param x: the x values, sorted
+    :param y: the y values
+    :param max_points: the number of points to keep
+    :return: a sorted array with the indexes of the kept points
+    """
+    size = len(x)
+    if max_points >= size or size <= 2:
+        return np.arange(size)
+    if max_points < 3:
+        return np.array([0, size - 1])[:max(max_points, 1)]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # The points between the first and last ones are split into max_points - 2 buckets
+    edges = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+    indexes = np.empty(max_points, dtype=np.int64)
+    indexes[0], indexes[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # Twice the area of the triangles, the constant factor does not change the largest one
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = indexes[bucket + 1] = start + int(np.argmax(areas))
+    return indexes
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# The size in degrees of the cells of the lat/lon grid. Changing it requires rebuilding the iss_position_cells table
+CELL_DEGREES = 1
+GRID_ROWS = round(180 / CELL_DEGREES)
+GRID_COLUMNS = round(360 / CELL_DEGREES)
+# Shorter than the time between two passes over the same place, which is at least most of an orbit
+PASS_GAP_SECONDS = 1800
+
+
+def get_cells(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Provides the cells of the lat/lon grid of the given coordinates, numbered row by row from the south-west corner
+    :param latitudes: the latitudes in degrees
+    :param longitudes: the longitudes in degrees
+    :return: an array with the cell of every coordinate
+    """
+    rows = np.minimum(np.floor((np.asarray(latitudes, dtype=np.float64) + 90) / CELL_DEGREES), GRID_ROWS - 1)
+    columns = np.floor((np.asarray(longitudes, dtype=np.float64) + 180) / CELL_DEGREES) % GRID_COLUMNS
+    return (rows * GRID_COLUMNS + columns).astype(np.int64)
+
+
+def get_cell_ranges(latitude: float, longitude: float, radius_km: float) -> list[tuple[int, int]]:
+    """
+    Provides the cells of the lat/lon grid that may hold coordinates within the given distance of the given point: the
+    ones overlapping the bounding box of the circle, which spans every longitude if the circle holds a pole
+    :param latitude: the latitude of the point in degrees
+    :param longitude: the longitude of the point in degrees
+    :param radius_km: the distance in km
+    :return: a sorted List of Tuples with the first and last cells of every range of consecutive cells
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    latitude_delta = math.degrees(angular_radius)
+    first_row = max(math.floor((latitude - latitude_delta + 90) / CELL_DEGREES), 0)
+    last_row = min(math.floor((latitude + latitude_delta + 90) / CELL_DEGREES), GRID_ROWS - 1)
+    column_ranges = [(0, GRID_COLUMNS - 1)]
+    cosine = math.cos(math.radians(latitude))
+    if angular_radius < math.pi / 2 and abs(latitude) + latitude_delta < 90 and math.sin(angular_radius) < cosine:
+        longitude_delta = math.degrees(math.asin(math.sin(angular_radius) / cosine))
+        first_column = math.floor((longitude - longitude_delta + 180) / CELL_DEGREES)
+        last_column = math.floor((longitude + longitude_delta + 180) / CELL_DEGREES)
+        if last_column - first_column < GRID_COLUMNS - 1:
+            first_column, last_column = first_column % GRID_COLUMNS, last_column % GRID_COLUMNS
+            # The box crosses the antimeridian
+            column_ranges = [(first_column, last_column)] if first_column <= last_column else \
+                [(0, last_column), (first_column, GRID_COLUMNS - 1)]
+    cell_ranges = []
+    for row in range(first_row, last_row + 1):
+        for first_column, last_column in column_ranges:
+            first_cell, last_cell = row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column
+            if cell_ranges and cell_ranges[-1][1] + 1 == first_cell:
+                cell_ranges[-1] = (cell_ranges[-1][0], last_cell)
+            else:
+                cell_ranges.append((first_cell, last_cell))
+    return cell_ranges
+
+
+def get_haversine_distances(latitude: float, longitude: float, latitudes: np.ndarray,
+                            longitudes: np.ndarray) -> np.ndarray:
+    """
+    Provides the great-circle distances between the given point and the given coordinates
+    :param latitude: the latitude of the point in degrees
+    :param longitude: the longitude of the point in degrees
+    :param latitudes: the latitudes in degrees
+    :param longitudes: the longitudes in degrees
+    :return: an array with the distances in km
+    """
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    haversine = np.sin((latitudes - latitude) / 2) ** 2 + \
+        np.cos(latitudes) * math.cos(latitude) * np.sin((longitudes - longitude) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(haversine, 1)))
+
+
+def get_passes(timestamps: np.ndarray, distances: np.ndarray, max_gap_seconds: float = PASS_GAP_SECONDS) -> list[dict]:
+    """
+    Groups the given close IssPositions into passes: consecutive ones belong to the same pass unless they are more than
+    max_gap_seconds apart
+    :param timestamps: the timestamps of the IssPositions, sorted
+    :param distances: the distances in km of the IssPositions
+    :param max_gap_seconds: the maximum time in seconds between two IssPositions of the same pass
+    :return: a List of passes with their first and last timestamps, the timestamp of the closest IssPosition and its
+    distance
+    """
+    if not len(timestamps):
+        return []
+    gaps = np.diff(timestamps.astype('datetime64[us]')) > np.timedelta64(int(max_gap_seconds * 1e6), 'us')
+    starts = np.concatenate(([0], np.flatnonzero(gaps) + 1))
+    ends = np.concatenate((starts[1:], [len(timestamps)]))
+    passes = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        closest = start + int(np.argmin(distances[start:end]))
+        passes.append({'start_time': timestamps[start].item(), 'end_time': timestamps[end - 1].item(),
+                       'closest_time': timestamps[closest].item(), 'min_distance_km': float(distances[closest])})
+    return passes
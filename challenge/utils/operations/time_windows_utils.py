@@ -1,4 +1,7 @@
 from datetime import datetime
+from typing import Sequence, Iterable, Iterator
+
+import numpy as np
 
 from challenge.database.models.models import IssPosition
 from challenge.database.models.visibility import Visibility
@@ -30,6 +33,108 @@ def get_daylight_time_windows(iss_positions: list[IssPosition]) -> list[tuple]:
     return daylight_time_windows
 
 
+def get_daylight_time_windows_vectorized(timestamps: Sequence, visibilities: Sequence) -> list[tuple]:
+    """
+    Columnar version of get_daylight_time_windows: it provides the same List of Daylight time windows given the
+    timestamp and visibility columns of a List of IssPosition sorted by timestamp. The DAYLIGHT/ECLIPSED transitions
+    are found with array diffs instead of walking the positions one by one.
+    get_daylight_time_windows is kept as the reference implementation
+    :param timestamps: the timestamps of the IssPositions
+    :param visibilities: the visibilities of the IssPositions, either as Visibility values or as a boolean daylight mask
+    :return: a List of Tuples representing daylight time windows
+    """
+    daylight = _get_daylight_mask(visibilities)
+    size = len(daylight)
+    if size == 0:
+        return []
+    # Padding with eclipsed on both sides turns every daylight run into a +1/-1 pair in the diff
+    transitions = np.diff(np.concatenate(([0], daylight.view(np.int8), [0])))
+    run_starts = np.flatnonzero(transitions == 1)
+    run_ends = np.flatnonzero(transitions == -1)
+    return [(_get_timestamp(timestamps, run_start) if run_start > 0 else None,
+             _get_timestamp(timestamps, run_end) if run_end < size else None)
+            for run_start, run_end in zip(run_starts.tolist(), run_ends.tolist())]
+
+
+def iter_daylight_time_windows(column_chunks: Iterable[tuple[Sequence, Sequence]]) -> Iterator[tuple]:
+    """
+    Streaming version of get_daylight_time_windows_vectorized: it consumes the timestamp and visibility columns of a
+    List of IssPosition sorted by timestamp chunk by chunk and yields every Daylight time window as soon as it closes.
+    The state of the open window is carried across chunks, so the windows are the same as the non-streaming ones
+    :param column_chunks: the chunks of timestamps and visibilities
+    :return: an Iterator over Tuples representing daylight time windows
+    """
+    previous_daylight = None
+    start_window = None
+    for timestamps, visibilities in column_chunks:
+        daylight = _get_daylight_mask(visibilities)
+        if len(daylight) == 0:
+            continue
+        transitions = np.diff(np.concatenate(([bool(previous_daylight)], daylight)).view(np.int8))
+        for i in np.flatnonzero(transitions).tolist():
+            if transitions[i] == 1:
+                start_window = _get_timestamp(timestamps, i) if previous_daylight is not None or i > 0 else None
+            else:
+                yield start_window, _get_timestamp(timestamps, i)
+                start_window = None
+        previous_daylight = bool(daylight[-1])
+    if previous_daylight:
+        yield start_window, None
+
+
+def get_chunk_daylight_time_windows(timestamps: Sequence, visibilities: Sequence) -> tuple:
+    """
+    Provides the Daylight time windows of a chunk of a List of IssPosition along with what merge_daylight_time_windows
+    needs to stitch them to the windows of the neighbouring chunks
+    :param timestamps: the timestamps of the IssPositions of the chunk
+    :param visibilities: the visibilities of the IssPositions of the chunk, as in get_daylight_time_windows_vectorized
+    :return: a Tuple with the timestamp of the first IssPosition, None if the chunk is empty, the time windows as
+    provided by get_daylight_time_windows_vectorized and whether the last IssPosition is Daylight
+    """
+    daylight = _get_daylight_mask(visibilities)
+    if len(daylight) == 0:
+        return None, [], False
+    return _get_timestamp(timestamps, 0), get_daylight_time_windows_vectorized(timestamps, daylight), bool(daylight[-1])
+
+
+def merge_daylight_time_windows(chunk_time_windows: Iterable[tuple]) -> list[tuple]:
+    """
+    Merges the Daylight time windows of consecutive chunks of a List of IssPosition sorted by timestamp into the ones
+    of the whole List: a window still open at the end of a chunk either goes on in the next one or ends with its first
+    IssPosition, while a window starting with the first IssPosition of a chunk really starts there if the previous
+    chunk ends Eclipsed
+    :param chunk_time_windows: the Tuples provided by get_chunk_daylight_time_windows for every chunk, in order
+    :return: a List of Tuples representing daylight time windows, the same as get_daylight_time_windows_vectorized
+    provides for the whole List
+    """
+    time_windows = []
+    previous_daylight = None
+    for first_timestamp, chunk_windows, last_daylight in chunk_time_windows:
+        if first_timestamp is None:
+            continue
+        if previous_daylight and not (chunk_windows and chunk_windows[0][0] is None):
+            time_windows[-1] = (time_windows[-1][0], first_timestamp)
+        for start_window, end_window in chunk_windows:
+            if start_window is None and previous_daylight is not None:
+                start_window = time_windows.pop()[0] if previous_daylight else first_timestamp
+            time_windows.append((start_window, end_window))
+        previous_daylight = last_daylight
+    return time_windows
+
+
+def _get_daylight_mask(visibilities: Sequence) -> np.ndarray:
+    visibilities = np.asarray(visibilities)
+    if visibilities.dtype == np.bool_:
+        return visibilities
+    return np.fromiter((visibility == Visibility.DAYLIGHT for visibility in visibilities), dtype=np.bool_,
+                       count=len(visibilities))
+
+
+def _get_timestamp(timestamps: Sequence, i: int) -> datetime:
+    timestamp = timestamps[i]
+    return timestamp.item() if isinstance(timestamp, np.datetime64) else timestamp
+
+
 def _append_if_not_none(daylight_time_windows: list[tuple], time_window: tuple):
     if time_window:
         daylight_time_windows.append(time_window)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, Future
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.orm import Session
+
+from challenge.database.iss_crud import get_iss_position_columns
+from challenge.utils.operations.time_windows_utils import get_chunk_daylight_time_windows, \
+    merge_daylight_time_windows
+
+logger = logging.getLogger(__name__)
+
+# The engines of the worker processes, one per DB URL, reused by the chunks they compute
+_engines = {}
+
+
+def get_time_chunks(start_time: datetime, end_time: datetime, chunks: int) -> list[tuple[datetime, datetime]]:
+    """
+    Splits the given time range into consecutive chunks of the same duration. Both bounds of a chunk are included, so
+    every chunk ends one microsecond, the resolution of the timestamps, before the next one starts
+    :param start_time: the start time
+    :param end_time: the end time
+    :param chunks: the number of chunks
+    :return: a List of Tuples with the start and end times of every chunk
+    """
+    chunk_duration = (end_time - start_time) / max(chunks, 1)
+    chunk_starts = [start_time + chunk_duration * i for i in range(max(chunks, 1))]
+    chunk_ends = [chunk_start - timedelta(microseconds=1) for chunk_start in chunk_starts[1:]] + [end_time]
+    return [(chunk_start, chunk_end) for chunk_start, chunk_end in zip(chunk_starts, chunk_ends)
+            if chunk_start <= chunk_end]
+
+
+def get_chunk_time_windows(database_url: str, start_time: datetime, end_time: datetime,
+                           satellite_id: int = None) -> tuple:
+    """
+    Fetches the IssPositions of a chunk from the DB and computes its daylight time windows. It runs in the worker
+    processes, which open their own connections to the DB
+    :param database_url: the URL of the DB file
+    :param start_time: the start time of the chunk
+    :param end_time: the end time of the chunk
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: the Tuple provided by get_chunk_daylight_time_windows
+    """
+    with Session(_get_engine(database_url)) as db:
+        timestamps, daylight = get_iss_position_columns(db, ('timestamp', 'daylight'), start_time, end_time,
+                                                        satellite_id=satellite_id)
+    return get_chunk_daylight_time_windows(timestamps, daylight)
+
+
+def get_parallel_time_windows(executor: Executor, database_url: str, start_time: datetime, end_time: datetime,
+                              chunks: int, satellite_id: int = None) -> list[tuple]:
+    """
+    Provides the daylight time windows between the given start and end times, the time chunks of the range being
+    fetched and scanned by the given executor at the same time
+    :param executor: the executor, usually a ProcessPoolExecutor
+    :param database_url: the URL of the DB file
+    :param start_time: the start time
+    :param end_time: the end time
+    :param chunks: the number of time chunks
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: a List of Tuples representing daylight time windows, the same as get_daylight_time_windows_vectorized
+    provides for the whole range
+    """
+    futures = _submit_chunks(executor, database_url, start_time, end_time, chunks, satellite_id)
+    return merge_daylight_time_windows(future.result() for future in futures)
+
+
+async def get_parallel_time_windows_async(executor: Executor, database_url: str, start_time: datetime,
+                                          end_time: datetime, chunks: int, satellite_id: int = None) -> list[tuple]:
+    """
+    Awaitable version of get_parallel_time_windows: the event loop waits for the chunks instead of blocking on them
+    :param executor: the executor, usually a ProcessPoolExecutor
+    :param database_url: the URL of the DB file
+    :param start_time: the start time
+    :param end_time: the end time
+    :param chunks: the number of time chunks
+    :param satellite_id: the id of the satellite. If None, the IssPositions of every satellite are selected
+    :return: the same List of Tuples as get_parallel_time_windows
+    """
+    futures = _submit_chunks(executor, database_url, start_time, end_time, chunks, satellite_id)
+    return merge_daylight_time_windows(await asyncio.gather(*[asyncio.wrap_future(future) for future in futures]))
+
+
+def _submit_chunks(executor: Executor, database_url: str, start_time: datetime, end_time: datetime, chunks: int,
+                   satellite_id: int) -> list[Future]:
+    return [executor.submit(get_chunk_time_windows, database_url, chunk_start, chunk_end, satellite_id)
+            for chunk_start, chunk_end in get_time_chunks(start_time, end_time, chunks)]
+
+
+def _get_engine(database_url: str) -> Engine:
+    engine = _engines.get(database_url)
+    if engine is None:
+        engine = _engines[database_url] = create_engine(database_url)
+        logger.info("Opened %s in a worker process", database_url)
+    return engine
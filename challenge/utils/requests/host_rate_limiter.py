@@ -0,0 +1,48 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """
+    Spaces the requests to the same host so that they do not exceed the given rate. Every request reserves the next
+    free slot of its host, so waiting is O(1) and fair in the order of arrival
+    """
+    __slots__ = ['requests_per_second', '_next_slots']
+
+    def __init__(self, requests_per_second: float = 0):
+        """
+        :param requests_per_second: the maximum rate of requests to the same host, 0 for no limit
+        """
+        self.requests_per_second = requests_per_second
+        self._next_slots = {}
+
+    async def acquire(self, url: str) -> None:
+        """
+        Waits until a request to the host of the given URL is allowed
+        :param url: the URL that is going to be requested
+        """
+        if self.requests_per_second <= 0:
+            return
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._next_slots.get(host, now))
+        self._next_slots[host] = slot + 1 / self.requests_per_second
+        if slot > now:
+            logger.debug('Delaying the request to %s by %.3f seconds', url, slot - now)
+            await asyncio.sleep(slot - now)
+
+    def get_spread_seconds(self, urls: list[str]) -> float:
+        """
+        Provides the time it takes to send one request to each of the given URLs, the requests to the same host being
+        spaced by the rate
+        :param urls: the URLs
+        :return: the seconds between the first and the last request
+        """
+        if self.requests_per_second <= 0 or not urls:
+            return 0
+        return (max(Counter(urlsplit(url).netloc for url in urls).values()) - 1) / self.requests_per_second
@@ -4,6 +4,8 @@ import logging
 import aiohttp
 from aiohttp import ClientSession
 
+from challenge.utils.metrics.iss_metrics import upstream_retries, upstream_failures
+
 logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 
@@ -25,9 +27,12 @@ async def get(url: str, session: ClientSession, retries: int = 0) -> dict:
         await asyncio.sleep(0.5)
         if retries < MAX_RETRIES:
             retries += 1
+            upstream_retries.inc()
             return await get(url, session, retries)
+        upstream_failures.inc()
         logger.error(
             'Could not get %s. Maximum number of retries (%s) exceeded. Will retry at next scheduled '
             'time. Error: %s', url, MAX_RETRIES, e)
     except Exception as e:
+        upstream_failures.inc()
         logger.error('Could not get %s. Will retry at next scheduled time. Error: %s', url, e)
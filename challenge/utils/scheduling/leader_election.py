@@ -0,0 +1,78 @@
+import logging
+import os
+
+from challenge.utils.scheduling.poll_scheduler import PollScheduler
+
+try:
+    import fcntl
+except ImportError:
+    # Without advisory locks, e.g. on Windows, every worker considers itself the leader
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Elects a single leader among the workers of a host with an advisory lock on a file. The lock is held for as long
+    as the leader's process lives and is released by the OS as soon as it dies, so that a follower retrying every
+    retry_interval seconds takes over within one interval
+    """
+    __slots__ = ['lock_path', 'retry_interval', 'is_leader', '_file_descriptor', '_poll_scheduler']
+
+    def __init__(self, lock_path: str, retry_interval: float = 20):
+        """
+        :param lock_path: the path of the lock file, shared by all the workers
+        :param retry_interval: the time in seconds between two attempts of a follower to become the leader
+        """
+        self.lock_path = lock_path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._file_descriptor = None
+        self._poll_scheduler = None
+
+    def try_acquire(self) -> bool:
+        """
+        Tries to become the leader without waiting
+        :return: true if this worker is the leader
+        """
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        file_descriptor = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(file_descriptor)
+            return False
+        # The pid is only informative: the lock, not the content of the file, tells who the leader is
+        os.ftruncate(file_descriptor, 0)
+        os.write(file_descriptor, str(os.getpid()).encode())
+        self._file_descriptor = file_descriptor
+        self.is_leader = True
+        logger.info("Worker %s is the leader", os.getpid())
+        return True
+
+    async def wait_until_elected(self) -> None:
+        """
+        Tries to become the leader every retry_interval seconds until it succeeds or release() is called
+        """
+        self._poll_scheduler = PollScheduler(self.retry_interval)
+        await self._poll_scheduler.run(self._try_acquire_async, lambda: self.is_leader)
+
+    def release(self) -> None:
+        """
+        Gives up the leadership, or stops waiting for it
+        """
+        if self._poll_scheduler:
+            self._poll_scheduler.stop()
+        if self._file_descriptor is not None:
+            fcntl.flock(self._file_descriptor, fcntl.LOCK_UN)
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+        self.is_leader = False
+
+    async def _try_acquire_async(self) -> None:
+        self.try_acquire()
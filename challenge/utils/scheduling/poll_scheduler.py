@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+SKIP = 'skip'
+CATCH_UP = 'catch_up'
+
+
+class PollScheduler:
+    """
+    Runs a job on a fixed grid of deadlines of the monotonic clock, sleeping until the next deadline instead of
+    polling for it, so that the ticks do not drift with the duration of the job. A run is always awaited before the
+    next one starts. When a run lasts longer than the interval, the missed ticks are either skipped, waiting for the
+    next deadline of the grid, or caught up with one immediate run
+    """
+    __slots__ = ['interval', 'missed_ticks_policy', 'clock', 'missed_ticks', '_sleep', '_stop_event']
+
+    def __init__(self, interval: float, missed_ticks_policy: str = SKIP, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable] = None):
+        """
+        :param interval: the time in seconds between two deadlines
+        :param missed_ticks_policy: SKIP or CATCH_UP
+        :param clock: the monotonic clock, in seconds
+        :param sleep: the coroutine function that waits for the given seconds. If None, the wait is interrupted by
+        stop()
+        """
+        if missed_ticks_policy not in (SKIP, CATCH_UP):
+            raise ValueError(f'Unknown missed ticks policy: {missed_ticks_policy}')
+        self.interval = interval
+        self.missed_ticks_policy = missed_ticks_policy
+        self.clock = clock
+        self.missed_ticks = 0
+        self._sleep = sleep
+        self._stop_event = asyncio.Event()
+
+    async def run(self, job: Callable[[], Awaitable], should_stop: Callable[[], bool] = None) -> None:
+        """
+        Runs the job right away and then at every deadline, until stop() is called, should_stop returns true or the
+        task is cancelled
+        :param job: the coroutine function to run
+        :param should_stop: an optional callable checked before every run
+        """
+        self._stop_event.clear()
+        deadline = self.clock()
+        while not self._is_stopped(should_stop):
+            try:
+                await job()
+            except Exception as e:
+                logger.error('The scheduled job failed: %s', e)
+            deadline += self.interval
+            now = self.clock()
+            if now > deadline:
+                missed_ticks = int((now - deadline) // self.interval) + 1
+                self.missed_ticks += missed_ticks
+                logger.warning('The scheduled job missed %s ticks', missed_ticks)
+                if self.missed_ticks_policy == CATCH_UP:
+                    deadline += (missed_ticks - 1) * self.interval
+                    continue
+                deadline += missed_ticks * self.interval
+            if self._is_stopped(should_stop):
+                break
+            await self._wait(deadline - now)
+
+    def stop(self) -> None:
+        """
+        Stops the schedule, interrupting the wait for the next deadline
+        """
+        self._stop_event.set()
+
+    def _is_stopped(self, should_stop: Callable[[], bool] = None) -> bool:
+        return self._stop_event.is_set() or bool(should_stop and should_stop())
+
+    async def _wait(self, delay: float) -> None:
+        if self._sleep:
+            await self._sleep(delay)
+            return
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Union
+
+from challenge.database.schemas import IssPosition
+
+logger = logging.getLogger(__name__)
+
+
+class PositionHubFullError(Exception):
+    """
+    Raised when a PositionHub already has its maximum number of subscribers
+    """
+
+
+class PositionUpdate:
+    """
+    An IssPosition serialized once for all the subscribers, both as JSON and as a Server-Sent Event
+    """
+    __slots__ = ['version', 'timestamp', 'json', 'event']
+
+    def __init__(self, version: int, timestamp: datetime, json: str):
+        """
+        :param version: the number of updates of the satellite so far, this one included
+        :param timestamp: the timestamp of the IssPosition
+        :param json: the IssPosition as JSON
+        """
+        self.version = version
+        self.timestamp = timestamp
+        self.json = json
+        self.event = f'id: {version}\nevent: position\ndata: {json}\n\n'.encode()
+
+
+class _Channel:
+    __slots__ = ['latest', 'next_update']
+
+    def __init__(self):
+        self.latest = None
+        self.next_update = None
+
+
+class PositionHub:
+    """
+    In-process broadcast of the latest IssPosition of every satellite. Each update is serialized once and shared by
+    all the subscribers, which only hold the version of the last update they have sent: while a subscriber is busy
+    sending, the updates it misses are conflated into the latest one instead of being queued, so that slow consumers
+    take no memory. Idle subscribers wait on one future shared by all the subscribers of the satellite
+    """
+    __slots__ = ['max_subscribers', 'subscribers', 'skipped_updates', '_channels']
+
+    def __init__(self, max_subscribers: int = 10000):
+        """
+        :param max_subscribers: the maximum number of concurrent subscribers
+        """
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self.skipped_updates = 0
+        self._channels = {}
+
+    def publish(self, iss_position: IssPosition) -> None:
+        """
+        Publishes the given IssPosition to the subscribers of its satellite, unless a more recent one was published
+        :param iss_position: the IssPosition
+        """
+        channel = self._get_channel(iss_position.satellite_id)
+        latest = channel.latest
+        if latest and latest.timestamp >= iss_position.timestamp:
+            return
+        channel.latest = PositionUpdate((latest.version if latest else 0) + 1, iss_position.timestamp,
+                                        iss_position.model_dump_json())
+        next_update, channel.next_update = channel.next_update, None
+        if next_update and not next_update.done():
+            next_update.set_result(None)
+
+    def get_latest(self, satellite_id: int) -> Union[PositionUpdate, None]:
+        """
+        Provides the latest update of the given satellite
+        :param satellite_id: the id of the satellite
+        :return: the PositionUpdate, None if nothing was published yet
+        """
+        channel = self._channels.get(satellite_id)
+        return channel.latest if channel else None
+
+    def is_full(self) -> bool:
+        """
+        Tells whether the hub has its maximum number of subscribers
+        :return: true if no more subscribers are accepted
+        """
+        return self.subscribers >= self.max_subscribers
+
+    async def subscribe(self, satellite_id: int, timeout: float = None) -> AsyncIterator[Union[PositionUpdate, None]]:
+        """
+        Provides the updates of the given satellite, starting with the latest one if any, until the iteration stops
+        :param satellite_id: the id of the satellite
+        :param timeout: the time in seconds after which None is provided if there is no update, e.g. to send
+        keepalives. If None, it waits for the updates indefinitely
+        :return: an AsyncIterator of PositionUpdate
+        :raises PositionHubFullError: if the hub already has its maximum number of subscribers
+        """
+        if self.is_full():
+            raise PositionHubFullError(f'The maximum number of subscribers ({self.max_subscribers}) is reached')
+        self.subscribers += 1
+        try:
+            channel = self._get_channel(satellite_id)
+            version = 0
+            while True:
+                latest = channel.latest
+                if latest is None or latest.version == version:
+                    loop = asyncio.get_running_loop()
+                    if channel.next_update is None or channel.next_update.get_loop() is not loop:
+                        channel.next_update = loop.create_future()
+                    try:
+                        # Shielded, as the cancellation of a subscriber must not cancel the future shared with the
+                        # others
+                        await asyncio.wait_for(asyncio.shield(channel.next_update), timeout)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                if version:
+                    self.skipped_updates += latest.version - version - 1
+                version = latest.version
+                yield latest
+        finally:
+            self.subscribers -= 1
+
+    def get_stats(self) -> dict:
+        """
+        Provides the counters of the hub
+        :return: a dict with the subscribers, the maximum subscribers and the updates skipped by slow subscribers
+        """
+        return {'subscribers': self.subscribers, 'max_subscribers': self.max_subscribers,
+                'skipped_updates': self.skipped_updates}
+
+    def _get_channel(self, satellite_id: int) -> _Channel:
+        channel = self._channels.get(satellite_id)
+        if channel is None:
+            channel = self._channels[satellite_id] = _Channel()
+        return channel
@@ -6,7 +6,7 @@ with open('requirements.txt') as f:
 setup(
     name='iss-tracker-backend',
     version='0.1',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=requirements,
     python_requires='~=3.10'
 )